@@ -0,0 +1,109 @@
+"""
+@author: Vincent Bonnet
+@description : Auto-tune the DataBlock block size per datatype
+The block sizes of a datatype are swept on a beam/wire scene (the other datatypes are unchanged)
+and scored with the kernels reading this datatype
+    Node : advect + assemble_A
+    Spring, Area, Bending, AnchorSpring : compute_forces + assemble_A
+The geometries (Point, Edge, Triangle) are not tuned
+The best block sizes are written in the config read by Details (--write)
+Command line (from the implicit_solver folder) :
+    python -m benchmarks.block_size_benchmark [--rounds N] [--sizes N ...] [--write]
+"""
+
+import argparse
+import time
+import numpy as np
+
+import core
+from core import BeamShape, WireShape, RectangleShape
+import lib
+
+DEFAULT_BLOCK_SIZES = (16, 32, 64, 100, 128, 256, 512)
+DEFAULT_ROUNDS = 10
+TUNED_TYPES = ('node', 'spring', 'area', 'bending', 'anchorSpring')
+
+def build_scene(dispatcher, cell_x = 100, cell_y = 10, wire_edges = 1000):
+    # beam (edge, area) attached to an anchor and wire (edge, bending)
+    beam = dispatcher.add_dynamic(shape = BeamShape((-5.0, 0.0), 10.0, 1.0, cell_x, cell_y), node_mass = 0.001)
+    wire = dispatcher.add_dynamic(shape = WireShape((-5.0, 2.0), (5.0, 2.0), wire_edges), node_mass = 0.001)
+    dispatcher.add_edge_constraint(dynamic = beam, stiffness = 20.0, damping = 0.1)
+    dispatcher.add_face_constraint(dynamic = beam, stiffness = 20.0, damping = 0.1)
+    dispatcher.add_edge_constraint(dynamic = wire, stiffness = 20.0, damping = 0.1)
+    dispatcher.add_wire_bending_constraint(dynamic = wire, stiffness = 0.1, damping = 0.0)
+    anchor = dispatcher.add_kinematic(shape = RectangleShape(-5.0, -1.0, 5.0, 0.0))
+    dispatcher.add_kinematic_attachment(dynamic = beam, kinematic = anchor,
+                                        stiffness = 100.0, damping = 0.0, distance = 0.5)
+    dispatcher.add_gravity(gravity = (0.0, -9.81))
+
+def measure(datatype_name, block_size, rounds = DEFAULT_ROUNDS):
+    '''
+    Returns the kernel times (advect, compute_forces, assemble_A) in seconds
+    with the block size of 'datatype_name'
+    '''
+    dispatcher = lib.CommandSolverDispatcher()
+    dispatcher.reset(block_sizes = {datatype_name : block_size})
+    dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = 1, num_frames = 1)
+    build_scene(dispatcher)
+    dispatcher.initialize()
+    dispatcher.solve_to_next_frame() # warm-up (compilation)
+
+    scene, details = dispatcher._scene, dispatcher._details
+    integrator = dispatcher._solver.time_integrator
+    dt = dispatcher.get_context().dt
+    conditions = [condition for condition in scene.conditions if condition.typename == datatype_name]
+    delta_v = np.zeros((integrator.num_nodes, 2))
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        lib.system.jit.integrator_lib.advect(details.dynamics, delta_v, dt)
+    advect_time = (time.perf_counter() - start_time) / rounds
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        for condition in conditions:
+            condition.compute_forces(details.bundle)
+    forces_time = (time.perf_counter() - start_time) / rounds
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        integrator._assemble_A(scene, details, dt)
+    assemble_time = (time.perf_counter() - start_time) / rounds
+
+    return advect_time, forces_time, assemble_time
+
+def tune(block_sizes = DEFAULT_BLOCK_SIZES, rounds = DEFAULT_ROUNDS):
+    '''
+    Returns the best block size per datatype name
+    '''
+    core.Profiler().disable()
+    best_block_sizes = {}
+    print('%14s %10s %12s %12s %12s %12s' % ('datatype', 'block size', 'advect ms',
+                                             'forces ms', 'assemble ms', 'score ms'))
+    for datatype_name in TUNED_TYPES:
+        best_score = None
+        for block_size in block_sizes:
+            advect_time, forces_time, assemble_time = measure(datatype_name, block_size, rounds)
+            kernel_time = advect_time if datatype_name == 'node' else forces_time
+            score = kernel_time + assemble_time
+            print('%14s %10d %12.3f %12.3f %12.3f %12.3f' % (datatype_name, block_size, advect_time * 1e3,
+                                                             forces_time * 1e3, assemble_time * 1e3, score * 1e3))
+            if best_score is None or score < best_score:
+                best_score = score
+                best_block_sizes[datatype_name] = block_size
+
+    return best_block_sizes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataBlock block size auto-tuning')
+    parser.add_argument('--sizes', type=int, nargs='*', default=DEFAULT_BLOCK_SIZES)
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument('--write', action='store_true', help='write the config read by Details')
+    args = parser.parse_args()
+    best_block_sizes = tune(args.sizes, args.rounds)
+    print('best block sizes :', best_block_sizes)
+    if args.write:
+        block_sizes = core.details.load_block_sizes()
+        block_sizes.update(best_block_sizes)
+        core.details.save_block_sizes(block_sizes)
+        print('written into', core.details.BLOCK_SIZE_CONFIG)
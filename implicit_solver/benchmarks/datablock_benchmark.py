@@ -0,0 +1,120 @@
+"""
+@author: Vincent Bonnet
+@description : Measure the DataBlock allocator and storage
+Allocator : half of the blocks are released and reallocated every round
+(like the collision constraints every substep)
+Storage : walk the node blocks (advect kernel), snapshot the datablock
+and read back the positions (flatten and gather_into a reused buffer)
+with the separated and the contiguous storage
+Command line (from the implicit_solver folder) :
+    python -m benchmarks.datablock_benchmark [--rounds N] [--block-size N] [num_blocks ...]
+"""
+
+import argparse
+import time
+import numpy as np
+
+import core
+import core.jit.block_utils as block_utils
+import lib.system.jit.integrator_lib as integrator_lib
+from lib.objects.jit.data import AnchorSpring, Node, Spring
+
+DEFAULT_NUM_BLOCKS = (100, 1000, 10000, 100000)
+DEFAULT_BLOCK_SIZE = 8
+DEFAULT_ROUNDS = 10
+
+def measure(num_blocks, block_size = DEFAULT_BLOCK_SIZE, rounds = DEFAULT_ROUNDS):
+    '''
+    Returns the (release, append) throughput in blocks per second
+    '''
+    datablock = core.DataBlock(AnchorSpring, block_size)
+    block_handles = datablock.append(num_blocks * block_size)
+
+    # every other block is released and reallocated
+    churn_handles = block_utils.empty_block_handles()
+    for block_handle in block_handles[::2]:
+        churn_handles.append(block_handle)
+    num_churn_blocks = len(churn_handles)
+
+    # warm-up (compilation)
+    datablock.release(churn_handles)
+    churn_handles = datablock.append(num_churn_blocks * block_size, reuse_inactive_block=True)
+
+    release_time = 0.0
+    append_time = 0.0
+    for _ in range(rounds):
+        start_time = time.perf_counter()
+        datablock.release(churn_handles)
+        release_time += time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        churn_handles = datablock.append(num_churn_blocks * block_size, reuse_inactive_block=True)
+        append_time += time.perf_counter() - start_time
+
+    assert len(datablock.blocks) == num_blocks + 1 # with the inactive block from DataBlock.clear()
+    num_processed_blocks = num_churn_blocks * rounds
+    return num_processed_blocks / release_time, num_processed_blocks / append_time
+
+def measure_storage(num_blocks, block_size = DEFAULT_BLOCK_SIZE, rounds = DEFAULT_ROUNDS, contiguous = False):
+    '''
+    Returns the (advect, snapshot, flatten, gather_into) time in seconds
+    '''
+    # the nodes and springs are allocated alternately (like objects added one by one)
+    nodes = core.DataBlock(Node, block_size, contiguous)
+    springs = core.DataBlock(Spring, block_size, contiguous)
+    for _ in range(num_blocks):
+        nodes.append(block_size)
+        springs.append(block_size)
+
+    num_nodes = num_blocks * block_size
+    integrator_lib.set_system_index(nodes, np.zeros(1, dtype=np.int32))
+    delta_v = np.zeros((num_nodes, 2))
+    integrator_lib.advect(nodes, delta_v, 0.01) # warm-up (compilation)
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        integrator_lib.advect(nodes, delta_v, 0.01)
+    advect_time = (time.perf_counter() - start_time) / rounds
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        nodes.snapshot()
+    snapshot_time = (time.perf_counter() - start_time) / rounds
+
+    nodes.flatten('x') # warm-up (compilation)
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        nodes.flatten('x')
+    flatten_time = (time.perf_counter() - start_time) / rounds
+
+    buffer = np.empty((num_nodes, 2))
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        nodes.gather_into('x', buffer)
+    gather_time = (time.perf_counter() - start_time) / rounds
+
+    return advect_time, snapshot_time, flatten_time, gather_time
+
+def run(num_blocks_list = DEFAULT_NUM_BLOCKS, block_size = DEFAULT_BLOCK_SIZE, rounds = DEFAULT_ROUNDS):
+    print('--- Allocator ---')
+    print('%10s %18s %18s' % ('blocks', 'release blocks/s', 'append blocks/s'))
+    for num_blocks in num_blocks_list:
+        release_throughput, append_throughput = measure(num_blocks, block_size, rounds)
+        print('%10d %18.3e %18.3e' % (num_blocks, release_throughput, append_throughput))
+
+    print('--- Storage ---')
+    print('%10s %12s %14s %14s %14s %14s' % ('blocks', 'contiguous', 'advect ms', 'snapshot ms',
+                                             'flatten ms', 'gather ms'))
+    for num_blocks in num_blocks_list:
+        for contiguous in (False, True):
+            timings = measure_storage(num_blocks, block_size, rounds, contiguous)
+            print('%10d %12s %14.3f %14.3f %14.3f %14.3f' % ((num_blocks, contiguous) +
+                                                             tuple(t * 1e3 for t in timings)))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='DataBlock allocator benchmark')
+    parser.add_argument('num_blocks', type=int, nargs='*', default=DEFAULT_NUM_BLOCKS)
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE)
+    args = parser.parse_args()
+    run(args.num_blocks, args.block_size, args.rounds)
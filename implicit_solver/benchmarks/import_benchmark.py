@@ -0,0 +1,65 @@
+"""
+@author: Vincent Bonnet
+@description : Measure the wall time of the package imports in fresh python processes
+Command line (from the implicit_solver folder) :
+    python -m benchmarks.import_benchmark [--repeat N] [--budget SECONDS]
+The process exits with an error when 'import lib' is above the budget
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# statements timed in a fresh interpreter
+IMPORT_STATEMENTS = {'python' : 'pass',
+                     'import lib' : 'import lib',
+                     'import lib.objects' : 'import lib.objects',
+                     'lib.CommandSolverDispatcher' : 'import lib; lib.CommandSolverDispatcher',
+                     'import host_app.rpc.server' : 'import host_app.rpc.server'}
+DEFAULT_BUDGET = 0.1 # in seconds for 'import lib' (without the interpreter startup)
+DEFAULT_REPEAT = 5
+
+def get_root_folder():
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def measure(statement, repeat = DEFAULT_REPEAT):
+    '''
+    Returns the wall times of 'python -c statement'
+    '''
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [get_root_folder(), env.get('PYTHONPATH')]))
+    wall_times = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        subprocess.run([sys.executable, '-c', statement], check=True, env=env,
+                       cwd=get_root_folder(), stdout=subprocess.DEVNULL)
+        wall_times.append(time.perf_counter() - start_time)
+    return wall_times
+
+def run(repeat = DEFAULT_REPEAT, budget = DEFAULT_BUDGET):
+    '''
+    Print the median wall time per statement and returns whether 'import lib' is within budget
+    '''
+    results = {}
+    for name, statement in IMPORT_STATEMENTS.items():
+        results[name] = statistics.median(measure(statement, repeat))
+
+    startup_time = results['python']
+    for name, wall_time in results.items():
+        print('%-30s %.3f sec (%.3f sec without startup)' % (name, wall_time, wall_time - startup_time))
+
+    import_time = results['import lib'] - startup_time
+    within_budget = import_time <= budget
+    print('import lib : %.3f sec / budget %.3f sec : %s' % (import_time, budget,
+                                                          'OK' if within_budget else 'FAILED'))
+    return within_budget
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Import time benchmark')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT)
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET)
+    args = parser.parse_args()
+    sys.exit(0 if run(args.repeat, args.budget) else 1)
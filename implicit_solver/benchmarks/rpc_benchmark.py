@@ -0,0 +1,64 @@
+"""
+@author: Vincent Bonnet
+@description : Measure the transport of the node positions through the RPC queues
+The queue lives in a manager process (like the server queues)
+pickle : the array is pickled through the queue proxy
+shared memory : the array is sent out-of-band (see host_app/rpc/transport.py)
+Command line (from the implicit_solver folder) :
+    python -m benchmarks.rpc_benchmark [--rounds N] [num_nodes ...]
+"""
+
+import argparse
+import time
+import numpy as np
+from multiprocessing.managers import SyncManager
+
+from host_app.rpc.transport import Transport
+
+DEFAULT_NUM_NODES = (1000, 100000, 1000000)
+DEFAULT_ROUNDS = 10
+
+def measure(queue, num_nodes, rounds = DEFAULT_ROUNDS):
+    '''
+    Returns the (pickle, shared memory) time in seconds of a queue round-trip
+    '''
+    positions = np.random.rand(num_nodes, 2)
+
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        queue.put(positions)
+        result = queue.get()
+    pickle_time = (time.perf_counter() - start_time) / rounds
+    assert np.array_equal(result, positions)
+
+    # the sender and the receiver sides
+    sender = Transport()
+    receiver = Transport()
+    start_time = time.perf_counter()
+    for _ in range(rounds):
+        queue.put(sender.encode(positions))
+        result = receiver.decode(queue.get())
+        sender.decode(receiver.encode(None)) # reply (the sender releases its segment)
+    shared_memory_time = (time.perf_counter() - start_time) / rounds
+    assert np.array_equal(result, positions)
+    sender.close()
+    receiver.close()
+
+    return pickle_time, shared_memory_time
+
+def run(num_nodes_list = DEFAULT_NUM_NODES, rounds = DEFAULT_ROUNDS):
+    manager = SyncManager()
+    manager.start()
+    queue = manager.Queue()
+    print('%10s %12s %18s' % ('nodes', 'pickle ms', 'shared memory ms'))
+    for num_nodes in num_nodes_list:
+        pickle_time, shared_memory_time = measure(queue, num_nodes, rounds)
+        print('%10d %12.3f %18.3f' % (num_nodes, pickle_time * 1e3, shared_memory_time * 1e3))
+    manager.shutdown()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='RPC transport benchmark')
+    parser.add_argument('num_nodes', type=int, nargs='*', default=DEFAULT_NUM_NODES)
+    parser.add_argument('--rounds', type=int, default=DEFAULT_ROUNDS)
+    args = parser.parse_args()
+    run(args.num_nodes, args.rounds)
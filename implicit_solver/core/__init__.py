@@ -4,5 +4,6 @@ from core.shape import Shape
 from core.shapes import WireShape, RectangleShape, BeamShape
 from core.data_block import DataBlock
 from core.details import Details
-from core.profiler import Profiler, timeit
+from core.profiler import Profiler, timeit, timeit_scope
 from core.dispatcher import CommandDispatcher
+from core.frame_cache import FrameCacheWriter, FrameCacheReader
@@ -1,3 +1,6 @@
 # in __init__.py
 
 from core.code_gen.decorators import vectorize, vectorize_block
+from core.code_gen.instrumentation import get_kernel_stats, reset_kernel_stats, print_kernel_stats
+from core.code_gen.instrumentation import CompileTimeRecorder
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED, clear_cache, get_cache_folder
@@ -3,15 +3,25 @@
 @description : Code Generation Helper
 """
 import inspect
+import os
 import re
 
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
+
+# instrument all the vectorized functions (except vectorize_block) by default
+INSTRUMENT_KERNELS = os.environ.get('IMPLICIT_SOLVER_INSTRUMENT_KERNELS', '0') == '1'
+
 class CodeGenOptions:
     def __init__(self, options):
         self.njit = options.get('njit', True)
-        self.parallel = options.get('parallel', False) # Unused
+        self.parallel = options.get('parallel', False) # prange over blocks
         self.debug = options.get('debug', False)
         self.fastmath = options.get('fastmath', False)
         self.block = options.get('block', False)
+        # count the visited blocks/elements and record the wall time (see instrumentation.py)
+        self.instrument = options.get('instrument', INSTRUMENT_KERNELS and not self.block)
+        # write the generated source in the kernel cache and cache the numba compilation
+        self.cache = options.get('cache', KERNEL_CACHE_ENABLED)
 
     def __str__(self):
         result = (
@@ -19,7 +29,9 @@ class CodeGenOptions:
             f'parallel {self.parallel}, '
             f'debug {self.debug}, '
             f'fastmath {self.fastmath}, '
-            f'block {self.block}')
+            f'block {self.block}, '
+            f'instrument {self.instrument}, '
+            f'cache {self.cache}')
 
         return result
 
@@ -117,11 +129,12 @@ class CodeGenHelper:
 
         # generate code for the numba decorator (njit)
         if self.options.njit:
-            numba_arguments = ('parallel','fastmath', 'debug')
-            numba_default_options = (False, False, False)
+            numba_arguments = ('parallel','fastmath', 'debug', 'cache')
+            numba_default_options = (False, False, False, False)
             codegen_options = (self.options.parallel,
                                self.options.fastmath,
-                               self.options.debug)
+                               self.options.debug,
+                               self.options.cache)
 
             args = []
             for i in range(len(codegen_options)):
@@ -169,26 +182,50 @@ class CodeGenHelper:
         writer.append('\n')
 
         # generate code to iterator over blocks and call the kernel
+        # the blocks are distributed over threads with the parallel option
+        # prange index is unsigned and cast to prevent unsafe cast on typed list
+        block_range = 'range'
+        block_index = '_i'
+        if self.options.parallel:
+            block_range = 'numba.prange'
+            block_index = 'numba.int64(_i)'
+
+        # the instrumented function returns the number of visited blocks and elements
+        # the counters are reduction variables with the parallel option
+        def append_kernel_call():
+            writer.append('if _active:')
+            writer.indent += 1
+            writer.append('kernel('+', '.join(inner_kernel_call_args) +')')
+            if self.options.instrument:
+                writer.append('_num_visited_blocks += 1')
+                writer.append(f'_num_visited_elements += {first_argument}[_handle][0][\'blockInfo_size\']')
+            writer.indent -= 1
+
+        if self.options.instrument:
+            writer.append('_num_visited_blocks = 0')
+            writer.append('_num_visited_elements = 0')
+
         writer.append('if _block_handles is None:' )
         writer.indent += 1
         writer.append(f'_num_blocks = len({first_argument})')
-        writer.append('for _handle in range(_num_blocks):')
+        writer.append(f'for _i in {block_range}(_num_blocks):')
         writer.indent += 1
+        writer.append(f'_handle = {block_index}')
         writer.append(f'_active = {first_argument}[_handle][0][\'blockInfo_active\']' )
-        writer.append('if _active:')
-        writer.indent += 1
-        writer.append('kernel('+', '.join(inner_kernel_call_args) +')')
-        writer.indent -= 3
+        append_kernel_call()
+        writer.indent -= 2
         writer.append('else:')
         writer.indent += 1
         writer.append('_num_blocks = len(_block_handles)' )
-        writer.append('for _i in range(_num_blocks):')
+        writer.append(f'for _i in {block_range}(_num_blocks):')
         writer.indent += 1
-        writer.append('_handle = _block_handles[_i]')
+        writer.append(f'_handle = _block_handles[{block_index}]')
         writer.append(f'_active = {first_argument}[_handle][0][\'blockInfo_active\']' )
-        writer.append('if _active:')
-        writer.indent += 1
-        writer.append('kernel('+', '.join(inner_kernel_call_args) +')')
+        append_kernel_call()
+        writer.indent -= 2
+
+        if self.options.instrument:
+            writer.append('return _num_visited_blocks, _num_visited_elements')
 
         # generate the code
         self.generated_function_source = writer.source()
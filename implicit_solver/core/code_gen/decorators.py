@@ -11,21 +11,39 @@ import numba
 
 import core
 import core.code_gen.code_gen_helper as gen
+import core.code_gen.instrumentation as instrumentation
+import core.code_gen.kernel_cache as kernel_cache
 
 def generate_vectorize_function(function, options : gen.CodeGenOptions):
     '''
     Returns a tuple (source code, function object)
+    The generated source is fetched from the kernel cache when the function is unchanged
     '''
     func_module = inspect.getmodule(function)
+    generated_function_name = 'vectorized_' + function.__name__
+
+    source = None
+    source_file_path = ''
+    if options.cache:
+        key = kernel_cache.get_cache_key(function, options)
+        source_file_path = kernel_cache.get_source_file_path(function, key)
+        source = kernel_cache.read_source(source_file_path)
+
     # Generate code
-    helper = gen.CodeGenHelper(options)
-    helper.generate_vectorized_function_source(function)
+    if source is None:
+        helper = gen.CodeGenHelper(options)
+        helper.generate_vectorized_function_source(function)
+        source = helper.generated_function_source
+        if options.cache and not kernel_cache.write_source(source_file_path, source):
+            # numba cannot cache a function without source file
+            options.cache = False
+            return generate_vectorize_function(function, options)
 
     # Compile code
-    generated_function_object = compile(helper.generated_function_source, '', 'exec')
+    generated_function_object = compile(source, source_file_path, 'exec')
     exec(generated_function_object, func_module.__dict__)
 
-    return helper.generated_function_source, getattr(func_module, helper.generated_function_name)
+    return source, getattr(func_module, generated_function_name)
 
 def convert_argument(arg):
     '''
@@ -39,29 +57,63 @@ def convert_argument(arg):
 
     return arg
 
-def vectorize(function=None, local={} , **options):
+def isDatablock(value):
     '''
-    Decorator with arguments to vectorize a function
+    Returns whether the argument 'arg' is a datablock
+    a list/tuple of numpy.void (array of complex datatypes) is also consider as a datablock
     '''
-    gen_options = gen.CodeGenOptions(options)
-    if function is None:
-        return functools.partial(vectorize, **options)
-
-    def isDatablock(value):
-        '''
-        Returns whether the argument 'arg' is a datablock
-        a list/tuple of numpy.void (array of complex datatypes) is also consider as a datablock
-        '''
-        if isinstance(value, core.DataBlock):
-            return True
+    if isinstance(value, core.DataBlock):
+        return True
 
-        if isinstance(value,numba.typed.List):
-            return isinstance(value[0], (numpy.ndarray, numpy.generic))
+    if isinstance(value,numba.typed.List):
+        return isinstance(value[0], (numpy.ndarray, numpy.generic))
 
-        return False
+    return False
 
-    @functools.wraps(function)
-    def execute(*args):
+class VectorizedFunction:
+    '''
+    Callable returned by the vectorize decorator
+    The code is generated on the first call or the first access to the generated function
+    (function, jit_function, source) to keep the code generation out of the module imports
+    '''
+    def __init__(self, function, options : gen.CodeGenOptions):
+        functools.update_wrapper(self, function)
+        self.options = options
+        self._source = None
+        self._function = None
+        self._jit_function = None
+
+    def _generate(self):
+        if self._jit_function is not None:
+            return
+
+        source, generated_function = generate_vectorize_function(self.__wrapped__, self.options)
+
+        # the instrumented function is a python function and cannot be called from jitted code
+        # the generated function remains available in 'jit_function'
+        self._source = source
+        self._function = generated_function
+        if self.options.instrument:
+            self._function = instrumentation.instrument(generated_function,
+                                                        instrumentation.kernel_name(self.__wrapped__))
+        self._jit_function = generated_function
+
+    @property
+    def source(self):
+        self._generate()
+        return self._source
+
+    @property
+    def function(self):
+        self._generate()
+        return self._function
+
+    @property
+    def jit_function(self):
+        self._generate()
+        return self._jit_function
+
+    def __call__(self, *args):
         '''
         Execute the function. At least one argument is expected
         From Book : Beazley, David, and Brian K. Jones. Python Cookbook: Recipes for Mastering Python 3. " O'Reilly Media, Inc.", 2013.
@@ -76,7 +128,7 @@ def vectorize(function=None, local={} , **options):
         first_argument = args[0] # argument to vectorize
         if isDatablock(first_argument):
             if len(first_argument) > 0:
-                execute.function(*arg_list)
+                self.function(*arg_list)
         elif isinstance(first_argument, (list, tuple)):
             for datablock in first_argument:
                 if not isDatablock(datablock):
@@ -84,19 +136,21 @@ def vectorize(function=None, local={} , **options):
 
                 if len(datablock) > 0:
                     arg_list[0] = convert_argument(datablock)
-                    execute.function(*arg_list)
+                    self.function(*arg_list)
         else:
             raise ValueError("The first argument should be a datablock or a list of datablocks")
 
         return True
 
-    source, function = generate_vectorize_function(function, gen_options)
-
-    execute.options = gen_options
-    execute.source = source
-    execute.function = function
+def vectorize(function=None, local={} , **options):
+    '''
+    Decorator with arguments to vectorize a function
+    '''
+    gen_options = gen.CodeGenOptions(options)
+    if function is None:
+        return functools.partial(vectorize, **options)
 
-    return execute
+    return VectorizedFunction(function, gen_options)
 
 def vectorize_block(*args, **kwargs):
     '''
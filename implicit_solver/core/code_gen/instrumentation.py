@@ -0,0 +1,123 @@
+"""
+@author: Vincent Bonnet
+@description : Registry of the statistics recorded by the instrumented vectorized functions
+@generate.vectorize(instrument=True) or IMPLICIT_SOLVER_INSTRUMENT_KERNELS=1 to instrument all kernels
+The compilation times of the jitted functions are recorded with CompileTimeRecorder
+"""
+
+import functools
+import time
+from numba.core import event
+
+class KernelStats:
+    def __init__(self, name):
+        self.name = name
+        self.num_calls = 0
+        self.num_blocks = 0 # visited active blocks
+        self.num_elements = 0 # processed elements from the active blocks
+        self.elapsed_time_ns = 0
+
+    def add(self, num_blocks, num_elements, elapsed_time_ns):
+        self.num_calls += 1
+        self.num_blocks += num_blocks
+        self.num_elements += num_elements
+        self.elapsed_time_ns += elapsed_time_ns
+
+    def elapsed_time(self):
+        return self.elapsed_time_ns * 1e-9
+
+    def elements_per_second(self):
+        if self.elapsed_time_ns == 0:
+            return 0.0
+        return self.num_elements / self.elapsed_time()
+
+    def __str__(self):
+        return ('%s calls=%d blocks=%d elements=%d time=%.3fms throughput=%.3e elements/sec' %
+                (self.name, self.num_calls, self.num_blocks, self.num_elements,
+                 self.elapsed_time_ns * 1e-6, self.elements_per_second()))
+
+_registry = {} # kernel name -> KernelStats
+
+def kernel_name(function):
+    '''
+    Returns the name of the kernel in the registry (module.function)
+    '''
+    module_name = function.__module__.rsplit('.', 1)[-1]
+    return f'{module_name}.{function.__name__}'
+
+def instrument(function, name):
+    '''
+    Returns a python function recording the statistics of the generated function
+    The generated function returns the number of visited blocks and elements
+    '''
+    stats = _registry.setdefault(name, KernelStats(name))
+
+    @functools.wraps(function)
+    def execute(*args):
+        start_time = time.perf_counter_ns()
+        num_blocks, num_elements = function(*args)
+        stats.add(num_blocks, num_elements, time.perf_counter_ns() - start_time)
+        return num_blocks, num_elements
+
+    return execute
+
+def get_kernel_stats(name=None):
+    '''
+    Returns the statistics of a kernel or the list of statistics sorted by elapsed time
+    '''
+    if name is not None:
+        return _registry[name]
+
+    return sorted(_registry.values(), key=lambda stats: stats.elapsed_time_ns, reverse=True)
+
+def reset_kernel_stats():
+    for stats in _registry.values():
+        stats.__init__(stats.name)
+
+def print_kernel_stats():
+    print("--- Kernel Statistics ---")
+    for stats in get_kernel_stats():
+        print(stats)
+
+class CompileTimeRecorder(event.Listener):
+    '''
+    Record the compilation time per jitted function from the numba compile events
+    The time of a function excludes the compilation of its callees
+    Usage :
+        with CompileTimeRecorder() as recorder:
+            ...
+        recorder.compile_times # kernel name -> seconds
+    '''
+    def __init__(self):
+        self.compile_times = {}
+        self._stack = [] # [name, start time, callee time]
+
+    def on_start(self, event):
+        name = kernel_name(event.data['dispatcher'].py_func)
+        self._stack.append([name, time.perf_counter(), 0.0])
+
+    def on_end(self, event):
+        if not self._stack:
+            return
+        name, start_time, callee_time = self._stack.pop()
+        elapsed_time = time.perf_counter() - start_time
+        if self._stack:
+            self._stack[-1][2] += elapsed_time
+        self.compile_times[name] = self.compile_times.get(name, 0.0) + elapsed_time - callee_time
+
+    def total_time(self):
+        return sum(self.compile_times.values())
+
+    def __enter__(self):
+        event.register('numba:compile', self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        event.unregister('numba:compile', self)
+        return False
+
+    def print_compile_times(self):
+        print("--- Compile Times ---")
+        for name, elapsed_time in sorted(self.compile_times.items(), key=lambda item: item[1], reverse=True):
+            print('%s %.3f sec' % (name, elapsed_time))
+        print('total %.3f sec' % self.total_time())
@@ -0,0 +1,101 @@
+"""
+@author: Vincent Bonnet
+@description : On-disk cache of the generated source code
+The generated source is written into a file keyed by the hash of the original function source,
+the module source, the code generator source and the code generation options.
+Numba can only cache (cache=True) functions defined in a file
+the compiled kernels are stored by numba in the __pycache__ folder next to the generated files
+The cache is opt-in (IMPLICIT_SOLVER_KERNEL_CACHE=1), it also applies to the jitted functions
+of the package (@numba.njit(cache=KERNEL_CACHE_ENABLED)) because numba doesn't invalidate
+a cached function when a jitted callee or a datablock type changes in another module
+"""
+
+import hashlib
+import inspect
+import os
+import shutil
+
+# IMPLICIT_SOLVER_KERNEL_CACHE=1 enables the cache
+KERNEL_CACHE_ENABLED = os.environ.get('IMPLICIT_SOLVER_KERNEL_CACHE', '0') == '1'
+DEFAULT_CACHE_FOLDER = os.path.join(os.path.expanduser('~'), '.cache', 'implicit_solver', 'kernels')
+PACKAGE_FOLDER = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_file_hashes = {} # file path -> hash of the file content
+
+def get_cache_folder():
+    return os.environ.get('IMPLICIT_SOLVER_KERNEL_CACHE_DIR', DEFAULT_CACHE_FOLDER)
+
+def _file_hash(file_path):
+    file_hash = _file_hashes.get(file_path)
+    if file_hash is None:
+        with open(file_path, 'rb') as f:
+            file_hash = hashlib.sha256(f.read()).hexdigest()
+        _file_hashes[file_path] = file_hash
+    return file_hash
+
+def _dependency_file_paths(function):
+    '''
+    Returns the source files of the package modules imported by the module of the function
+    (the modules of the jitted callees)
+    '''
+    file_paths = set()
+    for value in list(function.__globals__.values()):
+        module = value if inspect.ismodule(value) else inspect.getmodule(value)
+        file_path = getattr(module, '__file__', None)
+        if file_path and os.path.abspath(file_path).startswith(PACKAGE_FOLDER + os.sep):
+            file_paths.add(os.path.abspath(file_path))
+    return sorted(file_paths)
+
+def get_cache_key(function, options):
+    '''
+    Returns the hash identifying the generated source of a function
+    The modules imported by the module of the function are part of the key
+    but not their own imports (see clear_cache)
+    '''
+    generator_file_path = os.path.join(os.path.dirname(__file__), 'code_gen_helper.py')
+    key = hashlib.sha256()
+    key.update(inspect.getsource(function).encode())
+    key.update(_file_hash(inspect.getfile(function)).encode())
+    for file_path in _dependency_file_paths(function):
+        key.update(_file_hash(file_path).encode())
+    key.update(_file_hash(generator_file_path).encode())
+    key.update(str(options).encode())
+    return key.hexdigest()
+
+def get_source_file_path(function, key):
+    module_name = function.__module__.replace('.', '_')
+    file_name = f'{module_name}_{function.__name__}_{key[:16]}.py'
+    return os.path.join(get_cache_folder(), file_name)
+
+def read_source(file_path):
+    '''
+    Returns the cached source or None
+    '''
+    if not os.path.isfile(file_path):
+        return None
+
+    with open(file_path, 'r') as f:
+        return f.read()
+
+def write_source(file_path, source):
+    '''
+    Write the source into the cache (atomic to support concurrent processes)
+    Returns False when the cache folder is not writable
+    '''
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        tmp_file_path = f'{file_path}.{os.getpid()}.tmp'
+        with open(tmp_file_path, 'w') as f:
+            f.write(source)
+        os.replace(tmp_file_path, file_path)
+    except OSError:
+        return False
+
+    return True
+
+def clear_cache():
+    '''
+    Remove the generated sources and the compiled kernels
+    Required when a jitted function called indirectly by a kernel changed
+    '''
+    shutil.rmtree(get_cache_folder(), ignore_errors=True)
@@ -11,25 +11,44 @@ Single Block Memory Layout (with x, v, b as channels)
 |blockInfo_size        (int64)|
 |blockInfo_capacity    (int64)|
 |blockInfo_active      (bool) |
+|blockInfo_queued      (bool) |
 |-----------------------------|
 
 blockInfo_size is the number of set elements in the Block
 blockInfo_capacity is the maximum numbe of element in the Block
 blockInfo_active defines whether or not the Block is active
+blockInfo_queued defines whether or not the Block is in the free list
 
 Datablock is a list of Blocks
+The inactive blocks are stored in a free list (stack) to be reused in O(1)
+
+Contiguous storage (optional) : the blocks are views of a single array (arena)
+|block 0|block 1|block 2|...|capacity|
+The arena capacity is doubled when it is full and the blocks are updated to the new arena
+The views returned before (field_view, block_view) still point to the previous arena
+(IMPLICIT_SOLVER_CONTIGUOUS_DATABLOCKS=1 to enable it by default)
 """
 
+import math
+import os
 import numba
 import numpy as np
 import keyword
 import core.jit.block_utils as block_utils
+import core.jit.item_utils as item_utils
+
+CONTIGUOUS_STORAGE = os.environ.get('IMPLICIT_SOLVER_CONTIGUOUS_DATABLOCKS', '0') == '1'
 
 class DataBlock:
 
-    def __init__(self, class_type, block_size = 100):
+    def __init__(self, class_type, block_size = 100, contiguous = None):
         # Data
         self.blocks = numba.typed.List()
+        # Contiguous storage of the blocks (None when the blocks are allocated separately)
+        self.contiguous = CONTIGUOUS_STORAGE if contiguous is None else contiguous
+        self.arena = None
+        # Inactive blocks to reuse (see release)
+        self.free_block_handles = None
         # Datatype
         self.dtype_block = None
         # Default values
@@ -40,6 +59,8 @@ class DataBlock:
         self.ID_field_index = -1
         # Set class
         self.__set_dtype(class_type)
+        # Block with the default values (copied into the appended blocks)
+        self.default_block = self.__create_default_block()
         self.clear()
 
     def num_blocks(self):
@@ -56,19 +77,26 @@ class DataBlock:
         self.blocks = numba.typed.List()
         # append inactive block
         # it prevents to have empty list which would break the JIT compile to work
-        block = np.empty(1, dtype=self.dtype_block)
+        if self.contiguous:
+            self.arena = np.empty(1, dtype=self.dtype_block)
+            block = self.arena[0:1]
+        else:
+            block = np.empty(1, dtype=self.dtype_block)
         block[0]['blockInfo_active'] = False
+        block[0]['blockInfo_queued'] = True
         block[0]['blockInfo_capacity'] = self.block_size
         block[0]['blockInfo_size'] = 0
         block[0]['blockInfo_handle'] = -1
         self.blocks.append(block)
+        self.free_block_handles = block_utils.empty_block_handles()
+        self.free_block_handles.append(0)
 
     @classmethod
     def __check_before_add(cls, field_names, name):
         '''
         Raise exception if 'name' cannot be added
         '''
-        if name in ['blockInfo_size', 'blockInfo_active', 'blockInfo_capacity', 'blockInfo_handle']:
+        if name in ['blockInfo_size', 'blockInfo_active', 'blockInfo_queued', 'blockInfo_capacity', 'blockInfo_handle']:
             raise ValueError("field name " + name + " is reserved ")
 
         if keyword.iskeyword(name):
@@ -110,8 +138,8 @@ class DataBlock:
         self.defaults = tuple(default_values)
 
         # add block info
-        block_type['names'] += ['blockInfo_size', 'blockInfo_capacity', 'blockInfo_active', 'blockInfo_handle']
-        block_type['formats'] += [np.int64, np.int64, np.bool, np.int32]
+        block_type['names'] += ['blockInfo_size', 'blockInfo_capacity', 'blockInfo_active', 'blockInfo_queued', 'blockInfo_handle']
+        block_type['formats'] += [np.int64, np.int64, np.bool, np.bool, np.int32]
 
         # create datatype
         self.dtype_block = np.dtype(block_type, align=True)
@@ -120,6 +148,14 @@ class DataBlock:
         if 'ID' in block_type['names']:
             self.ID_field_index = block_type['names'].index('ID')
 
+    def __create_default_block(self):
+        block = np.zeros(1, dtype=self.dtype_block)
+        for field_id, default_value in enumerate(self.defaults):
+            if field_id != self.ID_field_index:
+                block[0][field_id][:] = default_value
+        block[0]['blockInfo_capacity'] = self.block_size
+        return block
+
     def initialize(self, num_elements):
         '''
         Initialize blocks and return new block ids
@@ -131,27 +167,22 @@ class DataBlock:
         '''
         Return a list of new blocks
         Initialize with default values
+        The released blocks are reused first when reuse_inactive_block is set
         '''
-        init_block_func = block_utils.init_block
+        append_blocks_func = block_utils.append_blocks
         if self.ID_field_index >= 0:
-            init_block_func = block_utils.init_block_with_ID
-
-        block_handles = block_utils.append_blocks(self.blocks,
-                                                  reuse_inactive_block,
-                                                  num_elements,
-                                                  init_block_func)
-        if set_defaults==False:
-            return block_handles
-
-        for block_handle in block_handles:
-            block_container = self.blocks[block_handle]
-            for field_id, default_value in enumerate(self.defaults):
-                if field_id == self.ID_field_index:
-                    continue
+            append_blocks_func = block_utils.append_blocks_with_ID
 
-                block_container[0][field_id][:] = default_value
+        if self.contiguous:
+            self.__reserve(len(self.blocks) + math.ceil(num_elements / self.block_size))
 
-        return block_handles
+        return append_blocks_func(self.blocks,
+                                  self.free_block_handles,
+                                  reuse_inactive_block,
+                                  num_elements,
+                                  self.default_block,
+                                  set_defaults,
+                                  self.arena)
 
     def append_empty(self, num_elements, reuse_inactive_block = False):
         '''
@@ -159,9 +190,186 @@ class DataBlock:
         '''
         return self.append(num_elements, reuse_inactive_block, False)
 
+    def __reserve(self, num_blocks):
+        '''
+        Grow the arena (by doubling) to store at least num_blocks blocks
+        '''
+        capacity = len(self.arena)
+        if num_blocks <= capacity:
+            return
+
+        arena = np.empty(max(num_blocks, capacity * 2), dtype=self.dtype_block)
+        arena[:len(self.blocks)] = self.arena[:len(self.blocks)]
+        self.arena = arena
+        block_utils.set_blocks_from_arena(self.blocks, self.arena, len(self.blocks))
+
+    def snapshot(self):
+        '''
+        Returns a copy of the blocks as a single array (num_blocks,)
+        It is a single copy with the contiguous storage
+        '''
+        if self.contiguous:
+            return self.arena[:len(self.blocks)].copy()
+
+        return np.concatenate(list(self.blocks))
+
+    def restore(self, snapshot, copy = True):
+        '''
+        Set the blocks from a snapshot
+        The block handles and the IDs of the snapshot remain valid
+        With the contiguous storage and copy=False, the snapshot becomes the arena (no copy)
+        '''
+        if self.contiguous:
+            if copy:
+                self.arena = np.array(snapshot, dtype=self.dtype_block)
+            else:
+                self.arena = np.asarray(snapshot, dtype=self.dtype_block)
+            block_utils.set_blocks_from_arena(self.blocks, self.arena, len(self.arena))
+        else:
+            block_utils.set_blocks_from_array(self.blocks, np.asarray(snapshot, dtype=self.dtype_block))
+        self.free_block_handles = block_utils.rebuild_free_block_handles(self.blocks)
+
+    def release(self, block_handles):
+        '''
+        Disable the blocks and add them into the free list
+        '''
+        block_utils.release_blocks(self.blocks, self.free_block_handles, block_handles)
+
+    def set_active(self, block_handles, active):
+        '''
+        Enable or disable the blocks
+        The disabled blocks are released into the free list
+        '''
+        if active:
+            block_utils.activate_blocks(self.blocks, block_handles)
+        else:
+            self.release(block_handles)
+
     def __len__(self):
         return len(self.blocks)
 
+    '''
+    Compaction Functions
+    '''
+    def fragmentation_stats(self):
+        '''
+        Returns the block usage of the datablock
+        num_releasable_blocks is the number of inactive blocks released by compact()
+        fragmentation is the unused capacity ratio (inactive blocks and partially filled blocks)
+        '''
+        num_blocks = len(self.blocks)
+        num_active_blocks = len(block_utils.get_active_block_handles(self.blocks))
+        num_elements = int(block_utils.compute_num_elements(self.blocks))
+        active_capacity = num_active_blocks * self.block_size
+        stats = {}
+        stats['num_blocks'] = num_blocks
+        stats['num_active_blocks'] = num_active_blocks
+        stats['num_inactive_blocks'] = num_blocks - num_active_blocks
+        # a datablock keeps at least one block
+        stats['num_releasable_blocks'] = num_blocks - max(num_active_blocks, 1)
+        stats['num_elements'] = num_elements
+        stats['min_num_blocks'] = max(math.ceil(num_elements / self.block_size), 1)
+        stats['occupancy'] = num_elements / active_capacity if active_capacity > 0 else 1.0
+        stats['fragmentation'] = 1.0 - num_elements / (num_blocks * self.block_size)
+        return stats
+
+    def compact(self, block_handles_groups = ()):
+        '''
+        Repack the elements into the fewest blocks and release the inactive blocks
+        block_handles_groups is a list of block handles (one per owner object)
+        The elements of a group are packed together and the block handles of the group are updated in place
+        The active blocks outside of the groups are packed together after the groups
+        Returns the ID map to remap the IDs referring to this datablock (see remap_IDs)
+        id_map[block_handle][index] is the new ID of an element or (-1, -1) for the released elements
+        '''
+        old_blocks = list(self.blocks)
+        id_map = np.full((len(old_blocks), self.block_size, item_utils.ID_SIZE), -1, dtype=np.int32)
+
+        groups = []
+        grouped_handles = set()
+        for block_handles in block_handles_groups:
+            groups.append([h for h in block_handles if old_blocks[h][0]['blockInfo_active']])
+            grouped_handles.update(block_handles)
+        groups.append([h for h in range(len(old_blocks))
+                       if old_blocks[h][0]['blockInfo_active'] and h not in grouped_handles])
+
+        new_blocks = numba.typed.List()
+        new_block_handles_groups = []
+        for group in groups:
+            new_block_handles_groups.append(self.__repack(old_blocks, group, new_blocks, id_map))
+
+        # a datablock keeps at least one block
+        if len(new_blocks) == 0:
+            new_blocks.append(block_utils.empty_like_block(self.blocks))
+
+        # update in place : the details and the objects refer to these lists
+        if self.contiguous:
+            self.arena = np.concatenate(list(new_blocks))
+            block_utils.set_blocks_from_arena(self.blocks, self.arena, len(self.arena))
+        else:
+            block_utils.replace_blocks(self.blocks, new_blocks)
+        self.free_block_handles = block_utils.rebuild_free_block_handles(self.blocks)
+        for block_handles, new_block_handles in zip(block_handles_groups, new_block_handles_groups):
+            block_utils.replace_block_handles(block_handles, np.asarray(new_block_handles, dtype=np.int64))
+
+        return id_map
+
+    def __repack(self, old_blocks, block_handles, new_blocks, id_map):
+        '''
+        Copy the elements of the blocks 'block_handles' into new full blocks
+        Returns the handles of the new blocks
+        '''
+        num_elements = 0
+        for block_handle in block_handles:
+            num_elements += old_blocks[block_handle][0]['blockInfo_size']
+
+        new_block_handles = []
+        for block_index in range(math.ceil(num_elements / self.block_size)):
+            block_handle = len(new_blocks)
+            block_n_elements = min(self.block_size, num_elements - block_index * self.block_size)
+            block = np.empty_like(old_blocks[0])
+            block[0]['blockInfo_capacity'] = self.block_size
+            if self.ID_field_index >= 0:
+                block_utils.init_block_with_ID(block, block_n_elements, block_handle)
+            else:
+                block_utils.init_block(block, block_n_elements, block_handle)
+            new_blocks.append(block)
+            new_block_handles.append(block_handle)
+
+        # copy the fields (except the ID) from the old blocks into the new blocks
+        num_fields = len(self.defaults)
+        dst_block_index = 0
+        dst_index = 0
+        for block_handle in block_handles:
+            src_data = old_blocks[block_handle][0]
+            src_size = src_data['blockInfo_size']
+            src_index = 0
+            while src_index < src_size:
+                dst_handle = new_block_handles[dst_block_index]
+                dst_data = new_blocks[dst_handle][0]
+                count = min(src_size - src_index, self.block_size - dst_index)
+                for field_id in range(num_fields):
+                    if field_id != self.ID_field_index:
+                        dst_data[field_id][dst_index:dst_index+count] = src_data[field_id][src_index:src_index+count]
+
+                id_map[block_handle, src_index:src_index+count, 0] = dst_handle
+                id_map[block_handle, src_index:src_index+count, 1] = np.arange(dst_index, dst_index+count)
+
+                src_index += count
+                dst_index += count
+                if dst_index == self.block_size:
+                    dst_block_index += 1
+                    dst_index = 0
+
+        return new_block_handles
+
+    def remap_IDs(self, field_name, id_map, block_handles = None):
+        '''
+        Remap the IDs stored in the field 'field_name' with the ID map from compact()
+        '''
+        data_ids = self.flatten(field_name, block_handles)
+        self.copyto(field_name, item_utils.remap_data_ids(data_ids, id_map), block_handles)
+
     def get_field_names(self):
         return self.block(0).dtype.names
 
@@ -203,18 +411,53 @@ class DataBlock:
             block_data = block_container[0]
             block_data[field_name].fill(value)
 
+    def __field_format(self, field_id):
+        first_value = self.block(0)[field_id][0]
+        return (first_value.dtype.type, first_value.shape)
+
     def flatten(self, field_name, block_handles = None):
         '''
         Convert block of array into a single array
         '''
         field_id = self.get_field_names().index(field_name)
-        first_value = self.block(0)[field_id][0]
-        field_type = first_value.dtype.type
-        field_shape = first_value.shape
-        field_format =(field_type, field_shape)
         num_elements = block_utils.compute_num_elements(self.blocks, block_handles)
-        result = np.empty(num_elements, field_format)
+        result = np.empty(num_elements, self.__field_format(field_id))
+        return self.gather_into(field_name, result, block_handles)
 
+    def __packed_view(self, field_name, block_handles):
+        '''
+        Returns (view (num_blocks, block_size, ...), num_elements) into the arena
+        when the blocks are consecutive and fully packed or (None, 0) otherwise
+        '''
+        if not self.contiguous:
+            return None, 0
+
+        if block_handles is None:
+            block_handles = block_utils.get_active_block_handles(self.blocks)
+        first_handle, num_blocks, num_elements = block_utils.packed_block_range(self.blocks, block_handles)
+        if first_handle < 0:
+            return None, 0
+
+        return self.arena[first_handle:first_handle+num_blocks][field_name], num_elements
+
+    def gather_into(self, field_name, out, block_handles = None):
+        '''
+        Copy the elements of a field into the caller buffer 'out' (no allocation)
+        Returns the view out[:num_elements]
+        '''
+        view, num_elements = self.__packed_view(field_name, block_handles)
+        if view is not None:
+            if num_elements > len(out):
+                raise ValueError("gather_into() buffer too small for the field " + field_name)
+            # full blocks in a single copy then the last block
+            num_full_blocks = num_elements // self.block_size
+            num_full_elements = num_full_blocks * self.block_size
+            np.copyto(out[:num_full_elements].reshape(view[:num_full_blocks].shape), view[:num_full_blocks])
+            if num_full_elements < num_elements:
+                np.copyto(out[num_full_elements:num_elements], view[num_full_blocks][:num_elements-num_full_elements])
+            return out[:num_elements]
+
+        field_id = self.get_field_names().index(field_name)
         num_elements = 0
         for block_container in self.get_blocks(block_handles):
             block_data = block_container[0]
@@ -222,6 +465,48 @@ class DataBlock:
             block_n_elements = block_data['blockInfo_size']
             num_elements += block_n_elements
             end_index = num_elements
-            np.copyto(result[begin_index:end_index], block_data[field_id][0:block_n_elements])
+            if end_index > len(out):
+                raise ValueError("gather_into() buffer too small for the field " + field_name)
+            np.copyto(out[begin_index:end_index], block_data[field_id][0:block_n_elements])
+
+        return out[:num_elements]
+
+    def field_view(self, field_name, block_handles = None):
+        '''
+        Returns the elements of a field as a single array
+        It is a view on the block (no copy) when the elements are stored in a single block
+        and a gather (see flatten) otherwise
+        The result is read-only in both cases (use copyto to write into the datablock)
+        The view is invalidated by append (the arena may grow), compact and restore,
+        it keeps the previous values and has to be requested again
+        '''
+        blocks = list(self.get_blocks(block_handles))
+        if len(blocks) == 1:
+            block_data = blocks[0][0]
+            view = block_data[field_name][0:block_data['blockInfo_size']]
+        else:
+            view = self.flatten(field_name, block_handles)
+
+        view.flags.writeable = False
+        return view
+
+    def block_view(self, field_name, block_handles = None):
+        '''
+        Returns a field as an array (num_blocks, block_size, ...) of the active blocks
+        It is a strided view into the arena (no copy) when the storage is contiguous
+        and the blocks are consecutive and fully packed, otherwise the blocks are gathered
+        The elements beyond blockInfo_size of a block are unused
+        The result is read-only in both cases (use copyto to write into the datablock)
+        The view is invalidated by append (the arena may grow), compact and restore
+        '''
+        view, _ = self.__packed_view(field_name, block_handles)
+        if view is None:
+            field_id = self.get_field_names().index(field_name)
+            block_fields = [block_container[0][field_id] for block_container in self.get_blocks(block_handles)]
+            if len(block_fields) == 0:
+                view = np.empty((0, self.block_size), self.__field_format(field_id))
+            else:
+                view = np.stack(block_fields)
 
-        return result
+        view.flags.writeable = False
+        return view
@@ -1,22 +1,61 @@
 """
 @author: Vincent Bonnet
 @description : details contains a collection of datablocks
+The block size of each datatype is read from a json config {datatype name : block size}
+written by benchmarks/block_size_benchmark.py (IMPLICIT_SOLVER_BLOCK_SIZES to use another file)
 """
 
+import json
+import os
 import core
 from collections import namedtuple
 
+DEFAULT_BLOCK_SIZE = 100
+BLOCK_SIZE_CONFIG = os.environ.get('IMPLICIT_SOLVER_BLOCK_SIZES',
+                                   os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                                'resources', 'block_sizes.json'))
+
+def load_block_sizes(path = None):
+    '''
+    Returns the block size per datatype name from the config (empty when there is no config)
+    '''
+    path = path or BLOCK_SIZE_CONFIG
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, 'r') as file:
+        return {name : int(block_size) for name, block_size in json.load(file).items()}
+
+def save_block_sizes(block_sizes, path = None):
+    with open(path or BLOCK_SIZE_CONFIG, 'w') as file:
+        json.dump(block_sizes, file, indent=4, sort_keys=True)
+
+def get_bundle_type(name, field_names):
+    '''
+    Returns the namedtuple type of a bundle
+    The type is registered in this module to be pickled by reference (numba cache)
+    '''
+    typename = name + 'BundleType_' + '_'.join(field_names)
+    bundle_type = globals().get(typename)
+    if bundle_type is None:
+        bundle_type = namedtuple(typename, field_names)
+        globals()[typename] = bundle_type
+    return bundle_type
+
 class Details:
     '''
     Details contains the datablocks
+    block_sizes overrides the block size per datatype name (see load_block_sizes)
     '''
-    def __init__(self, system_types, group_types):
+    def __init__(self, system_types, group_types, contiguous = None, block_sizes = None):
         self.db = {} # dictionnary of datablocks
 
-        # create datablock
-        block_size = 100
+        # create datablock (contiguous storage, see DataBlock)
+        self.block_sizes = load_block_sizes()
+        self.block_sizes.update(block_sizes or {})
         for datatype in system_types:
-            self.db[datatype.name()] = core.DataBlock(datatype, block_size)
+            block_size = self.block_sizes.get(datatype.name(), DEFAULT_BLOCK_SIZE)
+            self.db[datatype.name()] = core.DataBlock(datatype, block_size, contiguous)
 
         # add blocks as attributes
         for system_type in system_types:
@@ -33,7 +72,7 @@ class Details:
 
         if isinstance(datatype, (list, tuple)):
             typename = name+'BundleType'
-            setattr(self, typename, namedtuple(typename, get_names(datatype)))
+            setattr(self, typename, get_bundle_type(name, get_names(datatype)))
             setattr(self, name, getattr(self, typename)(*get_blocks(datatype)))
         else:
             setattr(self, name, self.db[datatype.name()].blocks)
@@ -0,0 +1,312 @@
+"""
+@author: Vincent Bonnet
+@description : Append-only cache of simulated frames (arrays per frame)
+
+Data File Layout (one chunk per frame)
+|-----------------------------|
+| header size (uint64)        |
+| json header                 | {'frame_id', 'time', 'arrays' : {name : array info}}
+| array 0 (bytes)             |
+| array 1 (bytes)             |
+|-----------------------------|
+| next chunk ...              |
+
+Index File Layout (path + '.index')
+|-----------------------------|
+| frame_id, offset, size      | (int64 x 3 per frame)
+|-----------------------------|
+
+Encodings of the arrays
+'raw' : the array bytes
+'keyframe' : (quantized) floating arrays quantized against their bounding box
+    q = round((x - min) / step) as uint16 with step = tolerance * largest bounding box extent
+'delta' : (quantized) floating arrays between keyframes
+    d = round((x - keyframe) / step) with the smallest integer type
+The integers are byte shuffled (low bytes then high bytes) and zlib compressed
+The quantization error is below step / 2 and doesn't accumulate (deltas from the keyframe)
+A keyframe is written every 'keyframe_interval' frames for the random access
+
+The chunks are written (and encoded) on a background thread, the index entry is written after its chunk
+A frame is read in O(1) : one read of the index entry and one read of the chunk (and its keyframe)
+"""
+
+import ast
+import json
+import os
+import queue
+import threading
+import zlib
+import numpy as np
+
+INDEX_ENTRY = np.dtype([('frame_id', np.int64), ('offset', np.int64), ('size', np.int64)])
+ARRAY_ALIGNMENT = 64
+MIN_TOLERANCE = 1.0 / 65535 # uint16 keyframe
+
+def get_index_path(path):
+    return path + '.index'
+
+def dtype_to_str(dtype):
+    return repr(np.lib.format.dtype_to_descr(dtype))
+
+def str_to_dtype(descr):
+    return np.lib.format.descr_to_dtype(ast.literal_eval(descr))
+
+def as_components(array):
+    # (num_elements, num_components) with the last axis as components (ex: x, y)
+    num_components = array.shape[-1] if array.ndim > 1 else 1
+    return array.reshape(-1, num_components)
+
+def shuffle_bytes(array):
+    # the bytes of same significance are stored together (better compression)
+    return zlib.compress(np.ascontiguousarray(array.view(np.uint8).reshape(-1, array.itemsize).T).tobytes())
+
+def unshuffle_bytes(data, dtype):
+    shuffled = np.frombuffer(zlib.decompress(data), dtype=np.uint8)
+    return np.ascontiguousarray(shuffled.reshape(dtype.itemsize, -1).T).view(dtype).reshape(-1)
+
+def encode_keyframe(array, tolerance):
+    '''
+    Returns (bytes, info, reconstructed keyframe) of a floating array
+    '''
+    values = as_components(array)
+    values_min = values.min(axis=0) if len(values) > 0 else np.zeros(values.shape[1])
+    values_max = values.max(axis=0) if len(values) > 0 else np.zeros(values.shape[1])
+    extent = float(np.max(values_max - values_min, initial=0.0))
+    step = (extent if extent > 0.0 else 1.0) * max(tolerance, MIN_TOLERANCE)
+    quantized = np.rint((values - values_min) / step).astype(np.uint16)
+    keyframe = values_min + quantized * step
+    info = {'min' : values_min.tolist(), 'step' : step}
+    return shuffle_bytes(quantized), info, keyframe
+
+def decode_keyframe(data, info):
+    values_min = np.asarray(info['min'])
+    quantized = unshuffle_bytes(data, np.dtype(np.uint16))
+    return values_min + quantized.reshape(-1, len(values_min)) * info['step']
+
+def encode_delta(array, keyframe, step):
+    '''
+    Returns (bytes, info) of a floating array from its reconstructed keyframe
+    '''
+    deltas = np.rint((as_components(array) - keyframe) / step)
+    max_delta = np.max(np.abs(deltas), initial=0.0)
+    for delta_dtype in (np.int8, np.int16, np.int32, np.int64):
+        if max_delta <= np.iinfo(delta_dtype).max:
+            break
+    info = {'delta_descr' : dtype_to_str(np.dtype(delta_dtype))}
+    return shuffle_bytes(deltas.astype(delta_dtype)), info
+
+def decode_delta(data, info, keyframe):
+    deltas = unshuffle_bytes(data, str_to_dtype(info['delta_descr']))
+    return keyframe + deltas.reshape(keyframe.shape) * info['step']
+
+class FrameCacheWriter:
+    '''
+    Write the frames on a background thread (write_frame doesn't wait on disk)
+    quantized : encode the floating arrays (keyframes and deltas, see module description)
+    tolerance : quantization step relative to the bounding box of an array
+    '''
+    def __init__(self, path, append = False, quantized = False, keyframe_interval = 10, tolerance = 1e-4):
+        self.path = path
+        mode = 'ab' if append else 'wb'
+        self.data_file = open(path, mode)
+        self.index_file = open(get_index_path(path), mode)
+        self.offset = self.data_file.seek(0, os.SEEK_END)
+        self.num_frames = self.index_file.seek(0, os.SEEK_END) // INDEX_ENTRY.itemsize
+        self.quantized = quantized
+        self.keyframe_interval = keyframe_interval
+        self.tolerance = tolerance
+        self.keyframes = {} # name : (frame index, shape, step, reconstructed keyframe)
+        self.error = None
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.__write_loop, daemon=True)
+        self.thread.start()
+
+    def write_frame(self, frame_id, arrays, time = 0.0):
+        '''
+        Queue a frame, 'arrays' is a dictionnary {name : array}
+        The arrays are owned by the cache (they must not be modified after this call)
+        '''
+        self.__raise_error()
+        self.queue.put((frame_id, time, arrays))
+
+    def flush(self):
+        '''
+        Wait until the queued frames are written
+        '''
+        self.queue.join()
+        self.__raise_error()
+
+    def close(self):
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+        self.data_file.close()
+        self.index_file.close()
+        self.__raise_error()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def __write_loop(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                if self.error is None:
+                    self.__write_chunk(*item)
+            except Exception as error:
+                self.error = error
+            finally:
+                self.queue.task_done()
+
+    def __encode(self, name, array):
+        '''
+        Returns (bytes, info) of an array
+        '''
+        info = {'encoding' : 'raw', 'descr' : dtype_to_str(array.dtype), 'shape' : list(array.shape)}
+        if not self.quantized or not np.issubdtype(array.dtype, np.floating):
+            return np.ascontiguousarray(array).tobytes(), info
+
+        keyframe_info = self.keyframes.get(name)
+        is_keyframe = self.num_frames % self.keyframe_interval == 0
+        if is_keyframe or keyframe_info is None or keyframe_info[1] != array.shape:
+            data, encoding_info, keyframe = encode_keyframe(array, self.tolerance)
+            self.keyframes[name] = (self.num_frames, array.shape, encoding_info['step'], keyframe)
+            info['encoding'] = 'keyframe'
+        else:
+            keyframe_index, _, step, keyframe = keyframe_info
+            data, encoding_info = encode_delta(array, keyframe, step)
+            encoding_info['keyframe'] = keyframe_index
+            encoding_info['step'] = step
+            info['encoding'] = 'delta'
+
+        info.update(encoding_info)
+        return data, info
+
+    def __write_chunk(self, frame_id, time, arrays):
+        # header with the array offsets (relative to the end of the header)
+        header = {'frame_id' : int(frame_id), 'time' : float(time), 'arrays' : {}}
+        data_size = 0
+        encoded_arrays = []
+        for name, array in arrays.items():
+            data, info = self.__encode(name, np.asarray(array))
+            if info['encoding'] == 'raw':
+                data_size = -(-data_size // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+            info['offset'] = data_size
+            info['size'] = len(data)
+            header['arrays'][name] = info
+            encoded_arrays.append((data_size, data))
+            data_size += len(data)
+
+        header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        if any(info['encoding'] == 'raw' for info in header['arrays'].values()):
+            header_bytes = header_bytes.ljust(-(-(len(header_bytes) + 8) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT - 8)
+        chunk = bytearray(8 + len(header_bytes) + data_size)
+        chunk[0:8] = np.uint64(len(header_bytes)).tobytes()
+        chunk[8:8+len(header_bytes)] = header_bytes
+        data_begin = 8 + len(header_bytes)
+        for data_offset, data in encoded_arrays:
+            begin = data_begin + data_offset
+            chunk[begin:begin+len(data)] = data
+
+        # data then index (an indexed frame is always complete)
+        self.data_file.write(chunk)
+        self.data_file.flush()
+        entry = np.array([(frame_id, self.offset, len(chunk))], dtype=INDEX_ENTRY)
+        self.index_file.write(entry.tobytes())
+        self.index_file.flush()
+        self.offset += len(chunk)
+        self.num_frames += 1
+
+class FrameCacheReader:
+    '''
+    Read the frames from a cache (the cache can be read while it is written)
+    '''
+    def __init__(self, path):
+        self.path = path
+        self.data_file = open(path, 'rb')
+        self.index_file = open(get_index_path(path), 'rb')
+        # last decoded keyframe (sequential reads decode a keyframe once)
+        self.keyframe_index = -1
+        self.keyframes = {} # name : keyframe
+
+    def num_frames(self):
+        return os.fstat(self.index_file.fileno()).st_size // INDEX_ENTRY.itemsize
+
+    def read_entry(self, index):
+        if index < 0:
+            index += self.num_frames()
+        if index < 0 or index >= self.num_frames():
+            raise IndexError("frame index out of range : " + str(index))
+        self.index_file.seek(index * INDEX_ENTRY.itemsize)
+        return np.frombuffer(self.index_file.read(INDEX_ENTRY.itemsize), dtype=INDEX_ENTRY)[0]
+
+    def __read_chunk(self, index):
+        '''
+        Returns (header, chunk, data offset) of the frame 'index'
+        '''
+        entry = self.read_entry(index)
+        self.data_file.seek(entry['offset'])
+        chunk = self.data_file.read(entry['size'])
+        header_size = int(np.frombuffer(chunk, dtype=np.uint64, count=1)[0])
+        header = json.loads(chunk[8:8+header_size].decode('utf-8'))
+        return header, chunk, 8 + header_size
+
+    def __store_keyframe(self, index, name, keyframe):
+        if index != self.keyframe_index:
+            self.keyframe_index = index
+            self.keyframes = {}
+        self.keyframes[name] = keyframe
+
+    def __keyframe(self, index, name):
+        if index != self.keyframe_index or name not in self.keyframes:
+            header, chunk, data_begin = self.__read_chunk(index)
+            info = header['arrays'][name]
+            begin = data_begin + info['offset']
+            self.__store_keyframe(index, name, decode_keyframe(chunk[begin:begin+info['size']], info))
+        return self.keyframes[name]
+
+    def read_frame(self, index):
+        '''
+        Returns (frame_id, time, {name : array}) of the frame 'index' (order of writing)
+        The raw arrays are read-only views of the chunk
+        '''
+        if index < 0:
+            index += self.num_frames()
+        header, chunk, data_begin = self.__read_chunk(index)
+        arrays = {}
+        for name, info in header['arrays'].items():
+            begin = data_begin + info['offset']
+            dtype = str_to_dtype(info['descr'])
+            shape = tuple(info['shape'])
+            if info['encoding'] == 'raw':
+                array = np.frombuffer(chunk, dtype=dtype, count=int(np.prod(shape)), offset=begin)
+            elif info['encoding'] == 'keyframe':
+                array = decode_keyframe(chunk[begin:begin+info['size']], info)
+                self.__store_keyframe(index, name, array)
+            else:
+                keyframe = self.__keyframe(info['keyframe'], name)
+                array = decode_delta(chunk[begin:begin+info['size']], info, keyframe)
+            arrays[name] = array.reshape(shape).astype(dtype, copy=False)
+        return header['frame_id'], header['time'], arrays
+
+    def close(self):
+        self.data_file.close()
+        self.index_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -8,29 +8,27 @@ import numba
 import numpy as np
 import core.jit.item_utils as item_utils
 import core.code_gen as generate
-
-@generate.vectorize_block
-def set_active(block, active):
-    block.blockInfo_active = active
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
 @generate.vectorize_block
 def _compute_num_elements(block, ref_counter):
     ref_counter += block.blockInfo_size
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def empty_block_handles():
     return numba.typed.List.empty_list(numba.int64)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def empty_like_block(blocks):
     block = np.empty_like(blocks[0])
     block[0]['blockInfo_active'] = False
+    block[0]['blockInfo_queued'] = False
     block[0]['blockInfo_capacity'] = blocks[0][0]['blockInfo_capacity']
     block[0]['blockInfo_size'] = 0
     block[0]['blockInfo_handle'] = -1
     return block
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def get_inactive_block_handles(blocks):
     handles = empty_block_handles()
     for block_index in range(len(blocks)):
@@ -38,57 +36,185 @@ def get_inactive_block_handles(blocks):
             handles.append(block_index)
     return handles
 
-@numba.njit
-def compute_num_elements(blocks, block_handles = None, func=_compute_num_elements.function):
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def rebuild_free_block_handles(blocks):
+    '''
+    Returns the free list of the inactive blocks and updates the queued flags
+    '''
+    handles = empty_block_handles()
+    for block_index in range(len(blocks)):
+        block_active = blocks[block_index][0]['blockInfo_active']
+        blocks[block_index][0]['blockInfo_queued'] = not block_active
+        if not block_active:
+            handles.append(block_index)
+    return handles
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def get_active_block_handles(blocks):
+    handles = empty_block_handles()
+    for block_index in range(len(blocks)):
+        if blocks[block_index][0]['blockInfo_active']:
+            handles.append(block_index)
+    return handles
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def replace_blocks(blocks, new_blocks):
+    # in place because the list is shared (details, bundles)
+    blocks.clear()
+    for block in new_blocks:
+        blocks.append(block)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def replace_block_handles(block_handles, new_block_handles):
+    # in place because the list is shared (objects, conditions)
+    block_handles.clear()
+    for block_handle in new_block_handles:
+        block_handles.append(block_handle)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def set_blocks_from_arena(blocks, arena, num_blocks):
+    # the blocks become views of the arena
+    blocks.clear()
+    for block_index in range(num_blocks):
+        blocks.append(arena[block_index:block_index+1])
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def set_blocks_from_array(blocks, array):
+    # the blocks are copies of the array elements
+    blocks.clear()
+    for block_index in range(len(array)):
+        block = np.empty_like(array[block_index:block_index+1])
+        block[:] = array[block_index:block_index+1]
+        blocks.append(block)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def packed_block_range(blocks, block_handles):
+    '''
+    Returns (first block handle, number of blocks, number of elements) of the active blocks
+    The first block handle is -1 when the blocks are not consecutive or not fully packed
+    (only the last block can be partially filled)
+    '''
+    first_handle = -1
+    num_blocks = 0
+    num_elements = 0
+    is_packed = True
+    for block_handle in block_handles:
+        block_data = blocks[block_handle][0]
+        if not block_data['blockInfo_active']:
+            continue
+        if num_blocks == 0:
+            first_handle = block_handle
+        elif block_handle != first_handle + num_blocks or num_elements != num_blocks * block_data['blockInfo_capacity']:
+            is_packed = False
+        num_blocks += 1
+        num_elements += block_data['blockInfo_size']
+
+    if not is_packed:
+        first_handle = -1
+    return first_handle, num_blocks, num_elements
+
+def compute_num_elements(blocks, block_handles = None):
     counter = np.zeros(1, dtype = np.int32) # use array to pass value as reference
-    func(blocks, counter, block_handles)
+    _compute_num_elements.function(blocks, counter, block_handles)
     return counter[0]
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def init_block(block, block_size, block_handle):
     block[0]['blockInfo_size'] = block_size
     block[0]['blockInfo_active'] = True
+    block[0]['blockInfo_queued'] = False
     block[0]['blockInfo_handle'] = block_handle
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def init_block_with_ID(block, block_size, block_handle):
     init_block(block, block_size, block_handle)
     data_ID = block[0]['ID']
     for index in range(block_size):
         item_utils.set_data_id(data_ID[index], block_handle,index)
 
-@numba.njit
-def append_blocks(blocks, reuse_inactive_block, num_elements, init_func = init_block):
-    inactive_block_handles = empty_block_handles()
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def pop_free_block_handle(blocks, free_block_handles):
+    '''
+    Returns an inactive block from the free list or -1 when the free list is empty
+    '''
+    while len(free_block_handles) > 0:
+        block_handle = free_block_handles.pop()
+        blocks[block_handle][0]['blockInfo_queued'] = False
+        # skip the blocks activated outside of the allocator
+        if blocks[block_handle][0]['blockInfo_active'] == False:
+            return block_handle
+    return -1
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def release_blocks(blocks, free_block_handles, block_handles):
+    '''
+    Disable the blocks and push them into the free list
+    The first released block is the first reused block
+    A block still in the free list (reactivated by activate_blocks) is not pushed again
+    '''
+    for i in range(len(block_handles)-1, -1, -1):
+        block_handle = block_handles[i]
+        block = blocks[block_handle]
+        if block[0]['blockInfo_active']:
+            block[0]['blockInfo_active'] = False
+            if not block[0]['blockInfo_queued']:
+                block[0]['blockInfo_queued'] = True
+                free_block_handles.append(block_handle)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def activate_blocks(blocks, block_handles):
+    '''
+    Enable the blocks, they remain in the free list (pop_free_block_handle skips the active blocks)
+    '''
+    for block_handle in block_handles:
+        blocks[block_handle][0]['blockInfo_active'] = True
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def append_blocks(blocks, free_block_handles, reuse_inactive_block, num_elements,
+                  default_block, set_defaults, arena):
     block_handles = empty_block_handles()
     block_size = blocks[0][0]['blockInfo_capacity']
 
-    # collect inactive block ids
-    if reuse_inactive_block:
-        inactive_block_handles = get_inactive_block_handles(blocks)
-
     # append blocks
     n_blocks = math.ceil(num_elements / block_size)
     for block_index in range(n_blocks):
 
         block_handle = -1
-        block = None
+        if reuse_inactive_block:
+            block_handle = pop_free_block_handle(blocks, free_block_handles)
 
-        if reuse_inactive_block and len(inactive_block_handles) > 0:
+        if block_handle >= 0:
             # reuse blocks
-            block_handle = inactive_block_handles.pop(0)
             block = blocks[block_handle]
         else:
-            # allocate a new block
+            # allocate a new block (from the arena with the contiguous storage)
             block_handle = len(blocks)
-            block = empty_like_block(blocks)
+            if arena is None:
+                block = empty_like_block(blocks)
+            else:
+                block = arena[block_handle:block_handle+1]
+                block[0]['blockInfo_capacity'] = block_size
             blocks.append(block)
 
+        if set_defaults:
+            block[:] = default_block[:]
+
         begin_index = block_index * block_size
         block_n_elements = min(block_size, num_elements-begin_index)
-        init_func(block, block_n_elements, block_handle)
+        init_block(block, block_n_elements, block_handle)
 
         # add block id to result
         block_handles.append(block_handle)
 
     return block_handles
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def append_blocks_with_ID(blocks, free_block_handles, reuse_inactive_block, num_elements,
+                          default_block, set_defaults, arena):
+    block_handles = append_blocks(blocks, free_block_handles, reuse_inactive_block,
+                                  num_elements, default_block, set_defaults, arena)
+    for block_handle in block_handles:
+        block = blocks[block_handle]
+        init_block_with_ID(block, block[0]['blockInfo_size'], block_handle)
+
+    return block_handles
@@ -7,20 +7,34 @@ This file could be auto-generated based on DataBlock
 
 import numba
 import numpy as np
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
 ID_SIZE = 2
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def empty_data_ids(num_nodes):
     return np.empty((num_nodes, ID_SIZE), dtype=np.int32)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def empty_data_id():
     return np.empty(ID_SIZE, dtype=np.int32)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def set_data_id(ID, block_handle, index):
     ID[0] = block_handle
     ID[1] = index
 
 
+
+def remap_data_ids(data_ids, id_map):
+    '''
+    Returns the data ids remapped with id_map[block_handle][index] (see DataBlock.compact)
+    The ids outside of the map (unset ids) are unchanged
+    '''
+    result = np.copy(data_ids)
+    block_handles = data_ids[..., 0]
+    indices = data_ids[..., 1]
+    valid = ((block_handles >= 0) & (block_handles < id_map.shape[0]) &
+             (indices >= 0) & (indices < id_map.shape[1]))
+    result[valid] = id_map[block_handles[valid], indices[valid]]
+    return result
@@ -1,21 +1,37 @@
 """
 @author: Vincent Bonnet
-@description : Simple profiler to benchmark code
+@description : Hierarchical profiler to benchmark code
+The timings are aggregated per call path (count, total, min, max, mean)
+and the latest logs are kept in a bounded timeline for the trace export
 """
 
+import collections
+import csv
 import functools
+import json
+import os
 import time
 
+# the profiler can be removed at import time (IMPLICIT_SOLVER_PROFILER=0)
+# then @timeit returns the undecorated methods
+PROFILER_ENABLED = os.environ.get('IMPLICIT_SOLVER_PROFILER', '1') != '0'
+# maximum number of logs/metrics kept in the timeline
+DEFAULT_MAX_LOGS = 100000
+# separator between the function names of a call path
+PATH_SEPARATOR = '/'
+
 class Profiler(object):
     '''
     Profiler Singleton
     '''
     class Log:
-        def __init__(self, function_name, call_depth):
+        def __init__(self, function_name, call_depth, call_path):
             self.function_name = function_name
             self.call_depth = call_depth
-            self.elapsed_time = 0
-            self.start_time = time.time()
+            self.call_path = call_path
+            self.elapsed_time = 0 # in seconds
+            self.start_time_ns = time.perf_counter_ns()
+            self.elapsed_time_ns = 0
 
         def __str__(self):
             result_log = '%r %2.3f sec' % (self.function_name, self.elapsed_time)
@@ -23,30 +39,168 @@ class Profiler(object):
             result_log = result_log.rjust(len(result_log) + num_spaces, ' ')
             return result_log
 
+    class Metric:
+        def __init__(self, name, value, call_depth, call_path):
+            self.name = name
+            self.call_depth = call_depth
+            self.call_path = call_path
+            self.value = value
+            self.time_ns = time.perf_counter_ns()
+
+        def __str__(self):
+            result_log = '%r %s' % (self.name, self.value)
+            num_spaces = self.call_depth * 3
+            result_log = result_log.rjust(len(result_log) + num_spaces, ' ')
+            return result_log
+
+    class Stats:
+        '''
+        Aggregated values of a call path (elapsed times in nanoseconds or metric values)
+        '''
+        def __init__(self):
+            self.count = 0
+            self.total = 0
+            self.min = None
+            self.max = None
+
+        def add(self, value):
+            self.count += 1
+            self.total += value
+            self.min = value if self.min is None else min(self.min, value)
+            self.max = value if self.max is None else max(self.max, value)
+
+        def mean(self):
+            if self.count == 0:
+                return 0
+            return self.total / self.count
+
     class __Profiler:
         def __init__(self):
-            self.logs = []
-            self.call_depth_counter = 0
+            self.enabled = True
+            self.logs = collections.deque(maxlen=DEFAULT_MAX_LOGS)
+            self.stats = {} # call path -> Stats of elapsed times
+            self.metric_stats = {} # call path -> Stats of metric values
+            self.call_stack = []
+            self.origin_time_ns = time.perf_counter_ns()
+
+        @property
+        def call_depth_counter(self):
+            return len(self.call_stack)
+
+        def enable(self):
+            self.enabled = True
+
+        def disable(self):
+            self.enabled = False
+
+        def is_recording(self):
+            '''
+            Returns whether the logs and metrics are recorded (see IMPLICIT_SOLVER_PROFILER)
+            '''
+            return PROFILER_ENABLED and self.enabled
+
+        def set_max_logs(self, max_logs):
+            '''
+            Set the capacity of the timeline, the oldest logs are discarded first
+            '''
+            self.logs = collections.deque(self.logs, maxlen=max_logs)
 
         def push_log(self, function_name):
-            log = Profiler.Log(function_name, self.call_depth_counter)
+            self.call_stack.append(function_name)
+            call_path = PATH_SEPARATOR.join(self.call_stack)
+            log = Profiler.Log(function_name, len(self.call_stack)-1, call_path)
             self.logs.append(log)
-            self.call_depth_counter += 1
             return log
 
         def pop_log(self, log):
-            log.elapsed_time = time.time() - log.start_time
-            self.call_depth_counter -= 1
+            log.elapsed_time_ns = time.perf_counter_ns() - log.start_time_ns
+            log.elapsed_time = log.elapsed_time_ns * 1e-9
+            if self.call_stack: # the logs might have been cleared during the call
+                self.call_stack.pop()
+
+            stats = self.stats.get(log.call_path)
+            if stats is None:
+                stats = Profiler.Stats()
+                self.stats[log.call_path] = stats
+            stats.add(log.elapsed_time_ns)
+
+        def push_metric(self, name, value):
+            '''
+            Record a value (iteration count, residual ...) inside the current call
+            '''
+            if not self.is_recording():
+                return None
+
+            call_path = PATH_SEPARATOR.join(self.call_stack + [name])
+            metric = Profiler.Metric(name, value, len(self.call_stack), call_path)
+            self.logs.append(metric)
+
+            stats = self.metric_stats.get(call_path)
+            if stats is None:
+                stats = Profiler.Stats()
+                self.metric_stats[call_path] = stats
+            stats.add(value)
+            return metric
 
         def clear_logs(self):
             self.logs.clear()
-            self.call_depth_counter = 0
+            self.call_stack.clear()
+
+        def clear_stats(self):
+            self.stats.clear()
+            self.metric_stats.clear()
 
         def print_logs(self):
             print("--- Statistics ---")
             for log in self.logs:
                 print(log)
 
+        def print_stats(self):
+            print("--- Aggregated Statistics ---")
+            for call_path, stats in self.stats.items():
+                print('%s count=%d total=%.3fms min=%.3fms max=%.3fms mean=%.3fms' %
+                      (call_path, stats.count, stats.total * 1e-6, stats.min * 1e-6,
+                       stats.max * 1e-6, stats.mean() * 1e-6))
+            for call_path, stats in self.metric_stats.items():
+                print('%s count=%d min=%s max=%s mean=%s' %
+                      (call_path, stats.count, stats.min, stats.max, stats.mean()))
+
+        def export_csv(self, file_path):
+            '''
+            Export the aggregated statistics (times in milliseconds)
+            '''
+            with open(file_path, 'w', newline='') as csv_file:
+                writer = csv.writer(csv_file)
+                writer.writerow(['call_path', 'type', 'count', 'total', 'min', 'max', 'mean'])
+                for call_path, stats in self.stats.items():
+                    writer.writerow([call_path, 'time_ms', stats.count, stats.total * 1e-6,
+                                     stats.min * 1e-6, stats.max * 1e-6, stats.mean() * 1e-6])
+                for call_path, stats in self.metric_stats.items():
+                    writer.writerow([call_path, 'metric', stats.count, stats.total,
+                                     stats.min, stats.max, stats.mean()])
+
+        def export_chrome_trace(self, file_path):
+            '''
+            Export the timeline into the Chrome trace event format
+            (chrome://tracing or https://ui.perfetto.dev)
+            '''
+            events = []
+            for log in self.logs:
+                if isinstance(log, Profiler.Log):
+                    events.append({'name' : log.function_name, 'cat' : 'function', 'ph' : 'X',
+                                   'ts' : (log.start_time_ns - self.origin_time_ns) * 1e-3,
+                                   'dur' : log.elapsed_time_ns * 1e-3,
+                                   'pid' : 0, 'tid' : 0,
+                                   'args' : {'call_path' : log.call_path}})
+                else:
+                    events.append({'name' : log.name, 'cat' : 'metric', 'ph' : 'C',
+                                   'ts' : (log.time_ns - self.origin_time_ns) * 1e-3,
+                                   'pid' : 0, 'tid' : 0,
+                                   'args' : {log.name : float(log.value)}})
+
+            with open(file_path, 'w') as json_file:
+                json.dump({'traceEvents' : events, 'displayTimeUnit' : 'ms'}, json_file)
+
     instance = None
 
     def __new__(cls):
@@ -58,13 +212,42 @@ def timeit(method):
     '''
     timeit decorator
     '''
+    if not PROFILER_ENABLED:
+        return method
+
     @functools.wraps(method)
     def execute(*args, **kwargs):
         profiler = Profiler()
+        if not profiler.enabled:
+            return method(*args, **kwargs)
+
         log = profiler.push_log(method.__name__)
-        result = method(*args, **kwargs)
-        profiler.pop_log(log)
-        return result
+        try:
+            return method(*args, **kwargs)
+        finally:
+            profiler.pop_log(log)
 
     return execute
 
+def timeit_scope(name):
+    '''
+    Returns a context manager to profile a code block
+    '''
+    return _Scope(name)
+
+class _Scope:
+    def __init__(self, name):
+        self.name = name
+        self.log = None
+
+    def __enter__(self):
+        profiler = Profiler()
+        if profiler.is_recording():
+            self.log = profiler.push_log(self.name)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.log:
+            Profiler().pop_log(self.log)
+            self.log = None
+        return False
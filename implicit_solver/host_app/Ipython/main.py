@@ -17,6 +17,7 @@ FRAME_TIMESTEP = 1.0/24.0 # in seconds
 NUM_SUBSTEP = 12 # number of substep per frame
 NUM_FRAMES = 5  # number of simulated frame (doesn't include initial frame)
 RENDER_FOLDER_PATH = "" # specify a folder to export png files
+FRAME_CACHE_PATH = "" # specify a file to cache the node positions per frame (see core.FrameCacheReader)
 USE_REMOTE_SERVER = False # run the program locally or connect to a server
 # Used command  "magick -loop 0 -delay 4 *.png out.gif"  to convert from png to animated gif
 
@@ -50,6 +51,9 @@ def main():
     #scenes.wire.assemble(cmd_dispatcher, render)
     #scenes.rabbit_cat.assemble(cmd_dispatcher, render)
 
+    if FRAME_CACHE_PATH:
+        cmd_dispatcher.open_frame_cache(path = FRAME_CACHE_PATH, velocities = True)
+
     # Simulate frames
     for frame_id in range(NUM_FRAMES+1):
         profiler.clear_logs()
@@ -64,5 +68,8 @@ def main():
 
         #profiler.print_logs()
 
+    if FRAME_CACHE_PATH:
+        cmd_dispatcher.close_frame_cache()
+
 if __name__ == '__main__':
     main()
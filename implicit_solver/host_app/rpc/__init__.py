@@ -1,3 +1,4 @@
 # in __init__.py
 
 from host_app.rpc.client import Client
+from host_app.rpc.async_client import AsyncClient
@@ -0,0 +1,137 @@
+"""
+@author: Vincent Bonnet
+@description : Asynchronous client to pipeline the commands to the server
+The commands return asyncio futures and are sent without waiting for the previous results,
+the responses are matched to their future with the request id
+
+Example : the server solves the next frame while the client reads the previous frame
+    positions = dispatcher.get_nodes_from_dynamic(dynamic = name)
+    next_frame = dispatcher.solve_to_next_frame()
+    draw(await positions)
+    await next_frame
+"""
+
+import asyncio
+import functools
+import threading
+from host_app.rpc.client import ServerQueueManager
+from host_app.rpc.transport import Transport
+
+class AsyncClientDispatcher:
+    def __init__(self, client, commands):
+        self.client = client
+        for command in commands:
+            if hasattr(self, command):
+                raise ValueError(f'in register_cmd() {command} already registered')
+
+            func = functools.partial(self.run, command)
+            setattr(self, command, func)
+
+    def run(self, command_name, **kwargs):
+        return self.client.run(command_name, **kwargs)
+
+    def run_batch(self, commands):
+        return self.client.run_batch(commands)
+
+class AsyncClient:
+    '''
+    Client to pipeline commands to a Server from an asyncio event loop
+    The responses are received on a thread and resolved on the event loop
+    '''
+    def __init__(self, name = "noname"):
+        self._manager = None
+        self._job_queue = None
+        self._result_queue = None
+        self._name = name # name of the client for server log
+        self._transport = Transport()
+        self._loop = None
+        self._reader = None # thread waiting for the responses
+        self._futures = {} # request id : future
+        self._next_request_id = 0
+        self._acknowledged_id = -1 # last response read (the server can reuse its segments)
+
+    def is_connected(self):
+        return self._manager is not None
+
+    async def get_dispatcher(self):
+        commands = await self.run('get_commands')
+        return AsyncClientDispatcher(self, commands or [])
+
+    async def connect_to_server(self, ip="127.0.0.1", port=8013, authkey='12345'):
+        self._loop = asyncio.get_running_loop()
+        try:
+            self._manager = ServerQueueManager(address=(ip, port), authkey=bytes(authkey,encoding='utf8'))
+            self._manager.connect()
+            self._job_queue = self._manager.get_job_queue()
+            self._result_queue = self._manager.get_result_queue()
+            self._reader = threading.Thread(target=self.__read_responses, daemon=True)
+            self._reader.start()
+            print('Client connected to %s:%s' % (ip, port))
+            return True
+        except Exception as e:
+            self._manager = None
+            self._job_queue = None
+            self._result_queue = None
+            print('Exception raised by client : ' + str(e))
+            return False
+
+    def run(self, command_name, **kwargs):
+        '''
+        Send a command and returns the future of its result
+        '''
+        return self.__send(command_name, kwargs)
+
+    def run_batch(self, commands):
+        '''
+        Send a list of (command_name, kwargs) in a single message
+        Returns the future of the list of results
+        '''
+        return self.__send('run_batch', {'commands' : [(name, kwargs) for name, kwargs in commands]})
+
+    async def disconnect_from_server(self):
+        if self.is_connected():
+            # the server releases the segments of the results on exit
+            await asyncio.gather(*self._futures.values(), return_exceptions=True)
+            self._job_queue.put(('close_server', self._name))
+            await self._loop.run_in_executor(None, self._reader.join)
+            self._transport.close()
+            self._manager = None
+            self._job_queue = None
+            self._result_queue = None
+
+    def __send(self, command_name, kwargs):
+        future = (self._loop or asyncio.get_running_loop()).create_future()
+        if not self.is_connected():
+            future.set_result(None)
+            return future
+
+        request_id = self._next_request_id
+        self._next_request_id += 1
+        self._futures[request_id] = future
+        message = self._transport.encode(kwargs, request_id)
+        self._job_queue.put((command_name, self._name, message, request_id, self._acknowledged_id))
+        return future
+
+    def __read_responses(self):
+        while True:
+            response = self._result_queue.get(block=True)
+            self._loop.call_soon_threadsafe(self.__receive_response, response)
+            if not isinstance(response, tuple): # server exit
+                return
+
+    def __receive_response(self, response):
+        if not isinstance(response, tuple):
+            return
+
+        request_id, error, message = response
+        # the server has read the requests up to request_id
+        self._transport.release(request_id)
+        result = self._transport.decode(message, release = False)
+        self._acknowledged_id = request_id
+        future = self._futures.pop(request_id)
+        if future.cancelled():
+            return
+        if error is not None:
+            future.set_exception(RuntimeError('server error : ' + error))
+        else:
+            future.set_result(result)
@@ -5,6 +5,7 @@
 
 import functools
 from multiprocessing.managers import SyncManager
+from host_app.rpc.transport import Transport
 
 class ServerQueueManager(SyncManager):
     pass
@@ -33,12 +34,14 @@ class ClientDispatcher:
 class Client:
     '''
     Client to connect and dispatch commands to a Server
+    binary_transport : send the large arrays through shared memory (see transport.py)
     '''
-    def __init__(self, name = "noname"):
+    def __init__(self, name = "noname", binary_transport = True):
         self._manager = None
         self._job_queue = None
         self._result_queue = None
         self._name = name # name of the client for server log
+        self._transport = Transport() if binary_transport else None
 
     def __del__(self):
         self.disconnect_from_server()
@@ -66,12 +69,17 @@ class Client:
 
     def run(self, command_name, **kwargs):
         if self.is_connected():
-            self._job_queue.put((command_name, self._name, kwargs))
-            result = self._result_queue.get(block=True)
-            return result
+            if self._transport is None:
+                self._job_queue.put((command_name, self._name, kwargs))
+                return self._result_queue.get(block=True)
+
+            self._job_queue.put((command_name, self._name, self._transport.encode(kwargs)))
+            return self._transport.decode(self._result_queue.get(block=True))
         return None
 
     def disconnect_from_server(self):
         if self.is_connected():
             self._job_queue.put(('close_server', self._name))
+            if self._transport is not None:
+                self._transport.close()
 
@@ -16,6 +16,7 @@ sys.path.append(parentdir)
 import lib
 from multiprocessing.managers import SyncManager
 from multiprocessing import Queue
+from host_app.rpc import transport
 
 '''
  Custom SyncManager and register global job/result queue
@@ -34,19 +35,49 @@ JobQueueManager.register('get_result_queue', callable=function_result_queue)
 
 '''
  Global Dispatcher
+ created when the server starts to keep the module import fast
 '''
-global_dispatcher = lib.CommandSolverDispatcher();
+global_dispatcher = None
+def get_global_dispatcher():
+    global global_dispatcher
+    if global_dispatcher is None:
+        global_dispatcher = lib.CommandSolverDispatcher()
+    return global_dispatcher
 
-def execute_server(print_log = True, port=8013, authkey='12345'):
+def run_pipelined_job(dispatcher, client_transport, command_name, client_name, message, request_id, acknowledged_id):
+    '''
+    Returns the response (request_id, error, result message) of a pipelined job
+    The command 'run_batch' runs a list of (command_name, kwargs) and returns the list of results
+    '''
+    # the client has read the results up to acknowledged_id
+    client_transport.release(acknowledged_id)
+    try:
+        kwargs = client_transport.decode(message, release = False)
+        if command_name == 'run_batch':
+            result = [dispatcher.run(name, **batch_kwargs) for name, batch_kwargs in kwargs['commands']]
+        else:
+            result = dispatcher.run(command_name, **kwargs)
+        return (request_id, None, client_transport.encode(result, request_id))
+    except Exception as e:
+        # the error is raised by the client future
+        return (request_id, '%s: %s' % (type(e).__name__, e), client_transport.encode(None))
+
+def execute_server(print_log = True, port=8013, authkey='12345', precompile = False):
     '''
     Launch Server
+    precompile the kernels before accepting commands (see lib/precompile.py)
     '''
+    if precompile:
+        lib.precompile.precompile(print_log = print_log)
+
     manager = JobQueueManager(address=('localhost', port), authkey = bytes(authkey,encoding='utf8'))
     manager.start()
     print('Server started at port %s' % port)
+    dispatcher = get_global_dispatcher()
     exit_solver = False
     job_queue = manager.get_job_queue()
     result_queue = manager.get_result_queue()
+    client_transports = {} # client name : transport (binary clients)
 
     while not exit_solver:
         # Collect a job
@@ -61,9 +92,20 @@ def execute_server(print_log = True, port=8013, authkey='12345'):
             if command_name == 'close_server':
                 exit_solver = True
                 result = 'server_exit'
+                client_transport = client_transports.pop(client_name, None)
+                if client_transport is not None:
+                    client_transport.close()
+            elif len(job) == 5:
+                # pipelined job (command_name, client_name, message, request_id, acknowledged_id)
+                client_transport = client_transports.setdefault(client_name, transport.Transport())
+                result = run_pipelined_job(dispatcher, client_transport, *job)
+            elif transport.is_message(job[2]):
+                client_transport = client_transports.setdefault(client_name, transport.Transport())
+                kwargs = client_transport.decode(job[2])
+                result = client_transport.encode(dispatcher.run(command_name, **kwargs))
             else:
                 kwargs = job[2]
-                result = global_dispatcher.run(command_name, **kwargs)
+                result = dispatcher.run(command_name, **kwargs)
 
             log = "client{%s} runs command{%s}" % (client_name , command_name)
 
@@ -80,6 +122,6 @@ def execute_server(print_log = True, port=8013, authkey='12345'):
     return manager
 
 if __name__ == '__main__':
-    server_manager = execute_server()
+    server_manager = execute_server(precompile = '--precompile' in sys.argv)
     input("Press Enter to exit server...")
     server_manager.shutdown()
@@ -0,0 +1,136 @@
+"""
+@author: Vincent Bonnet
+@description : Binary transport of the commands and results between the client and the server
+The objects are pickled with the protocol 5 and the large buffers (numpy arrays) are sent
+out-of-band in a shared memory segment, only a small message goes through the queues
+
+Message
+('rpc5', pickled data, segment name, [(offset, size) per out-of-band buffer])
+
+The sender keeps its segment until it receives the next message from the peer
+(the client and the server alternate, the peer has read the segment at this point)
+then the segment is reused by the next messages (no new allocation when polling the same arrays)
+The pipelined messages have an id and are released up to the id acknowledged by the peer
+"""
+
+import os
+import pickle
+from multiprocessing import shared_memory, resource_tracker
+
+MESSAGE_TAG = 'rpc5'
+OUT_OF_BAND_MIN_SIZE = 64 * 1024 # smaller buffers are pickled in-band
+BUFFER_ALIGNMENT = 64
+MAX_FREE_SEGMENTS = 2
+
+_created_segment_names = set() # segments owned by this process
+
+def is_message(payload):
+    return isinstance(payload, tuple) and len(payload) == 4 and payload[0] == MESSAGE_TAG
+
+def _attach_segment(name):
+    '''
+    Open a segment created by the peer (the peer owns and unlinks it)
+    '''
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # python < 3.13 : attaching registers the segment in the resource tracker of this process
+        segment = shared_memory.SharedMemory(name=name)
+        if os.name == 'posix' and name not in _created_segment_names:
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+def _destroy_segment(segment):
+    segment.close()
+    segment.unlink()
+    _created_segment_names.discard(segment.name)
+
+class Transport:
+    '''
+    Encode and decode the messages of one side of the connection
+    '''
+    def __init__(self, min_size = OUT_OF_BAND_MIN_SIZE):
+        self.min_size = min_size
+        self.sent_segments = [] # (message id, segment) of the sent messages
+        self.free_segments = [] # segments read by the peer (reusable)
+
+    def encode(self, obj, message_id = None):
+        out_of_band_buffers = []
+        def buffer_callback(buffer):
+            if buffer.raw().nbytes < self.min_size:
+                return True # in-band
+            out_of_band_buffers.append(buffer)
+            return False
+
+        data = pickle.dumps(obj, protocol=5, buffer_callback=buffer_callback)
+        if len(out_of_band_buffers) == 0:
+            return (MESSAGE_TAG, data, None, [])
+
+        # single segment for all the out-of-band buffers
+        layout = []
+        segment_size = 0
+        for buffer in out_of_band_buffers:
+            segment_size = -(-segment_size // BUFFER_ALIGNMENT) * BUFFER_ALIGNMENT
+            layout.append((segment_size, buffer.raw().nbytes))
+            segment_size += buffer.raw().nbytes
+
+        segment = self.__allocate_segment(segment_size)
+        for buffer, (offset, size) in zip(out_of_band_buffers, layout):
+            segment.buf[offset:offset+size] = buffer.raw()
+        self.sent_segments.append((message_id, segment))
+        return (MESSAGE_TAG, data, segment.name, layout)
+
+    def decode(self, message, release = True):
+        '''
+        Returns the object of a message
+        release : the segments of the sent messages are released (the peer has read them)
+        '''
+        if release:
+            self.release()
+        _, data, segment_name, layout = message
+        if segment_name is None:
+            return pickle.loads(data)
+
+        segment = _attach_segment(segment_name)
+        try:
+            # single copy from the segment into the process memory
+            segment_size = max(offset + size for offset, size in layout)
+            memory = memoryview(bytearray(segment.buf[:segment_size]))
+        finally:
+            segment.close()
+
+        buffers = [memory[offset:offset+size] for offset, size in layout]
+        return pickle.loads(data, buffers=buffers)
+
+    def release(self, message_id = None):
+        '''
+        The segments of the sent messages (up to message_id) become reusable
+        '''
+        sent_segments = []
+        for sent_id, segment in self.sent_segments:
+            if message_id is None or (sent_id is not None and sent_id <= message_id):
+                self.free_segments.append(segment)
+            else:
+                sent_segments.append((sent_id, segment))
+        self.sent_segments = sent_segments
+        self.free_segments.sort(key=lambda segment: segment.size, reverse=True)
+        for segment in self.free_segments[MAX_FREE_SEGMENTS:]:
+            _destroy_segment(segment)
+        del self.free_segments[MAX_FREE_SEGMENTS:]
+
+    def close(self):
+        for _, segment in self.sent_segments:
+            _destroy_segment(segment)
+        for segment in self.free_segments:
+            _destroy_segment(segment)
+        self.sent_segments = []
+        self.free_segments = []
+
+    def __allocate_segment(self, size):
+        # smallest free segment large enough
+        for index in reversed(range(len(self.free_segments))):
+            if self.free_segments[index].size >= size:
+                return self.free_segments.pop(index)
+        segment = shared_memory.SharedMemory(create=True, size=size)
+        _created_segment_names.add(segment.name)
+        return segment
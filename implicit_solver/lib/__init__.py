@@ -1,5 +1,18 @@
 # in __init__.py
+# the submodules and CommandSolverDispatcher are imported on first access (PEP 562)
+# to keep 'import lib' fast (numba, scipy and the kernels are loaded on demand)
 
-import lib.system
-import lib.objects
-from lib.dispatcher import CommandSolverDispatcher
+import importlib
+
+_lazy_attributes = {'CommandSolverDispatcher' : 'lib.dispatcher'}
+_lazy_submodules = ('system', 'objects', 'dispatcher', 'commands', 'examples', 'precompile')
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        return getattr(importlib.import_module(_lazy_attributes[name]), name)
+    if name in _lazy_submodules:
+        return importlib.import_module('lib.' + name)
+    raise AttributeError(f"module 'lib' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy_attributes) + list(_lazy_submodules))
@@ -4,6 +4,7 @@
 """
 
 import numpy as np
+import scipy.sparse
 from core import timeit
 
 from lib.objects import Dynamic, Kinematic, Gravity
@@ -11,6 +12,7 @@ from lib.objects import WireBendingCondition, EdgeCondition, AreaCondition
 from lib.objects import KinematicAttachmentCondition, DynamicAttachmentCondition
 from lib.objects import KinematicCollisionCondition
 import lib.objects.jit.algorithms.data_accessor as db
+import lib.system.checkpoint as checkpoint_io
 
 def add_wire_bending_constraint(scene, dynamic, stiffness, damping):
     condition = WireBendingCondition([dynamic], stiffness, damping)
@@ -70,8 +72,24 @@ def solve_to_next_frame(scene, solver, details, context):
         context.time += context.dt
         solver.solve_step(scene, details, context)
 
-def get_nodes_from_dynamic(dynamic, details):
-    return details.db['node'].flatten('x', dynamic.block_handles)
+def compact(scene, solver, details):
+    solver.compact(scene, details)
+
+def get_fragmentation_stats(scene, details):
+    return scene.fragmentation_stats(details)
+
+def checkpoint(scene, solver, details, context, path):
+    checkpoint_io.save(path, scene, solver, details, context)
+
+def restore(scene, solver, details, context, path):
+    # the scene has to be rebuilt before restoring the simulation state
+    checkpoint_io.restore(path, scene, solver, details, context)
+
+def get_nodes_from_dynamic(dynamic, details, out=None):
+    # copy into the caller buffer when provided (no allocation per frame)
+    if out is None:
+        return details.db['node'].flatten('x', dynamic.block_handles)
+    return details.db['node'].gather_into('x', out, dynamic.block_handles)
 
 def get_shape_from_kinematic(kinematic, details):
     return kinematic.get_as_shape(details)
@@ -116,6 +134,10 @@ def get_sparse_matrix_as_dense(details, solver, as_binary=False):
         if A is None:
             return None
 
+        # matrix-free integrator doesn't store a sparse matrix
+        if not scipy.sparse.issparse(A):
+            return None
+
         denseA = np.abs(A.toarray())
         if as_binary:
             denseA[:] = denseA[:]>0.0
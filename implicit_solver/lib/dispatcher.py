@@ -6,7 +6,7 @@
 # import for CommandSolverDispatcher
 import uuid
 
-from core import Details
+from core import Details, BeamShape, WireShape, RectangleShape
 import lib.system as system
 import lib.system.time_integrators as integrator
 from lib.objects import Dynamic, Kinematic, Condition, Force
@@ -27,9 +27,13 @@ class CommandSolverDispatcher(core.CommandDispatcher):
         self._reset()
         self._solver = system.Solver(integrator.BackwardEulerIntegrator())
         #self._solver = system.Solver(integrator.SymplecticEulerIntegrator())
+        #self._solver = system.Solver(integrator.VariationalIntegrator())
         self._context = system.SolverContext()
         # map hash_value with objects (dynamic, kinematic, condition, force)
         self._object_dict = {}
+        # frame cache written after initialize and solve_to_next_frame (see _open_frame_cache)
+        self._frame_cache = None
+        self._frame_cache_velocities = False
 
         # register
         self.register_cmd(self._set_context, 'set_context')
@@ -40,10 +44,13 @@ class CommandSolverDispatcher(core.CommandDispatcher):
         self.register_cmd(self._get_metadata, 'get_metadata')
         self.register_cmd(self._get_commands, 'get_commands')
         self.register_cmd(self._reset, 'reset')
-        self.register_cmd(cmd.initialize)
+        self.register_cmd(self._warmup, 'warmup')
+        self.register_cmd(self._initialize, 'initialize')
+        self.register_cmd(self._solve_to_next_frame, 'solve_to_next_frame')
+        self.register_cmd(self._open_frame_cache, 'open_frame_cache')
+        self.register_cmd(self._close_frame_cache, 'close_frame_cache')
         self.register_cmd(cmd.add_dynamic)
         self.register_cmd(cmd.add_kinematic)
-        self.register_cmd(cmd.solve_to_next_frame)
         self.register_cmd(cmd.get_nodes_from_dynamic)
         self.register_cmd(cmd.get_shape_from_kinematic)
         self.register_cmd(cmd.get_normals_from_kinematic)
@@ -57,6 +64,10 @@ class CommandSolverDispatcher(core.CommandDispatcher):
         self.register_cmd(cmd.add_kinematic_collision)
         self.register_cmd(cmd.add_dynamic_attachment)
         self.register_cmd(cmd.get_sparse_matrix_as_dense)
+        self.register_cmd(cmd.compact)
+        self.register_cmd(cmd.get_fragmentation_stats)
+        self.register_cmd(cmd.checkpoint)
+        self.register_cmd(cmd.restore)
 
     def _add_object(self, obj, object_handle=None):
         if object_handle in self._object_dict:
@@ -122,8 +133,14 @@ class CommandSolverDispatcher(core.CommandDispatcher):
 
         return result
 
-    def _set_context(self, time : float, frame_dt : float, num_substep : int, num_frames : int):
-        self._context = system.SolverContext(time, frame_dt, num_substep, num_frames)
+    def _set_context(self, time : float, frame_dt : float, num_substep : int, num_frames : int,
+                     cg_tolerance : float = 1e-05, cg_max_iterations : int = None,
+                     preconditioner : str = 'block_jacobi', newton_tolerance : float = 1e-06,
+                     newton_max_iterations : int = 20, compact_threshold : float = None):
+        self._context = system.SolverContext(time, frame_dt, num_substep, num_frames,
+                                             cg_tolerance, cg_max_iterations, preconditioner,
+                                             newton_tolerance, newton_max_iterations,
+                                             compact_threshold)
 
     def _get_context(self):
         return self._context
@@ -145,7 +162,107 @@ class CommandSolverDispatcher(core.CommandDispatcher):
     def _get_commands(self):
         return list(self._commands.keys())
 
-    def _reset(self):
+    def _initialize(self):
+        cmd.initialize(self._scene, self._solver, self._details, self._context)
+        self._write_frame_cache()
+
+    def _solve_to_next_frame(self):
+        cmd.solve_to_next_frame(self._scene, self._solver, self._details, self._context)
+        self._write_frame_cache()
+
+    def _open_frame_cache(self, path, velocities = False, append = False,
+                          quantized = False, keyframe_interval = 10, tolerance = 1e-4):
+        '''
+        Cache the node positions (and velocities) of the dynamics after every frame
+        The frames are written on a background thread (see core.FrameCacheWriter)
+        quantized stores the positions as keyframes and deltas (see core.frame_cache)
+        '''
+        self._close_frame_cache()
+        self._frame_cache = core.FrameCacheWriter(path, append, quantized, keyframe_interval, tolerance)
+        self._frame_cache_velocities = velocities
+
+    def _close_frame_cache(self):
+        '''
+        Wait for the queued frames to be written and close the cache
+        '''
+        if self._frame_cache is not None:
+            frame_cache, self._frame_cache = self._frame_cache, None
+            frame_cache.close()
+
+    def _write_frame_cache(self):
+        if self._frame_cache is None:
+            return
+
+        db_nodes = self._details.db['node']
+        arrays = {}
+        for name, obj in self._object_dict.items():
+            if isinstance(obj, Dynamic):
+                arrays[name + '/x'] = db_nodes.flatten('x', obj.block_handles)
+                if self._frame_cache_velocities:
+                    arrays[name + '/v'] = db_nodes.flatten('v', obj.block_handles)
+
+        context = self._context
+        frame_id = round((context.time - context.start_time) / context.frame_dt)
+        self._frame_cache.write_frame(frame_id, arrays, context.time)
+
+    def _warmup(self, print_log = True):
+        '''
+        Compile the kernels ahead of time on a small synthetic scene covering all the datablock
+        types and conditions, it runs two substeps with the current solver and context settings
+        (the collisions are only created when the nodes move toward the kinematics)
+        The current scene, details and context are left untouched
+        Returns the compilation time per kernel (in seconds)
+        '''
+        state = (self._scene, self._details, self._context, self._object_dict, self._frame_cache)
+        self._frame_cache = None
+        profiler = core.Profiler()
+        profiler_enabled = profiler.enabled
+        profiler.disable()
+        try:
+            self._reset(self._details.block_sizes) # same datatypes (no extra compilation)
+            self._object_dict = {}
+            context = self._context
+            self._context = system.SolverContext(0.0, context.dt * 2, 2, 1,
+                                                 context.cg_tolerance, context.cg_max_iterations,
+                                                 context.preconditioner, context.newton_tolerance,
+                                                 context.newton_max_iterations,
+                                                 context.compact_threshold)
+            with core.code_gen.CompileTimeRecorder() as recorder:
+                self._build_warmup_scene()
+                self.initialize()
+                self.solve_to_next_frame()
+        finally:
+            self._scene, self._details, self._context, self._object_dict, self._frame_cache = state
+            self._solver.time_integrator.initialize(self._scene, self._details)
+            if profiler_enabled:
+                profiler.enable()
+
+        if print_log:
+            recorder.print_compile_times()
+
+        return recorder.compile_times
+
+    def _build_warmup_scene(self):
+        # beam (edge, area) and wire (edge, bending) sharing the nodes along the top of the beam
+        beam_shape = BeamShape((-1.0, 0.0), 2.0, 0.5, 2, 1)
+        wire_shape = WireShape((-1.0, 0.5), (1.0, 0.5), 4)
+        beam = self.add_dynamic(shape = beam_shape, node_mass = 0.001)
+        wire = self.add_dynamic(shape = wire_shape, node_mass = 0.001)
+        self.add_edge_constraint(dynamic = beam, stiffness = 20.0, damping = 0.1)
+        self.add_face_constraint(dynamic = beam, stiffness = 20.0, damping = 0.1)
+        self.add_edge_constraint(dynamic = wire, stiffness = 20.0, damping = 0.1)
+        self.add_wire_bending_constraint(dynamic = wire, stiffness = 0.1, damping = 0.0)
+        self.add_dynamic_attachment(dynamic_0 = beam, dynamic_1 = wire,
+                                    stiffness = 100.0, damping = 0.0, distance = 0.001)
+        # anchor next to the beam and obstacle intersecting the beam
+        anchor = self.add_kinematic(shape = RectangleShape(-1.5, 0.0, -1.0, 0.5))
+        self.add_kinematic(shape = RectangleShape(-0.25, -0.25, 0.25, 0.1))
+        self.add_kinematic_attachment(dynamic = beam, kinematic = anchor,
+                                      stiffness = 100.0, damping = 0.0, distance = 0.1)
+        self.add_kinematic_collision(stiffness = 100.0, damping = 0.0)
+        self.add_gravity(gravity = (0.0, -9.81))
+
+    def _reset(self, block_sizes = None):
         self._scene = system.Scene()
         system_types = [Node, Area, Bending, Spring, AnchorSpring]
         system_types += [Point, Edge, Triangle]
@@ -153,4 +270,4 @@ class CommandSolverDispatcher(core.CommandDispatcher):
                        'constraints' : [Area, Bending, Spring, AnchorSpring],
                        'geometries': [Point, Edge, Triangle],
                        'bundle': system_types}
-        self._details = Details(system_types, group_types)
+        self._details = Details(system_types, group_types, block_sizes = block_sizes)
@@ -3,14 +3,16 @@
 @description : usage symbolic python to derive the constraint functions
 """
 
+import os
 from sympy.physics.vector import ReferenceFrame
 from sympy import symbols, diff, simplify, latex
 from sympy.matrices import Matrix
+from sympy.printing.pycode import PythonCodePrinter
 import sympy
 
-def bending_energy_derivation():
+def bending_energy_expression():
     '''
-    Symbolic derivation of bending energy
+    Returns the symbolic bending energy and its symbols
     '''
     # Create three positions (X0, x1, x2)
     stiffness = symbols("stiffness",real=True)
@@ -34,11 +36,69 @@ def bending_energy_derivation():
     # Bending Energy
     bending_energy = 0.5 * stiffness * ((angle - rest_angle)**2) * arc_length
 
+    return bending_energy, [px0, py0, px1, py1, px2, py2], rest_angle, stiffness
+
+def bending_energy_derivation():
+    '''
+    Symbolic derivation of bending energy
+    '''
+    bending_energy, X, rest_angle, stiffness = bending_energy_expression()
+    px0, py0, px1, py1, px2, py2 = X
+
     # Derivatives
     dEdx0 = [simplify(diff(bending_energy, px0)), simplify(diff(bending_energy, py0))]
     dEdx2 = [simplify(diff(bending_energy, px2)), simplify(diff(bending_energy, py2))]
     #dEdx1 = - dEdx0 - dEdx2
 
+def bending_hessian_codegen(file_path):
+    '''
+    Generate the jitted function elastic_bending_hessian(x0, x1, x2, rest_angle, stiffness)
+    returning the 6x6 hessian of the bending energy
+    The common subexpressions are evaluated once
+    '''
+    bending_energy, X, rest_angle, stiffness = bending_energy_expression()
+    H = sympy.hessian(bending_energy, X)
+
+    # upper triangular part (the hessian is symmetric)
+    indices = [(i, j) for i in range(6) for j in range(i, 6)]
+    subexpressions, entries = sympy.cse([H[i, j] for i, j in indices],
+                                        symbols=sympy.numbered_symbols('t'),
+                                        optimizations='basic')
+
+    printer = PythonCodePrinter()
+    lines = []
+    lines.append('"""')
+    lines.append('@author: Vincent Bonnet')
+    lines.append('@description : Hessian of the bending energy')
+    lines.append('Generated by lib/experimental/symbolic.py (bending_hessian_codegen), do not edit')
+    lines.append('"""')
+    lines.append('')
+    lines.append('import math')
+    lines.append('import numba')
+    lines.append('import numpy as np')
+    lines.append('from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED')
+    lines.append('')
+    lines.append('@numba.njit(cache=KERNEL_CACHE_ENABLED)')
+    lines.append('def elastic_bending_hessian(x0, x1, x2, rest_angle, stiffness):')
+    lines.append('    \'\'\'')
+    lines.append('    Returns the 6x6 hessian of elastic_bending_energy')
+    lines.append('    relative to (x0[0], x0[1], x1[0], x1[1], x2[0], x2[1])')
+    lines.append('    \'\'\'')
+    for i, symbol in enumerate(X):
+        lines.append(f'    {symbol} = {["x0", "x1", "x2"][i // 2]}[{i % 2}]')
+    for symbol, expression in subexpressions:
+        lines.append(f'    {symbol} = {printer.doprint(expression)}')
+    lines.append('    H = np.empty((6, 6))')
+    for (i, j), expression in zip(indices, entries):
+        lines.append(f'    H[{i}, {j}] = {printer.doprint(expression)}')
+        if i != j:
+            lines.append(f'    H[{j}, {i}] = H[{i}, {j}]')
+    lines.append('    return H')
+    lines.append('')
+
+    with open(file_path, 'w') as file:
+        file.write('\n'.join(lines))
+
 def area_energy_derivation():
     '''
     Symbolic derivation of area energy
@@ -66,3 +126,7 @@ def area_energy_derivation():
     dEdx0 = [simplify(diff(area_energy, px0)), simplify(diff(area_energy, py0))]
     dEdx2 = [simplify(diff(area_energy, px2)), simplify(diff(area_energy, py2))]
     #dEdx1 = - dEdx0 - dEdx2
+
+if __name__ == '__main__':
+    algorithms_dir = os.path.join(os.path.dirname(__file__), '..', 'objects', 'jit', 'algorithms')
+    bending_hessian_codegen(os.path.join(algorithms_dir, 'bending_hessian_lib.py'))
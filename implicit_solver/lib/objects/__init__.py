@@ -1,15 +1,25 @@
 # in __init__.py
+# the classes are imported on first access (PEP 562)
 
-from lib.objects.dynamic import Dynamic
-from lib.objects.kinematic import Kinematic
-from lib.objects.forces import Force, Gravity
-from lib.objects.animator import Animator
-from lib.objects.condition import Condition
-from lib.objects.conditions import KinematicCollisionCondition
-from lib.objects.conditions import KinematicAttachmentCondition, DynamicAttachmentCondition
-from lib.objects.conditions import EdgeCondition, AreaCondition, WireBendingCondition
-
-
+import importlib
 
+_lazy_attributes = {'Dynamic' : 'lib.objects.dynamic',
+                    'Kinematic' : 'lib.objects.kinematic',
+                    'Force' : 'lib.objects.forces',
+                    'Gravity' : 'lib.objects.forces',
+                    'Animator' : 'lib.objects.animator',
+                    'Condition' : 'lib.objects.condition',
+                    'KinematicCollisionCondition' : 'lib.objects.conditions',
+                    'KinematicAttachmentCondition' : 'lib.objects.conditions',
+                    'DynamicAttachmentCondition' : 'lib.objects.conditions',
+                    'EdgeCondition' : 'lib.objects.conditions',
+                    'AreaCondition' : 'lib.objects.conditions',
+                    'WireBendingCondition' : 'lib.objects.conditions'}
 
+def __getattr__(name):
+    if name in _lazy_attributes:
+        return getattr(importlib.import_module(_lazy_attributes[name]), name)
+    raise AttributeError(f"module 'lib.objects' has no attribute '{name}'")
 
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy_attributes))
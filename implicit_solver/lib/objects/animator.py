@@ -28,9 +28,9 @@ class Animator:
 
         # state
         self.position = np.zeros(2)
-        self.rotation = np.float(0.0)
+        self.rotation = np.float64(0.0)
         self.linear_velocity = np.zeros(2)
-        self.angular_velocity = np.float(0.0)
+        self.angular_velocity = np.float64(0.0)
         self.update_state(position, rotation)
 
     def get_value(self, time):
@@ -73,7 +73,7 @@ class Animator:
 
         # update position and rotation
         self.position = np.asarray(position)
-        self.rotation = np.float(rotation)
+        self.rotation = np.float64(rotation)
 
     def update_kinematic(self, details, kinematic, context):
         # update state
@@ -3,7 +3,9 @@
 @description : conditions create a list of constraints from a list of objects
 """
 
+import core
 import core.jit.block_utils as block_utils
+import lib.objects.jit.algorithms.colouring_lib as colouring_lib
 
 class Condition:
     class FunctionBundle:
@@ -15,9 +17,11 @@ class Condition:
             self.compute_hessians = None
             self.compute_forces = None
             self.compute_force_jacobians = None
+            self.compute_energy = None
 
     def __init__(self, stiffness, damping, constraint_type):
         self.block_handles = block_utils.empty_block_handles()
+        self.block_colours = [] # block handles grouped by colour
         self.typename = constraint_type.name()
         # Parameters
         self.stiffness = stiffness
@@ -48,34 +52,60 @@ class Condition:
     def update_constraints(self, details):
         pass
 
-    def __call_func(self, func, details):
+    def update_block_colours(self, details):
+        '''
+        Group the block handles into colours
+        Blocks from the same colour don't share nodes and can be processed in parallel
+        '''
+        self.block_colours = []
+        if len(self.block_handles) > 0:
+            blocks = getattr(details, self.typename)
+            colours = colouring_lib.compute_block_colours(blocks, self.block_handles)
+            self.block_colours = list(colouring_lib.group_block_handles(self.block_handles, colours))
+
+    def call_per_colour(self, func, details, *args):
+        '''
+        Call the vectorized function 'func' on each colour of blocks
+        '''
+        blocks = getattr(details, self.typename)
+        with core.timeit_scope(self.typename + '.' + func.__name__):
+            for colour_handles in self.block_colours:
+                func.function(blocks, *args, colour_handles)
+
+    def __call_func(self, func_name, details):
+        func = getattr(self.func, func_name)
         if func and len(self.block_handles)>0:
             blocks = getattr(details, self.typename)
-            func.function(blocks, details, self.block_handles)
+            with core.timeit_scope(self.typename + '.' + func_name):
+                func.function(blocks, details, self.block_handles)
 
     # initialization functions
     def pre_compute(self, details):
-        self.__call_func(self.func.pre_compute, details)
+        self.__call_func('pre_compute', details)
 
     def compute_rest(self, details):
-        self.__call_func(self.func.compute_rest, details)
+        self.__call_func('compute_rest', details)
 
     # constraint functions (function, gradients, hessians)
     def compute_function(self, details):
-        self.__call_func(self.func.compute_function, details)
+        self.__call_func('compute_function', details)
 
     def compute_gradients(self, details):
-        self.__call_func(self.func.compute_gradients, details)
+        self.__call_func('compute_gradients', details)
 
     def compute_hessians(self, details):
-        self.__call_func(self.func.compute_hessians, details)
+        self.__call_func('compute_hessians', details)
 
     # force functions (forces and their jacobians)
     def compute_forces(self, details):
-        self.__call_func(self.func.compute_forces, details)
+        self.__call_func('compute_forces', details)
 
     def compute_force_jacobians(self, details):
-        self.__call_func(self.func.compute_force_jacobians, details)
+        self.__call_func('compute_force_jacobians', details)
+
+    # energy function (elastic energy of each constraint)
+    def compute_energy(self, details):
+        self.__call_func('compute_energy', details)
 
     def metadata(self):
         meta_data = self.meta_data.copy()
@@ -10,75 +10,111 @@ from lib.objects import Condition
 from lib.objects.jit.data import Node, AnchorSpring, Spring, Area, Bending
 import lib.objects.jit.algorithms as algo
 import core.jit.block_utils as block_utils
+import core.jit.item_utils as item_utils
+import lib.objects.jit.algorithms.data_accessor as db
 import core.code_gen as generate
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
-def initialize_condition_from_aos(condition, array_of_struct, details):
+def allocate_condition_blocks(condition, details, num_constraints):
+    '''
+    Disable the previous blocks of the condition and allocate the blocks
+    for num_constraints constraints. Returns the datablock
+    '''
     data = details.datablock_from_typename(condition.typename)
 
     # disable previous allocated blocks
-    num_constraints = len(array_of_struct)
     condition.total_constraints = num_constraints
 
-    block_utils.set_active(data.blocks, False, condition.block_handles)
+    data.release(condition.block_handles)
     condition.block_handles = block_utils.empty_block_handles()
+    condition.block_colours = []
+
+    # allocate
+    if num_constraints > 0:
+        condition.block_handles = data.append(num_constraints, reuse_inactive_block=True)
+
+    return data
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def set_constraints(blocks, block_handles, node_IDs, stiffness, damping):
+    constraint_id = 0
+    for block_handle in block_handles:
+        block = blocks[block_handle][0]
+        for index in range(block['blockInfo_size']):
+            block['node_IDs'][index] = node_IDs[constraint_id]
+            block['stiffness'][index] = stiffness
+            block['damping'][index] = damping
+            constraint_id += 1
+
+def initialize_condition_from_soa(condition, details, node_IDs, **fields):
+    '''
+    Set the constraints of a condition from structure of arrays
+    node_IDs has the shape (num_constraints, num_nodes, ID_SIZE)
+    fields are the optional arrays of other constraint fields (num_constraints, ...)
+    stiffness and damping come from the condition
+    '''
+    num_constraints = len(node_IDs)
+    data = allocate_condition_blocks(condition, details, num_constraints)
 
     # early exit if there is no constraints
     if (num_constraints == 0):
         return False
 
-    # allocate
-    block_handles = data.append_empty(num_constraints, reuse_inactive_block=True)
-    condition.block_handles = block_handles
-
     # copy to datablock
-    num_elements = len(array_of_struct)
-    for field_name, value in array_of_struct[0].__dict__.items():
-        # create contiguous array
-        data_type = None
-        data_shape = None
-        if np.isscalar(value):
-            # (num_elements, ) guarantees to be array and not single value
-            data_type = type(value)
-            data_shape = (num_elements,)
-        else:
-            data_type = value.dtype.type
-            list_shape = list(value.shape)
-            list_shape.insert(0, num_elements)
-            data_shape = tuple(list_shape)
-
-        new_array = np.zeros(shape=data_shape, dtype=data_type)
-
-        # set contiguous array
-        for element_id, element in enumerate(array_of_struct):
-            new_array[element_id] = getattr(element, field_name)
-
-        # set datbablock
-        data.copyto(field_name, new_array, condition.block_handles)
+    set_constraints(data.blocks, condition.block_handles, node_IDs,
+                    condition.stiffness, condition.damping)
+    for field_name, values in fields.items():
+        data.copyto(field_name, values, condition.block_handles)
+
+    # group blocks into independent colours
+    condition.update_block_colours(details.bundle)
 
     # compute constraint rest
     condition.compute_rest(details.bundle)
 
     return True
 
-
-@generate.vectorize(njit=True)
-def appendKinematicCollision(node : Node, points, edges, triangles, is_inside_func, closest_param_func):
-    result = algo.simplex_lib.IsInsideResult()
-    result.isInside = False
-    is_inside_func(triangles, points, node.x, result)
-    if (result.isInside):
-        closest_param = algo.simplex_lib.ClosestResult()
-        closest_param_func(edges, points, node.x, closest_param)
-
-        if np.dot(closest_param.normal, node.v) < 0.0:
-            pass
-            # TODO - before adding contact, remove those outside the stuff !
-            # TODO - add contacts - details.spring
-            #print('ADD contacts')
-            #block_id = 0
-            #data = spring_data[block_id]
-            #data0 = np.empty_like(data)
-
+def node_ids_from_connectivity(dynamics, connectivity_name, num_nodes):
+    '''
+    Returns the node IDs of the edges/faces of the dynamics
+    with the shape (num_constraints, num_nodes, ID_SIZE)
+    '''
+    node_ids = [np.take(dynamic.node_ids, getattr(dynamic, connectivity_name), axis=0)
+                for dynamic in dynamics]
+    if len(node_ids) == 0:
+        return np.empty((0, num_nodes, item_utils.ID_SIZE), dtype=np.int32)
+    return np.concatenate(node_ids).reshape(-1, num_nodes, item_utils.ID_SIZE)
+
+@generate.vectorize
+def find_kinematic_collisions(node : Node, points, edges, triangles, triangle_hash, edge_hash, contact_node_IDs, contact_edge_IDs, contact_params, contact_positions, num_contacts):
+    # num_contacts = np.zeros(1, dtype=np.int64)
+    if algo.spatial_hash_lib.is_inside(triangle_hash, triangles, points, node.x):
+        edge_ID, t, squared_distance = algo.spatial_hash_lib.closest_edge(edge_hash, edges, points, node.x)
+        edge_normal = edges[edge_ID[0]][0]['normal'][edge_ID[1]]
+        if edge_normal[0] * node.v[0] + edge_normal[1] * node.v[1] < 0.0:
+            contact_id = num_contacts[0]
+            point_IDs = edges[edge_ID[0]][0]['point_IDs'][edge_ID[1]]
+            x0 = db.x(points, point_IDs[0])
+            x1 = db.x(points, point_IDs[1])
+            contact_node_IDs[contact_id][0] = node.ID
+            contact_edge_IDs[contact_id] = point_IDs
+            contact_params[contact_id] = t
+            contact_positions[contact_id] = x0 * (1.0 - t) + x1 * t
+            num_contacts[0] += 1
+
+@generate.vectorize
+def find_kinematic_attachments(node : Node, points, edges, edge_hash, distance, attachment_node_IDs, attachment_edge_IDs, attachment_params, attachment_positions, num_attachments):
+    edge_ID, t, squared_distance = algo.spatial_hash_lib.closest_edge(edge_hash, edges, points, node.x, distance)
+    if squared_distance < distance * distance:
+        attachment_id = num_attachments[0]
+        point_IDs = edges[edge_ID[0]][0]['point_IDs'][edge_ID[1]]
+        x0 = db.x(points, point_IDs[0])
+        x1 = db.x(points, point_IDs[1])
+        attachment_node_IDs[attachment_id][0] = node.ID
+        attachment_edge_IDs[attachment_id] = point_IDs
+        attachment_params[attachment_id] = t
+        attachment_positions[attachment_id] = x0 * (1.0 - t) + x1 * t
+        num_attachments[0] += 1
 
 class KinematicCollisionCondition(Condition):
     '''
@@ -93,6 +129,7 @@ class KinematicCollisionCondition(Condition):
         self.func.compute_hessians = None
         self.func.compute_forces = algo.anchor_spring_lib.compute_forces
         self.func.compute_force_jacobians = algo.anchor_spring_lib.compute_force_jacobians
+        self.func.compute_energy = algo.anchor_spring_lib.compute_energy
 
     def is_static(self):
         '''
@@ -103,54 +140,33 @@ class KinematicCollisionCondition(Condition):
     def init_constraints(self, details):
         '''
         Add zero-length springs into anchor spring details
+        The spatial hashes of the kinematic triangles and edges are rebuilt
+        because the kinematics are moved before every substep (see Animator.update_kinematic)
         '''
-        '''
-        appendKinematicCollision(details.node,
-                                 details.point,
-                                 details.edge,
-                                 details.triangle,
-                                 simplex_lib.is_inside.function,
-                                 simplex_lib.get_closest_param.function)
-        '''
-
-        springs = []
-        db_nodes = details.db['node']
-        data_x = db_nodes.flatten('x')
-        data_v = db_nodes.flatten('v')
-        data_node_id = db_nodes.flatten('ID')
-
-        result = algo.simplex_lib.IsInsideResult()
-        for i in range(len(data_x)):
-            node_pos = data_x[i]
-            node_vel = data_v[i]
-            node_ids = [data_node_id[i]]
-
-            result.isInside = False
-            algo.simplex_lib.is_inside(details.triangle,
-                                       details.point,
-                                       node_pos,
-                                       result)
-
-            if (result.isInside):
-                closest_param = algo.simplex_lib.ClosestResult()
-                algo.simplex_lib.get_closest_param(details.edge,
-                                                   details.point, node_pos,
-                                                   closest_param)
-
-                if (np.dot(closest_param.normal, node_vel) < 0.0):
-                    # add spring
-                    spring = AnchorSpring()
-                    spring.kinematic_component_IDs =  closest_param.points
-                    spring.kinematic_component_param = np.float64(closest_param.t)
-                    spring.kinematic_component_pos = closest_param.position
-                    spring.node_IDs = np.copy(node_ids)
-                    spring.stiffness = self.stiffness
-                    spring.damping = self.damping
-                    springs.append(spring)
-
-        initialize_condition_from_aos(self, springs, details)
-
-
+        points = details.point
+        cell_size = algo.spatial_hash_lib.mean_edge_length(details.edge, points)
+        triangle_handles = block_utils.get_active_block_handles(details.triangle)
+        edge_handles = block_utils.get_active_block_handles(details.edge)
+        triangle_hash = algo.spatial_hash_lib.build(details.triangle, points, triangle_handles, cell_size)
+        edge_hash = algo.spatial_hash_lib.build(details.edge, points, edge_handles, cell_size)
+
+        # narrow-phase on the candidates from the spatial hashes
+        num_nodes = block_utils.compute_num_elements(details.node)
+        contact_node_IDs = np.empty((num_nodes, 1, item_utils.ID_SIZE), dtype=np.int32)
+        contact_edge_IDs = np.empty((num_nodes, 2, item_utils.ID_SIZE), dtype=np.int32)
+        contact_params = np.empty(num_nodes, dtype=np.float64)
+        contact_positions = np.empty((num_nodes, 2), dtype=np.float64)
+        num_contacts = np.zeros(1, dtype=np.int64)
+        find_kinematic_collisions(details.node, points, details.edge, details.triangle,
+                                  triangle_hash, edge_hash, contact_node_IDs, contact_edge_IDs,
+                                  contact_params, contact_positions, num_contacts)
+
+        # emit the contacts into the anchor spring datablock
+        n = num_contacts[0]
+        initialize_condition_from_soa(self, details, contact_node_IDs[:n],
+                                      kinematic_component_IDs = contact_edge_IDs[:n],
+                                      kinematic_component_param = contact_params[:n],
+                                      kinematic_component_pos = contact_positions[:n])
 
     def update_constraints(self, details):
         self.init_constraints(details)
@@ -173,41 +189,31 @@ class KinematicAttachmentCondition(Condition):
         self.func.compute_hessians = None
         self.func.compute_forces = algo.anchor_spring_lib.compute_forces
         self.func.compute_force_jacobians = algo.anchor_spring_lib.compute_force_jacobians
+        self.func.compute_energy = algo.anchor_spring_lib.compute_energy
 
     def init_constraints(self, details):
         '''
         Add springs into the anchor spring details
         '''
-        springs = []
-
-        data_x = details.db['node'].flatten('x', self.dynamic_handles)
-        data_node_id = details.db['node'].flatten('ID', self.dynamic_handles)
-
-        # Linear search => it will be inefficient for dynamic objects with many nodes
-        distance2 = self.distance * self.distance
-        for i in range(len(data_x)):
-            node_pos = data_x[i]
-            node_ids = [data_node_id[i]]
-
-            closest_param = algo.simplex_lib.ClosestResult()
-            algo.simplex_lib.get_closest_param(details.edge,
-                                               details.point, node_pos,
-                                               closest_param,
-                                               self.edge_handles)
-
-            if closest_param.squared_distance < distance2:
-                # add spring
-                spring = AnchorSpring()
-                spring.kinematic_component_IDs = closest_param.points
-                spring.kinematic_component_param = np.float64(closest_param.t)
-                spring.kinematic_component_pos = closest_param.position
-                spring.node_IDs = np.copy(node_ids)
-                spring.stiffness = self.stiffness
-                spring.damping = self.damping
-                springs.append(spring)
-
-        initialize_condition_from_aos(self, springs, details)
-
+        points = details.point
+        cell_size = max(self.distance, algo.spatial_hash_lib.mean_edge_length(details.edge, points))
+        edge_hash = algo.spatial_hash_lib.build(details.edge, points, self.edge_handles, cell_size)
+
+        num_nodes = block_utils.compute_num_elements(details.node, self.dynamic_handles)
+        attachment_node_IDs = np.empty((num_nodes, 1, item_utils.ID_SIZE), dtype=np.int32)
+        attachment_edge_IDs = np.empty((num_nodes, 2, item_utils.ID_SIZE), dtype=np.int32)
+        attachment_params = np.empty(num_nodes, dtype=np.float64)
+        attachment_positions = np.empty((num_nodes, 2), dtype=np.float64)
+        num_attachments = np.zeros(1, dtype=np.int64)
+        find_kinematic_attachments(details.node, points, details.edge, edge_hash, self.distance,
+                                   attachment_node_IDs, attachment_edge_IDs, attachment_params,
+                                   attachment_positions, num_attachments, self.dynamic_handles)
+
+        n = num_attachments[0]
+        initialize_condition_from_soa(self, details, attachment_node_IDs[:n],
+                                      kinematic_component_IDs = attachment_edge_IDs[:n],
+                                      kinematic_component_param = attachment_params[:n],
+                                      kinematic_component_pos = attachment_positions[:n])
 
 class DynamicAttachmentCondition(Condition):
     '''
@@ -227,38 +233,26 @@ class DynamicAttachmentCondition(Condition):
         self.func.compute_hessians = None
         self.func.compute_forces = algo.spring_lib.compute_forces
         self.func.compute_force_jacobians = algo.spring_lib.compute_force_jacobians
+        self.func.compute_energy = algo.spring_lib.compute_energy
 
     def init_constraints(self, details):
         '''
         Add springs into the spring details
         '''
-        springs = []
-        distance2 = self.distance * self.distance
-
         data_x0 = details.db['node'].flatten('x', self.dynamic0_handles)
         data_node_id0 = details.db['node'].flatten('ID', self.dynamic0_handles)
         data_x1 = details.db['node'].flatten('x', self.dynamic1_handles)
         data_node_id1 = details.db['node'].flatten('ID', self.dynamic1_handles)
 
-        for i in range(len(data_x0)):
-            for j in range(len(data_x1)):
-                x0 = data_x0[i]
-                x1 = data_x1[j]
-                direction = (x0 - x1)
-                dist2 = np.inner(direction, direction)
-                if dist2 < distance2:
-                    node_id0 = data_node_id0[i]
-                    node_id1 = data_node_id1[j]
-                    node_ids = [node_id0, node_id1]
-
-                    # add spring
-                    spring = Spring()
-                    spring.node_IDs = np.copy(node_ids)
-                    spring.stiffness = self.stiffness
-                    spring.damping = self.damping
-                    springs.append(spring)
-
-        initialize_condition_from_aos(self, springs, details)
+        # radius query from the nodes of dynamic_0 into the spatial hash of dynamic_1
+        # (the distance is the cell size, no pair is strictly within a zero distance)
+        pairs = np.empty((0, 2), dtype=np.int64)
+        if self.distance > 0.0:
+            point_hash = algo.spatial_hash_lib.build_points(data_x1, self.distance)
+            pairs = algo.spatial_hash_lib.find_pairs_within(point_hash, data_x1, data_x0, self.distance)
+        node_ids = np.stack((data_node_id0[pairs[:, 0]], data_node_id1[pairs[:, 1]]), axis=1)
+
+        initialize_condition_from_soa(self, details, node_ids)
 
 class EdgeCondition(Condition):
     '''
@@ -268,14 +262,7 @@ class EdgeCondition(Condition):
     def __init__(self, dynamics, stiffness, damping):
         Condition.__init__(self, stiffness, damping, Spring)
         # fetch the node IDs
-        self.node_ids = []
-        for dynamic in dynamics:
-            for vertex_index in dynamic.edge_ids:
-                node_ids = [dynamic.get_node_id(vertex_index[0]),
-                            dynamic.get_node_id(vertex_index[1])]
-                self.node_ids.append(node_ids)
-
-        self.node_ids = np.asarray(self.node_ids)
+        self.node_ids = node_ids_from_connectivity(dynamics, 'edge_ids', num_nodes = 2)
         # functions
         self.func.pre_compute = None
         self.func.compute_rest = algo.spring_lib.compute_rest
@@ -284,18 +271,10 @@ class EdgeCondition(Condition):
         self.func.compute_hessians = None
         self.func.compute_forces = algo.spring_lib.compute_forces
         self.func.compute_force_jacobians = algo.spring_lib.compute_force_jacobians
+        self.func.compute_energy = algo.spring_lib.compute_energy
 
     def init_constraints(self, details):
-        springs = []
-        for node_ids in self.node_ids:
-            # add spring
-            spring = Spring()
-            spring.node_IDs = node_ids
-            spring.stiffness = self.stiffness
-            spring.damping = self.damping
-            springs.append(spring)
-
-        initialize_condition_from_aos(self, springs, details)
+        initialize_condition_from_soa(self, details, self.node_ids)
 
 class AreaCondition(Condition):
     '''
@@ -305,15 +284,7 @@ class AreaCondition(Condition):
     def __init__(self, dynamics, stiffness, damping):
         Condition.__init__(self, stiffness, damping, Area)
         # fetch the node IDs
-        self.node_ids = []
-        for dynamic in dynamics:
-            for vertex_index in dynamic.face_ids:
-                node_ids = [dynamic.get_node_id(vertex_index[0]),
-                            dynamic.get_node_id(vertex_index[1]),
-                            dynamic.get_node_id(vertex_index[2])]
-                self.node_ids.append(node_ids)
-
-        self.node_ids = np.asarray(self.node_ids)
+        self.node_ids = node_ids_from_connectivity(dynamics, 'face_ids', num_nodes = 3)
         # functions
         self.func.pre_compute = None
         self.func.compute_rest = algo.area_lib.compute_rest
@@ -322,18 +293,10 @@ class AreaCondition(Condition):
         self.func.compute_hessians = None
         self.func.compute_forces = algo.area_lib.compute_forces
         self.func.compute_force_jacobians = algo.area_lib.compute_force_jacobians
+        self.func.compute_energy = algo.area_lib.compute_energy
 
     def init_constraints(self, details):
-        constraints = []
-        for node_ids in self.node_ids:
-            # add area constraint
-            constraint = Area()
-            constraint.node_IDs = node_ids
-            constraint.stiffness = self.stiffness
-            constraint.damping = self.damping
-            constraints.append(constraint)
-
-        initialize_condition_from_aos(self, constraints, details)
+        initialize_condition_from_soa(self, details, self.node_ids)
 
 class WireBendingCondition(Condition):
     '''
@@ -356,7 +319,7 @@ class WireBendingCondition(Condition):
                                      dynamic.get_node_id(vtx_neighbour_index[1])]
                          self.node_ids.append(node_ids)
 
-        self.node_ids = np.asarray(self.node_ids)
+        self.node_ids = np.asarray(self.node_ids, dtype=np.int32).reshape(-1, 3, item_utils.ID_SIZE)
         # functions
         self.func.pre_compute = None
         self.func.compute_rest = algo.bending_lib.compute_rest
@@ -365,16 +328,7 @@ class WireBendingCondition(Condition):
         self.func.compute_hessians = None
         self.func.compute_forces = algo.bending_lib.compute_forces
         self.func.compute_force_jacobians = algo.bending_lib.compute_force_jacobians
+        self.func.compute_energy = algo.bending_lib.compute_energy
 
     def init_constraints(self, details):
-        constraints = []
-
-        for node_ids in self.node_ids:
-            # add bending constraint
-            constraint = Bending()
-            constraint.node_IDs = node_ids
-            constraint.stiffness = self.stiffness
-            constraint.damping = self.damping
-            constraints.append(constraint)
-
-        initialize_condition_from_aos(self, constraints, details)
+        initialize_condition_from_soa(self, details, self.node_ids)
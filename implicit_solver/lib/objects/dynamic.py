@@ -47,7 +47,7 @@ class Dynamic:
         num_edges = len(self.edge_ids)
         num_faces = len(self.face_ids)
         shape = core.Shape(num_vertices, num_edges, num_faces)
-        shape.vertex = details.db['node'].flatten('x', self.block_handles)
+        details.db['node'].gather_into('x', shape.vertex, self.block_handles)
         shape.edge = np.copy(self.edge_ids)
         shape.face = np.copy(self.face_ids)
 
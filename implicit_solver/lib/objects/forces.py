@@ -20,7 +20,7 @@ class Force:
     def apply_forces(self, nodes):
         pass
 
-@generate.vectorize
+@generate.vectorize(parallel=True)
 def apply_gravity(node : Node, gravity):
     node.f += gravity * node.m
 
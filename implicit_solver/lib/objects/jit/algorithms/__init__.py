@@ -4,4 +4,5 @@ import lib.objects.jit.algorithms.anchor_spring_lib as anchor_spring_lib
 import lib.objects.jit.algorithms.area_lib as area_lib
 import lib.objects.jit.algorithms.bending_lib as bending_lib
 import lib.objects.jit.algorithms.simplex_lib as simplex_lib
+import lib.objects.jit.algorithms.spatial_hash_lib as spatial_hash_lib
 import lib.objects.jit.algorithms.spring_lib as spring_lib
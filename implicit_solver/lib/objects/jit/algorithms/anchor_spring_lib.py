@@ -41,3 +41,9 @@ def compute_force_jacobians(anchor_spring : AnchorSpring, details):
     dfdv = spring_lib.spring_damping_jacobian(x, target_pos, v, kinematic_vel, anchor_spring.damping)
     anchor_spring.dfdx[0][0] = dfdx
     anchor_spring.dfdv[0][0] = dfdv
+
+@generate.vectorize
+def compute_energy(anchor_spring : AnchorSpring, details):
+    x = db.x(details.node, anchor_spring.node_IDs[0])
+    target_pos = anchor_spring.kinematic_component_pos
+    anchor_spring.energy = spring_lib.elastic_spring_energy(x, target_pos, anchor_spring.rest_length, anchor_spring.stiffness)
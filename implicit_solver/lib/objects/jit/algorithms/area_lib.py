@@ -11,7 +11,8 @@ from lib.objects.jit.data import Area
 import core.code_gen as generate
 import lib.objects.jit.algorithms.data_accessor as db
 import core.jit.math_2d as math2D
-from lib.objects.jit.algorithms.differentiation_lib import force_jacobians_from_energy
+from lib.objects.jit.algorithms.differentiation_lib import force_jacobians_function
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
 @generate.vectorize
 def compute_rest(area : Area, details):
@@ -39,17 +40,28 @@ def compute_force_jacobians(area : Area, details):
     area.dfdx[0][0] = jacobians[0]
     area.dfdx[1][1] = jacobians[1]
     area.dfdx[2][2] = jacobians[2]
-    area.dfdx[0][1] = area.dfdx[1][0] = jacobians[3]
-    area.dfdx[0][2] = area.dfdx[2][0] = jacobians[4]
-    area.dfdx[1][2] = area.dfdx[2][1] = jacobians[5]
+    area.dfdx[0][1] = jacobians[3]
+    area.dfdx[1][0] = jacobians[3].T
+    area.dfdx[0][2] = jacobians[4]
+    area.dfdx[2][0] = jacobians[4].T
+    area.dfdx[1][2] = jacobians[5]
+    area.dfdx[2][1] = jacobians[5].T
 
-@numba.njit
+@generate.vectorize
+def compute_energy(area : Area, details):
+    X = np.empty((3, 2))
+    X[0] = db.x(details.node, area.node_IDs[0])
+    X[1] = db.x(details.node, area.node_IDs[1])
+    X[2] = db.x(details.node, area.node_IDs[2])
+    area.energy = elastic_area_energy(X, area.rest_area, area.stiffness)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def elastic_area_energy(X, rest_area, stiffness):
     # X => [x0, x1, x2]
     area = math2D.area(X[0], X[1], X[2])
     return 0.5 * stiffness * ((area - rest_area)**2)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def elastic_area_forces(x0, x1, x2, rest_area, stiffness):
     forces = np.zeros((3, 2))
 
@@ -71,12 +83,8 @@ def elastic_area_forces(x0, x1, x2, rest_area, stiffness):
 
     return forces
 
-@numba.njit
-def elastic_area_numerical_jacobians(x0, x1, x2, rest_area, stiffness):
-    '''
-    Returns the six jacobians matrices in the following order
-    df0dx0, df1dx1, df2dx2, df0dx1, df0dx2, df1dx2
-    dfdx01 is the derivative of f0 relative to x1
-    '''
-    return force_jacobians_from_energy(x0, x1, x2, rest_area, stiffness, elastic_area_energy)
+# Returns the six jacobians matrices in the following order
+# df0dx0, df1dx1, df2dx2, df0dx1, df0dx2, df1dx2
+# dfdx01 is the derivative of f0 relative to x1
+elastic_area_numerical_jacobians = force_jacobians_function(elastic_area_energy)
 
@@ -0,0 +1,204 @@
+"""
+@author: Vincent Bonnet
+@description : Hessian of the bending energy
+Generated by lib/experimental/symbolic.py (bending_hessian_codegen), do not edit
+"""
+
+import math
+import numba
+import numpy as np
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def elastic_bending_hessian(x0, x1, x2, rest_angle, stiffness):
+    '''
+    Returns the 6x6 hessian of elastic_bending_energy
+    relative to (x0[0], x0[1], x1[0], x1[1], x2[0], x2[1])
+    '''
+    px0 = x0[0]
+    py0 = x0[1]
+    px1 = x1[0]
+    py1 = x1[1]
+    px2 = x2[0]
+    py2 = x2[1]
+    t0 = px0 - px1
+    t1 = t0**2
+    t2 = py0 - py1
+    t3 = t2**2
+    t4 = t1 + t3
+    t5 = math.sqrt(t4)
+    t6 = 1/t5
+    t7 = -t0
+    t8 = -py2
+    t9 = py1 + t8
+    t10 = -t9
+    t11 = t10*t7
+    t12 = -px2
+    t13 = px1 + t12
+    t14 = -t13
+    t15 = -t2
+    t16 = t14*t15
+    t17 = t11 - t16
+    t18 = t10*t15 + t14*t7
+    t19 = rest_angle - math.atan2(t17, t18)
+    t20 = 0.25*t19**2
+    t21 = t20*t6
+    t22 = t4**(-3/2)
+    t23 = t1*t22
+    t24 = t20*t23
+    t25 = t13**2
+    t26 = t9**2
+    t27 = t25 + t26
+    t28 = math.sqrt(t27)
+    t29 = t28 + t5
+    t30 = t0*t13
+    t31 = t2*t9
+    t32 = t30 + t31
+    t33 = t0*t9
+    t34 = t13*t2
+    t35 = t33 - t34
+    t36 = t32**2 + t35**2
+    t37 = t36**(-2)
+    t38 = t13*t17
+    t39 = -t32*t9 + t38
+    t40 = -t39
+    t41 = t0*t6
+    t42 = t19*t40
+    t43 = 1/t36
+    t44 = 1.0*t43
+    t45 = t17*t9
+    t46 = t19*t29
+    t47 = 1.0*t37
+    t48 = t46*t47
+    t49 = t0*t2*t22
+    t50 = t20*t49
+    t51 = t13*t32
+    t52 = t45 + t51
+    t53 = t2*t6
+    t54 = 0.5*t43
+    t55 = t42*t54
+    t56 = 0.5*t29
+    t57 = t37*t56
+    t58 = t40*t57
+    t59 = t32*t9
+    t60 = t14*t17 + t18*t9
+    t61 = 2*t43
+    t62 = t60*t61
+    t63 = t46*t54
+    t64 = py0 + t8
+    t65 = t32*t64
+    t66 = px0 - 2*px1 + px2
+    t67 = t17*t66 + t65
+    t68 = 1/t28
+    t69 = -t13*t68 + t41
+    t70 = -t69
+    t71 = -t17*t64 + t18*t66
+    t72 = t61*t71
+    t73 = -t11 + t16
+    t74 = px0 + t12
+    t75 = t32*t74
+    t76 = py0 - 2*py1 + py2
+    t77 = t17*t76
+    t78 = t75 - t77
+    t79 = t19*t41
+    t80 = t53 - t68*t9
+    t81 = -t80
+    t82 = t17*t74 + t18*t76
+    t83 = t61*t82
+    t84 = t2*t32
+    t85 = t0*t17
+    t86 = t84 + t85
+    t87 = t17*t2 + t18*t7
+    t88 = t61*t87
+    t89 = t33 + t34
+    t90 = stiffness*t54
+    t91 = t0*t32
+    t92 = -t17*t2 + t91
+    t93 = -t92
+    t94 = t15*t18 + t17*t7
+    t95 = t43*t94
+    t96 = t19*t53
+    t97 = t22*t3
+    t98 = -t20*t97 + t21
+    t99 = t54*t96
+    t100 = t52*t57
+    t101 = t19*t52
+    t102 = rest_angle - math.atan2(t35, t32)
+    t103 = t13*t68
+    t104 = t102*t103
+    t105 = t0*t35 + t84
+    t106 = t102*t105
+    t107 = t29*t43
+    t108 = t107*t52
+    t109 = t2*t35 - t91
+    t110 = t109*t43
+    t111 = t110*t35
+    t112 = t102*t29
+    t113 = t68*t9
+    t114 = 2*t95
+    t115 = t27**(-3/2)
+    t116 = t115*t25
+    t117 = -t6 - t68
+    t118 = t102**2
+    t119 = 0.25*t118
+    t120 = 1.0*t102
+    t121 = t120*t43
+    t122 = t43*(t32*t66 - t35*t64)
+    t123 = t35*t66
+    t124 = t107*t120
+    t125 = t115*t13*t9
+    t126 = t57*t67
+    t127 = 1/t27
+    t128 = t54*t67
+    t129 = t102*t43*t56
+    t130 = t119*t125
+    t131 = t102*t113
+    t132 = t102*t92
+    t133 = t105*t61
+    t134 = t115*t26
+    t135 = t35*t76
+    t136 = -t135 + t75
+    t137 = t43*(t32*t76 + t35*t74)
+    t138 = t136*t54
+    t139 = t136*t57
+    t140 = t54*t80
+    t141 = t119*t68
+    t142 = t112*t47
+    H = np.empty((6, 6))
+    H[0, 0] = stiffness*(t21 - t24 + 0.5*t29*t37*t40**2 - t39*t48*(t13*t18 + t45) - t41*t42*t44)
+    H[0, 1] = stiffness*(0.5*t0*t19*t43*t52*t6 - t50 - t52*t58 - t53*t55 - t63*(t27 + t38*t62 - t59*t62))
+    H[1, 0] = H[0, 1]
+    H[0, 2] = stiffness*(0.5*t0*t19*t43*t6*t67 - t21 + t24 - t55*t70 - t58*t67 - t63*(t13*t64 + t38*t72 - t59*t72 + t66*t9 + t73))
+    H[2, 0] = H[0, 2]
+    H[0, 3] = stiffness*(0.5*t29*t37*t40*t78 + t50 - t54*t78*t79 - t55*t81 - t63*(-t13*t74 + t32 + t38*t83 - t59*t83 + t76*t9))
+    H[3, 0] = H[0, 3]
+    H[0, 4] = t90*(t13*t19*t40*t68 + t29*t40*t43*t86 - t46*(2*t13*t17*t43*t87 - t59*t88 - t73 - t89) - t79*t86)
+    H[4, 0] = H[0, 4]
+    H[0, 5] = t90*(t19*t40*t68*t9 + t29*t40*t43*t93 - 2*t46*(t13*t17*t43*t94 - t31 - t59*t95) - t79*t93)
+    H[5, 0] = H[0, 5]
+    H[1, 1] = stiffness*(t44*t52*t96 - t48*t52*t60 + t52**2*t57 + t98)
+    H[1, 2] = stiffness*(t100*t67 + t101*t54*t70 + t50 - t63*(2*t13*t32*t43*t71 - t13*t66 + 2*t17*t43*t71*t9 - t32 + t64*t9) + t67*t99)
+    H[2, 1] = H[1, 2]
+    H[1, 3] = stiffness*(-t100*t78 + 0.5*t19*t43*t52*t81 - t63*(2*t13*t32*t43*t82 - t13*t76 + 2*t17*t43*t82*t9 - t17 - t74*t9) - t78*t99 - t98)
+    H[3, 1] = H[1, 3]
+    H[1, 4] = -t90*(t104*t52 + t105*t108 + t106*t53 + 2*t112*(t110*t51 + t111*t9 + t30))
+    H[4, 1] = H[1, 4]
+    H[1, 5] = -t90*(t101*t113 + t108*t93 + t46*(t114*t45 + t114*t51 + t17 + t89) + t93*t96)
+    H[5, 1] = H[1, 5]
+    H[2, 2] = stiffness*(-t119*(t116 + t117 + t23) - t121*t67*t69 - t124*(t122*t123 + t122*t65 + t35) + 0.5*t29*t37*t67**2)
+    H[2, 3] = stiffness*(-t126*t78 + 0.5*t19*t43*t67*t81 - t19*t54*t70*t78 - t20*(t125 + t49) - t63*(2*t17*t43*t66*t82 + 2*t32*t43*t64*t82 - t64*t76 - t66*t74))
+    H[3, 2] = H[2, 3]
+    H[2, 4] = stiffness*(0.5*t102*t105*t43*t69 - t104*t128 - t105*t126 + 0.25*t118*t68*(t127*t25 - 1) - t129*(t0*t64 + 2*t110*t65 + 2*t111*t66 - t2*t66 - t33 + t34))
+    H[4, 2] = H[2, 4]
+    H[2, 5] = stiffness*(-t128*t131 - t129*(t0*t66 - t123*t133 - t133*t65 + t2*t64 + t32) + t130 - t132*t54*t69 + 0.5*t29*t37*t67*t92)
+    H[5, 2] = H[2, 5]
+    H[3, 3] = stiffness*(1.0*t102*t136*t43*t80 - t119*(t117 + t134 + t97) - t124*(t135*t137 - t137*t75 + t35) + 0.5*t136**2*t29*t37)
+    H[3, 4] = stiffness*(t104*t138 + t105*t139 + t106*t140 + t129*(t0*t74 + t2*t76 + t32 + t75*t88 - t77*t88) + t130)
+    H[4, 3] = H[3, 4]
+    H[3, 5] = stiffness*(t129*(-t0*t76 + t114*t75 - t114*t77 + t17 + t2*t74) + t131*t138 - t132*t140 - t139*t92 + t141*(t127*t26 - 1))
+    H[5, 3] = H[3, 5]
+    H[4, 4] = stiffness*(t103*t106*t44 + t105**2*t57 - t116*t119 + t141 + t142*t86*t87)
+    H[4, 5] = stiffness*(0.5*t102*t105*t43*t68*t9 + 0.5*t102*t29*t43*(t114*t84 + t114*t85 + t4) - t104*t54*t92 - t105*t57*t92 - t130)
+    H[5, 4] = H[4, 5]
+    H[5, 5] = stiffness*(-t105*t109*t142 - t113*t121*t92 + 0.25*t118*t68 - t119*t134 + 0.5*t29*t37*t92**2)
+    return H
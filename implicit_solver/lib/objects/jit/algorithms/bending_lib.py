@@ -11,7 +11,9 @@ from lib.objects.jit.data import Bending
 import core.code_gen as generate
 import lib.objects.jit.algorithms.data_accessor as db
 import core.jit.math_2d as math2D
-from lib.objects.jit.algorithms.differentiation_lib import force_jacobians_from_energy
+from lib.objects.jit.algorithms.differentiation_lib import force_jacobians_function
+from lib.objects.jit.algorithms.bending_hessian_lib import elastic_bending_hessian
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
 @generate.vectorize
 def compute_rest(bending : Bending, details):
@@ -35,21 +37,32 @@ def compute_force_jacobians(bending : Bending, details):
     x0 = db.x(details.node, bending.node_IDs[0])
     x1 = db.x(details.node, bending.node_IDs[1])
     x2 = db.x(details.node, bending.node_IDs[2])
-    dfdx = elastic_bending_numerical_jacobians(x0, x1, x2, bending.rest_angle, bending.stiffness)
+    dfdx = elastic_bending_jacobians(x0, x1, x2, bending.rest_angle, bending.stiffness)
     bending.dfdx[0][0] = dfdx[0]
     bending.dfdx[1][1] = dfdx[1]
     bending.dfdx[2][2] = dfdx[2]
-    bending.dfdx[0][1] = bending.dfdx[1][0] = dfdx[3]
-    bending.dfdx[0][2] = bending.dfdx[2][0] = dfdx[4]
-    bending.dfdx[1][2] = bending.dfdx[2][1] = dfdx[5]
+    bending.dfdx[0][1] = dfdx[3]
+    bending.dfdx[1][0] = dfdx[3].T
+    bending.dfdx[0][2] = dfdx[4]
+    bending.dfdx[2][0] = dfdx[4].T
+    bending.dfdx[1][2] = dfdx[5]
+    bending.dfdx[2][1] = dfdx[5].T
 
-@numba.njit
+@generate.vectorize
+def compute_energy(bending : Bending, details):
+    X = np.empty((3, 2))
+    X[0] = db.x(details.node, bending.node_IDs[0])
+    X[1] = db.x(details.node, bending.node_IDs[1])
+    X[2] = db.x(details.node, bending.node_IDs[2])
+    bending.energy = elastic_bending_energy(X, bending.rest_angle, bending.stiffness)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def elastic_bending_energy(X, rest_angle, stiffness):
     angle = math2D.angle(X[0], X[1], X[2])
     arc_length = (math2D.norm(X[1] - X[0]) + math2D.norm(X[2] - X[1])) * 0.5
     return 0.5 * stiffness * ((angle - rest_angle)**2) * arc_length
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def elastic_bending_forces(x0, x1, x2, rest_angle, stiffness):
     forces = np.zeros((3, 2))
 
@@ -79,11 +92,23 @@ def elastic_bending_forces(x0, x1, x2, rest_angle, stiffness):
 
     return forces
 
-@numba.njit
-def elastic_bending_numerical_jacobians(x0, x1, x2, rest_angle, stiffness):
+# Returns the six jacobians matrices in the following order
+# df0dx0, df1dx1, df2dx2, df0dx1, df0dx2, df1dx2
+# dfdx01 is the derivative of f0 relative to x1
+elastic_bending_numerical_jacobians = force_jacobians_function(elastic_bending_energy)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def elastic_bending_jacobians(x0, x1, x2, rest_angle, stiffness):
     '''
-    Returns the six jacobians matrices in the following order
-    df0dx0, df1dx1, df2dx2, df0dx1, df0dx2, df1dx2
-    dfdx01 is the derivative of f0 relative to x1
+    Returns the six jacobians matrices in the same order as elastic_bending_numerical_jacobians
+    The jacobians are the negated blocks of the analytic hessian (see bending_hessian_lib)
     '''
-    return force_jacobians_from_energy(x0, x1, x2, rest_angle, stiffness, elastic_bending_energy)
+    H = elastic_bending_hessian(x0, x1, x2, rest_angle, stiffness)
+    jacobians = np.empty((6, 2, 2))
+    jacobians[0] = H[0:2, 0:2] * -1.0
+    jacobians[1] = H[2:4, 2:4] * -1.0
+    jacobians[2] = H[4:6, 4:6] * -1.0
+    jacobians[3] = H[0:2, 2:4] * -1.0
+    jacobians[4] = H[0:2, 4:6] * -1.0
+    jacobians[5] = H[2:4, 4:6] * -1.0
+    return jacobians
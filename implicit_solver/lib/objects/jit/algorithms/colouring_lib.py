@@ -0,0 +1,101 @@
+"""
+@author: Vincent Bonnet
+@description : Greedy colouring of constraint blocks
+Two blocks sharing a node get a different colour, therefore the blocks
+of the same colour can be processed in parallel without write conflicts
+Based on graph_optimization/graphColouring_greedyAlgorithm.py
+"""
+
+import numba
+import numpy as np
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def node_key(ID):
+    '''
+    Returns a unique integer from a node ID (block_handle, index)
+    '''
+    return np.int64(ID[0]) * 4294967296 + np.int64(ID[1])
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def compute_block_colours(blocks, block_handles):
+    '''
+    Returns the colour of each block from block_handles
+    '''
+    num_blocks = len(block_handles)
+
+    # collect (node key, block index) pairs
+    num_pairs = 0
+    for i in range(num_blocks):
+        block = blocks[block_handles[i]][0]
+        num_pairs += block['blockInfo_size'] * block['node_IDs'].shape[1]
+
+    keys = np.empty(num_pairs, dtype=np.int64)
+    owners = np.empty(num_pairs, dtype=np.int64)
+    pair_id = 0
+    for i in range(num_blocks):
+        block = blocks[block_handles[i]][0]
+        node_IDs = block['node_IDs']
+        for ct_index in range(block['blockInfo_size']):
+            for node_index in range(node_IDs.shape[1]):
+                keys[pair_id] = node_key(node_IDs[ct_index][node_index])
+                owners[pair_id] = i
+                pair_id += 1
+
+    # group the pairs per node : the blocks sharing a node are adjacent
+    order = np.argsort(keys)
+    sorted_keys = keys[order]
+    sorted_owners = owners[order]
+    group_ids = np.empty(num_pairs, dtype=np.int64)
+    group_offsets = np.empty(num_pairs+1, dtype=np.int64)
+    num_groups = 0
+    for p in range(num_pairs):
+        if p == 0 or sorted_keys[p] != sorted_keys[p-1]:
+            group_offsets[num_groups] = p
+            num_groups += 1
+        group_ids[p] = num_groups - 1
+    group_offsets[num_groups] = num_pairs
+
+    # pairs of each block (positions into the sorted arrays)
+    block_pairs = np.argsort(sorted_owners, kind='mergesort')
+    block_offsets = np.zeros(num_blocks+1, dtype=np.int64)
+    for p in range(num_pairs):
+        block_offsets[sorted_owners[p]+1] += 1
+    for i in range(num_blocks):
+        block_offsets[i+1] += block_offsets[i]
+
+    # greedy colouring
+    colours = np.full(num_blocks, -1, dtype=np.int64)
+    forbidden = np.full(num_blocks+1, -1, dtype=np.int64) # stamped with block index
+    for i in range(num_blocks):
+        for p in range(block_offsets[i], block_offsets[i+1]):
+            group_id = group_ids[block_pairs[p]]
+            for q in range(group_offsets[group_id], group_offsets[group_id+1]):
+                colour = colours[sorted_owners[q]]
+                if colour >= 0:
+                    forbidden[colour] = i
+
+        colour = 0
+        while forbidden[colour] == i:
+            colour += 1
+        colours[i] = colour
+
+    return colours
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def group_block_handles(block_handles, colours):
+    '''
+    Returns a list of block handles per colour
+    '''
+    num_colours = 0
+    if len(colours) > 0:
+        num_colours = np.max(colours) + 1
+
+    groups = numba.typed.List()
+    for _ in range(num_colours):
+        groups.append(numba.typed.List.empty_list(numba.int64))
+
+    for i in range(len(block_handles)):
+        groups[colours[i]].append(block_handles[i])
+
+    return groups
@@ -6,20 +6,21 @@ This file could be auto-generated based on DataBlock
 """
 
 import numba
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def x(blocks, ID):
     block_handle = ID[0]
     index = ID[1]
     return blocks[block_handle][0]['x'][index]
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def v(blocks, ID):
     block_handle = ID[0]
     index = ID[1]
     return blocks[block_handle][0]['v'][index]
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def xv(blocks, ID):
     block_handle = ID[0]
     index = ID[1]
@@ -28,7 +29,7 @@ def xv(blocks, ID):
     v = blocks[block_handle][0]['v'][index]
     return (x, v)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def add_f(blocks, ID, force):
     block_handle = ID[0]
     index = ID[1]
@@ -36,7 +37,7 @@ def add_f(blocks, ID, force):
     f = blocks[block_handle][0]['f'][index]
     f += force
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def system_index(blocks, ID):
     block_handle = ID[0]
     index = ID[1]
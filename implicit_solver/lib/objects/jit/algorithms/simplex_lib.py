@@ -32,13 +32,13 @@ class IsInsideResult(object):
     def __init__(self):
         self.isInside = False
 
-@generate.vectorize
+@generate.vectorize(parallel=True)
 def transform_point(point : Point, rotation_matrix, translate):
     #np.dot(point.x, rotation_matrix, out=point.x) #  not working with Numba0.45.1
     point.x = np.dot(point.local_x, rotation_matrix)
     point.x += translate
 
-@generate.vectorize
+@generate.vectorize(parallel=True)
 def transform_normal(edge : Edge, rotation_matrix):
     edge.normal = np.dot(edge.local_normal, rotation_matrix)
 
@@ -0,0 +1,300 @@
+"""
+@author: Vincent Bonnet
+@description : Spatial hash to accelerate the queries on simplices and points (broad-phase)
+The bounding box of each simplex is rasterized into the cells of a uniform grid
+and the cells are hashed into a table of buckets stored as compressed rows
+bucket_offsets[bucket] : bucket_offsets[bucket+1] gives the range of simplex IDs
+The points are hashed the same way and the buckets store the point indices
+"""
+
+import math
+import numba
+import numpy as np
+
+import lib.objects.jit.algorithms.data_accessor as db
+import core.jit.math_2d as math2D
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
+
+# Spatial hash layout (cell_size, table_size, bucket_offsets, simplex_IDs, cell_bounds)
+# cell_bounds stores the min/max cell coordinates of all simplices (min_i, min_j, max_i, max_j)
+
+@numba.njit(inline='always')
+def cell_coord(value, cell_size):
+    return np.int64(math.floor(value / cell_size))
+
+@numba.njit(inline='always')
+def hash_cell(i, j, table_size):
+    # large primes from 'Optimized Spatial Hashing for Collision Detection of Deformable Objects'
+    return ((i * 73856093) ^ (j * 19349663)) % table_size
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def simplex_bounds(simplex_blocks, point_blocks, block_handle, index):
+    '''
+    Returns the bounding box (min_x, min_y, max_x, max_y) of a simplex
+    '''
+    point_IDs = simplex_blocks[block_handle][0]['point_IDs'][index]
+    x = db.x(point_blocks, point_IDs[0])
+    bounds = np.array([x[0], x[1], x[0], x[1]])
+    for p in range(1, len(point_IDs)):
+        x = db.x(point_blocks, point_IDs[p])
+        bounds[0] = min(bounds[0], x[0])
+        bounds[1] = min(bounds[1], x[1])
+        bounds[2] = max(bounds[2], x[0])
+        bounds[3] = max(bounds[3], x[1])
+    return bounds
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def mean_edge_length(edge_blocks, point_blocks):
+    '''
+    Returns the mean length of the active edges (1.0 if there are no edges)
+    '''
+    total_length = 0.0
+    num_edges = 0
+    for block_handle in range(len(edge_blocks)):
+        block = edge_blocks[block_handle][0]
+        if not block['blockInfo_active']:
+            continue
+        for index in range(block['blockInfo_size']):
+            x0 = db.x(point_blocks, block['point_IDs'][index][0])
+            x1 = db.x(point_blocks, block['point_IDs'][index][1])
+            total_length += math.sqrt((x1[0]-x0[0])**2 + (x1[1]-x0[1])**2)
+            num_edges += 1
+
+    if num_edges == 0 or total_length == 0.0:
+        return 1.0
+
+    return total_length / num_edges
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def rasterize(simplex_blocks, point_blocks, block_handles, cell_size, table_size,
+              bucket_offsets, simplex_IDs, cell_bounds, fill):
+    '''
+    Counts the simplices per bucket (fill == False) or stores the simplex IDs (fill == True)
+    '''
+    bucket_counters = np.copy(bucket_offsets)
+    for block_handle in block_handles:
+        block = simplex_blocks[block_handle][0]
+        if not block['blockInfo_active']:
+            continue
+        for index in range(block['blockInfo_size']):
+            bounds = simplex_bounds(simplex_blocks, point_blocks, block_handle, index)
+            min_i = cell_coord(bounds[0], cell_size)
+            min_j = cell_coord(bounds[1], cell_size)
+            max_i = cell_coord(bounds[2], cell_size)
+            max_j = cell_coord(bounds[3], cell_size)
+            cell_bounds[0] = min(cell_bounds[0], min_i)
+            cell_bounds[1] = min(cell_bounds[1], min_j)
+            cell_bounds[2] = max(cell_bounds[2], max_i)
+            cell_bounds[3] = max(cell_bounds[3], max_j)
+            for i in range(min_i, max_i+1):
+                for j in range(min_j, max_j+1):
+                    bucket = hash_cell(i, j, table_size)
+                    if fill:
+                        simplex_IDs[bucket_counters[bucket]][0] = block_handle
+                        simplex_IDs[bucket_counters[bucket]][1] = index
+                        bucket_counters[bucket] += 1
+                    else:
+                        bucket_offsets[bucket+1] += 1
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def build(simplex_blocks, point_blocks, block_handles, cell_size):
+    '''
+    Returns the spatial hash of the active simplices from block_handles
+    '''
+    num_simplices = 0
+    for block_handle in block_handles:
+        block = simplex_blocks[block_handle][0]
+        if block['blockInfo_active']:
+            num_simplices += block['blockInfo_size']
+
+    table_size = max(1, num_simplices * 2)
+    bucket_offsets = np.zeros(table_size+1, dtype=np.int64)
+    simplex_IDs = np.empty((0, 2), dtype=np.int32)
+    cell_bounds = np.empty(4, dtype=np.int64)
+    cell_bounds[0:2] = np.iinfo(np.int64).max
+    cell_bounds[2:4] = np.iinfo(np.int64).min
+
+    # count the simplices per bucket
+    rasterize(simplex_blocks, point_blocks, block_handles, cell_size, table_size,
+              bucket_offsets, simplex_IDs, cell_bounds, False)
+    for bucket in range(table_size):
+        bucket_offsets[bucket+1] += bucket_offsets[bucket]
+
+    # store the simplex IDs per bucket
+    simplex_IDs = np.empty((bucket_offsets[table_size], 2), dtype=np.int32)
+    rasterize(simplex_blocks, point_blocks, block_handles, cell_size, table_size,
+              bucket_offsets, simplex_IDs, cell_bounds, True)
+
+    return (cell_size, table_size, bucket_offsets, simplex_IDs, cell_bounds)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def is_inside(triangle_hash, triangle_blocks, point_blocks, position):
+    '''
+    Returns whether or not the position is inside a triangle
+    '''
+    cell_size, table_size, bucket_offsets, simplex_IDs, cell_bounds = triangle_hash
+    i = cell_coord(position[0], cell_size)
+    j = cell_coord(position[1], cell_size)
+    if i < cell_bounds[0] or i > cell_bounds[2] or j < cell_bounds[1] or j > cell_bounds[3]:
+        return False
+
+    bucket = hash_cell(i, j, table_size)
+    for k in range(bucket_offsets[bucket], bucket_offsets[bucket+1]):
+        point_IDs = triangle_blocks[simplex_IDs[k][0]][0]['point_IDs'][simplex_IDs[k][1]]
+        x0 = db.x(point_blocks, point_IDs[0])
+        x1 = db.x(point_blocks, point_IDs[1])
+        x2 = db.x(point_blocks, point_IDs[2])
+        v0 = x2 - x0
+        v1 = x1 - x0
+        v2 = position - x0
+
+        dot00 = math2D.dot(v0, v0)
+        dot01 = math2D.dot(v0, v1)
+        dot02 = math2D.dot(v0, v2)
+        dot11 = math2D.dot(v1, v1)
+        dot12 = math2D.dot(v1, v2)
+
+        inv = 1.0 / (dot00 * dot11 - dot01 * dot01)
+        a = (dot11 * dot02 - dot01 * dot12) * inv
+        b = (dot00 * dot12 - dot01 * dot02) * inv
+        if a>=0 and b>=0 and a+b<=1:
+            return True
+
+    return False
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def closest_edge(edge_hash, edge_blocks, point_blocks, position, max_distance=np.inf):
+    '''
+    Returns the closest edge from the position as (edge_ID, t, squared_distance)
+    The rings of cells around the position are visited until no closer edge can be found
+    The edges further than max_distance might be ignored (edge_ID is -1 when nothing is found)
+    '''
+    cell_size, table_size, bucket_offsets, simplex_IDs, cell_bounds = edge_hash
+    pi = cell_coord(position[0], cell_size)
+    pj = cell_coord(position[1], cell_size)
+
+    best_ID = np.full(2, -1, dtype=np.int32)
+    best_t = 0.0
+    best_squared_distance = np.finfo(np.float64).max
+    if len(simplex_IDs) == 0:
+        return best_ID, best_t, best_squared_distance
+
+    max_ring = max(abs(pi - cell_bounds[0]), abs(pi - cell_bounds[2]),
+                   abs(pj - cell_bounds[1]), abs(pj - cell_bounds[3]))
+    # the edges from the ring k are further than (k-1) * cell_size
+    if max_distance < max_ring * cell_size:
+        max_ring = np.int64(max_distance / cell_size) + 1
+    ring = 0
+    while ring <= max_ring:
+        for i in range(max(pi-ring, cell_bounds[0]), min(pi+ring, cell_bounds[2])+1):
+            for j in range(max(pj-ring, cell_bounds[1]), min(pj+ring, cell_bounds[3])+1):
+                # only the cells on the ring
+                if abs(i-pi) != ring and abs(j-pj) != ring:
+                    continue
+
+                bucket = hash_cell(i, j, table_size)
+                for k in range(bucket_offsets[bucket], bucket_offsets[bucket+1]):
+                    point_IDs = edge_blocks[simplex_IDs[k][0]][0]['point_IDs'][simplex_IDs[k][1]]
+                    x0 = db.x(point_blocks, point_IDs[0])
+                    x1 = db.x(point_blocks, point_IDs[1])
+                    edge_dir = x1 - x0
+                    t = math2D.dot(position - x0, edge_dir) / math2D.dot(edge_dir, edge_dir)
+                    t = max(min(t, 1.0), 0.0)
+                    vector_distance = position - (x0 + edge_dir * t)
+                    squared_distance = math2D.dot(vector_distance, vector_distance)
+                    # on equality, the first edge of the datablock is kept
+                    is_closer = squared_distance < best_squared_distance
+                    if squared_distance == best_squared_distance:
+                        is_closer = (simplex_IDs[k][0] < best_ID[0] or
+                                     (simplex_IDs[k][0] == best_ID[0] and simplex_IDs[k][1] < best_ID[1]))
+                    if is_closer:
+                        best_ID[:] = simplex_IDs[k]
+                        best_t = t
+                        best_squared_distance = squared_distance
+
+        # the edges from the next rings are further than ring * cell_size
+        min_distance = ring * cell_size
+        if best_squared_distance <= min_distance * min_distance:
+            break
+        ring += 1
+
+    return best_ID, best_t, best_squared_distance
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def build_points(positions, cell_size):
+    '''
+    Returns the spatial hash of the positions
+    '''
+    num_points = len(positions)
+    table_size = max(1, num_points * 2)
+    bucket_offsets = np.zeros(table_size+1, dtype=np.int64)
+    point_indices = np.empty(num_points, dtype=np.int64)
+    cell_bounds = np.empty(4, dtype=np.int64)
+    cell_bounds[0:2] = np.iinfo(np.int64).max
+    cell_bounds[2:4] = np.iinfo(np.int64).min
+
+    # count the points per bucket
+    buckets = np.empty(num_points, dtype=np.int64)
+    for p in range(num_points):
+        i = cell_coord(positions[p][0], cell_size)
+        j = cell_coord(positions[p][1], cell_size)
+        cell_bounds[0] = min(cell_bounds[0], i)
+        cell_bounds[1] = min(cell_bounds[1], j)
+        cell_bounds[2] = max(cell_bounds[2], i)
+        cell_bounds[3] = max(cell_bounds[3], j)
+        buckets[p] = hash_cell(i, j, table_size)
+        bucket_offsets[buckets[p]+1] += 1
+    for bucket in range(table_size):
+        bucket_offsets[bucket+1] += bucket_offsets[bucket]
+
+    # store the point indices per bucket
+    bucket_counters = np.copy(bucket_offsets)
+    for p in range(num_points):
+        point_indices[bucket_counters[buckets[p]]] = p
+        bucket_counters[buckets[p]] += 1
+
+    return (cell_size, table_size, bucket_offsets, point_indices, cell_bounds)
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def find_pairs_within(point_hash, hashed_positions, positions, radius):
+    '''
+    Returns the pairs (index into positions, index into hashed_positions)
+    closer than radius sorted by the first then the second index
+    '''
+    cell_size, table_size, bucket_offsets, point_indices, cell_bounds = point_hash
+    radius2 = radius * radius
+    pairs = numba.typed.List()
+    candidates = numba.typed.List.empty_list(numba.int64)
+    for p in range(len(positions)):
+        position = positions[p]
+        min_i = max(cell_coord(position[0] - radius, cell_size), cell_bounds[0])
+        min_j = max(cell_coord(position[1] - radius, cell_size), cell_bounds[1])
+        max_i = min(cell_coord(position[0] + radius, cell_size), cell_bounds[2])
+        max_j = min(cell_coord(position[1] + radius, cell_size), cell_bounds[3])
+        candidates.clear()
+        for i in range(min_i, max_i+1):
+            for j in range(min_j, max_j+1):
+                bucket = hash_cell(i, j, table_size)
+                for k in range(bucket_offsets[bucket], bucket_offsets[bucket+1]):
+                    q = point_indices[k]
+                    hashed_position = hashed_positions[q]
+                    # skip the points from other cells sharing the bucket
+                    if (cell_coord(hashed_position[0], cell_size) != i or
+                        cell_coord(hashed_position[1], cell_size) != j):
+                        continue
+                    direction = position - hashed_position
+                    if math2D.dot(direction, direction) < radius2:
+                        candidates.append(q)
+
+        sorted_candidates = np.empty(len(candidates), dtype=np.int64)
+        for k in range(len(candidates)):
+            sorted_candidates[k] = candidates[k]
+        sorted_candidates.sort()
+        for q in sorted_candidates:
+            pairs.append((p, q))
+
+    result = np.empty((len(pairs), 2), dtype=np.int64)
+    for k in range(len(pairs)):
+        result[k][0] = pairs[k][0]
+        result[k][1] = pairs[k][1]
+    return result
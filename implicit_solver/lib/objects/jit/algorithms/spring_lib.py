@@ -10,6 +10,7 @@ from lib.objects.jit.data import Spring
 import core.code_gen as generate
 import lib.objects.jit.algorithms.data_accessor as db
 import core.jit.math_2d as math2D
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
 @generate.vectorize
 def compute_rest(spring : Spring, details):
@@ -37,10 +38,16 @@ def compute_force_jacobians(spring : Spring, details):
     spring.dfdv[0][0] = spring.dfdv[1][1] = dfdv
     spring.dfdv[0][1] = spring.dfdv[1][0] = dfdv * -1
 
+@generate.vectorize
+def compute_energy(spring : Spring, details):
+    x0 = db.x(details.node, spring.node_IDs[0])
+    x1 = db.x(details.node, spring.node_IDs[1])
+    spring.energy = elastic_spring_energy(x0, x1, spring.rest_length, spring.stiffness)
+
 '''
 AnchorSpring/Spring helper functions
 '''
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def spring_stretch_jacobian(x0, x1, rest, stiffness):
     direction = x0 - x1
     stretch = math2D.norm(direction)
@@ -52,7 +59,7 @@ def spring_stretch_jacobian(x0, x1, rest, stiffness):
 
     return -1.0 * stiffness * I
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def spring_damping_jacobian(x0, x1, v0, v1, damping):
     jacobian = np.zeros(shape=(2, 2))
     direction = x1 - x0
@@ -64,7 +71,7 @@ def spring_damping_jacobian(x0, x1, v0, v1, damping):
 
     return jacobian
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def spring_stretch_force(x0, x1, rest, stiffness):
     direction = x1 - x0
     stretch = math2D.norm(direction)
@@ -72,7 +79,7 @@ def spring_stretch_force(x0, x1, rest, stiffness):
         direction /= stretch
     return direction * ((stretch - rest) * stiffness)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def spring_damping_force(x0, x1, v0, v1, damping):
     direction = x1 - x0
     stretch = math2D.norm(direction)
@@ -81,7 +88,7 @@ def spring_damping_force(x0, x1, v0, v1, damping):
     relativeVelocity = v1 - v0
     return direction * (np.dot(relativeVelocity, direction) * damping)
 
-@numba.njit
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
 def elastic_spring_energy(x0, x1, rest, stiffness):
     stretch = math2D.distance(x0, x1)
     return 0.5 * stiffness * ((stretch - rest)**2)
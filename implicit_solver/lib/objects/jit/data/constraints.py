@@ -19,11 +19,17 @@ class Constraint:
         # system indices of the nodes
         self.systemIndices = np.zeros(num_nodes, dtype = np.int32)
 
+        # slots of the jacobians in the system matrix (see sparse_matrix_lib)
+        self.systemSlots = np.zeros((num_nodes, num_nodes), dtype = np.int64)
+
         # Precomputed cost function
         self.c = np.zeros(num_nodes, dtype = np.float64) # constraint/cost function
         self.g = np.zeros((num_nodes, 2), dtype = np.float64) # gradients
         self.H = np.zeros((num_nodes, num_nodes, 2, 2), dtype = np.float64) # Hessians
 
+        # Precomputed elastic energy
+        self.energy = np.float64(0.0)
+
         # Precomputed forces/jacobians.
         self.f = np.zeros((num_nodes, 2), dtype = np.float64)
         self.dfdx = np.zeros((num_nodes, num_nodes, 2, 2), dtype = np.float64)
@@ -5,6 +5,7 @@
 
 import numpy as np
 from core import Shape
+import core.jit.block_utils as block_utils
 
 class Kinematic:
     '''
@@ -35,9 +36,10 @@ class Kinematic:
         self.meta_data = {}
 
     def get_as_shape(self, details):
-        x = details.db['point'].flatten('x', self.point_handles)
-        shape = Shape(len(x), 0, len(self.face_ids))
-        np.copyto(shape.vertex, x)
+        db_points = details.db['point']
+        num_points = block_utils.compute_num_elements(db_points.blocks, self.point_handles)
+        shape = Shape(num_points, 0, len(self.face_ids))
+        db_points.gather_into('x', shape.vertex, self.point_handles)
         np.copyto(shape.face, self.face_ids)
         return shape
 
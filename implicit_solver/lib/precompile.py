@@ -0,0 +1,59 @@
+"""
+@author: Vincent Bonnet
+@description : Precompile the jitted functions into the kernel cache
+Run the solver warm-up (see CommandSolverDispatcher.warmup) and the example scenes for a frame
+to compile the kernels for the datablock types
+The kernel cache is opt-in, the kernels are only stored with IMPLICIT_SOLVER_KERNEL_CACHE=1
+Command line (from the implicit_solver folder) :
+    IMPLICIT_SOLVER_KERNEL_CACHE=1 python -m lib.precompile [scene_name ...]
+"""
+
+import sys
+import time
+
+import core
+import lib
+import lib.examples as examples
+
+DEFAULT_SCENES = ('beam', 'multiwire', 'cat')
+
+class NullRender:
+    '''
+    Render ignoring the render preferences of the example scenes
+    '''
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+def precompile(scene_names = DEFAULT_SCENES, print_log = True):
+    '''
+    Compile the kernels used by the scenes and store them into the kernel cache
+    Returns the elapsed time per scene
+    '''
+    elapsed_times = {}
+    start_time = time.perf_counter()
+    lib.CommandSolverDispatcher().warmup(print_log = False)
+    elapsed_times['warmup'] = time.perf_counter() - start_time
+    if print_log:
+        print('precompile warmup : %.3f sec' % elapsed_times['warmup'])
+
+    for scene_name in scene_names:
+        start_time = time.perf_counter()
+        dispatcher = lib.CommandSolverDispatcher()
+        dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = 1, num_frames = 1)
+        getattr(examples, scene_name).assemble(dispatcher, NullRender())
+        dispatcher.initialize()
+        dispatcher.solve_to_next_frame()
+        elapsed_times[scene_name] = time.perf_counter() - start_time
+        if print_log:
+            print('precompile %s : %.3f sec' % (scene_name, elapsed_times[scene_name]))
+
+    if print_log:
+        if core.code_gen.KERNEL_CACHE_ENABLED:
+            print('kernel cache : %s' % core.code_gen.get_cache_folder())
+        else:
+            print('kernel cache disabled (IMPLICIT_SOLVER_KERNEL_CACHE=1 to enable)')
+
+    return elapsed_times
+
+if __name__ == '__main__':
+    precompile(sys.argv[1:] or DEFAULT_SCENES)
@@ -1,5 +1,16 @@
 # in __init__.py
+# the classes are imported on first access (PEP 562)
 
-from lib.system.scene import Scene
-from lib.system.solver import Solver, SolverContext
+import importlib
 
+_lazy_attributes = {'Scene' : 'lib.system.scene',
+                    'Solver' : 'lib.system.solver',
+                    'SolverContext' : 'lib.system.solver'}
+
+def __getattr__(name):
+    if name in _lazy_attributes:
+        return getattr(importlib.import_module(_lazy_attributes[name]), name)
+    raise AttributeError(f"module 'lib.system' has no attribute '{name}'")
+
+def __dir__():
+    return sorted(list(globals().keys()) + list(_lazy_attributes))
@@ -0,0 +1,172 @@
+"""
+@author: Vincent Bonnet
+@description : Save and restore a running simulation into a single memory-mappable file
+
+File Layout
+|-----------------------------|
+| magic (8 bytes)             |
+| header size (uint64)        |
+| json header                 |
+|-----------------------------|
+| array 0 (raw bytes)         |
+| array 1 (raw bytes)         |
+| ...                         |
+|-----------------------------|
+
+The json header stores the solver context, the object states and the
+dtype descriptor/shape/offset of every array (aligned on ARRAY_ALIGNMENT)
+The arrays are the raw blocks of every datablock and the object block handles
+
+The objects (dynamics, kinematics, conditions, ...) are not stored,
+the scene has to be rebuilt before restore() (same objects added in the same order)
+"""
+
+import ast
+import json
+import os
+import numpy as np
+import core.jit.block_utils as block_utils
+
+MAGIC = b'ISCKPT01'
+ARRAY_ALIGNMENT = 64
+
+# attributes stored per object list of the scene
+HANDLE_ATTRIBUTES = {'dynamics' : ['block_handles'],
+                     'kinematics' : ['point_handles', 'edge_handles', 'triangle_handles'],
+                     'conditions' : ['block_handles']}
+ARRAY_ATTRIBUTES = {'dynamics' : ['node_ids'],
+                    'conditions' : ['node_ids'],
+                    'animators' : ['position', 'linear_velocity']}
+VALUE_ATTRIBUTES = {'conditions' : ['total_constraints'],
+                    'animators' : ['rotation', 'angular_velocity']}
+
+def _dtype_descr(dtype):
+    return repr(np.lib.format.dtype_to_descr(dtype))
+
+def save(path, scene, solver, details, context):
+    '''
+    Write the simulation state into 'path' (the file is replaced atomically)
+    '''
+    arrays = {}
+    header = {'context' : vars(context).copy(), 'datablocks' : {}, 'objects' : {}, 'arrays' : {}}
+
+    for name, datablock in details.db.items():
+        arrays['db/' + name] = datablock.snapshot()
+        header['datablocks'][name] = {'block_size' : datablock.block_size}
+
+    for list_name in ['dynamics', 'kinematics', 'conditions', 'animators']:
+        objects_state = []
+        for obj_index, obj in enumerate(getattr(scene, list_name)):
+            state = {}
+            # the animators list contains None for the static kinematics
+            if obj is not None:
+                for attr in HANDLE_ATTRIBUTES.get(list_name, []):
+                    arrays[f'{list_name}/{obj_index}/{attr}'] = np.asarray(list(getattr(obj, attr)), dtype=np.int64)
+                for attr in ARRAY_ATTRIBUTES.get(list_name, []):
+                    if getattr(obj, attr, None) is not None:
+                        arrays[f'{list_name}/{obj_index}/{attr}'] = np.asarray(getattr(obj, attr))
+                for attr in VALUE_ATTRIBUTES.get(list_name, []):
+                    state[attr] = float(getattr(obj, attr))
+            objects_state.append(state)
+        header['objects'][list_name] = objects_state
+
+    # warm start of the conjugate gradient
+    delta_v = getattr(solver.time_integrator, 'delta_v', None)
+    if delta_v is not None:
+        arrays['integrator/delta_v'] = delta_v
+
+    # array offsets (relative to the end of the header)
+    offset = 0
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[key] = array
+        offset = -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+        header['arrays'][key] = {'descr' : _dtype_descr(array.dtype),
+                                 'shape' : list(array.shape),
+                                 'offset' : offset}
+        offset += array.nbytes
+
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_begin = -(-(len(MAGIC) + 8 + len(header_bytes)) // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+    header_bytes = header_bytes.ljust(data_begin - len(MAGIC) - 8)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        file.write(MAGIC)
+        file.write(np.uint64(len(header_bytes)).tobytes())
+        file.write(header_bytes)
+        for key, array in arrays.items():
+            file.seek(data_begin + header['arrays'][key]['offset'])
+            file.write(array.tobytes())
+    os.replace(tmp_path, path)
+
+def read_header(path):
+    '''
+    Returns (header, data offset) of a checkpoint file
+    '''
+    with open(path, 'rb') as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError("not a checkpoint file : " + path)
+        header_size = int(np.frombuffer(file.read(8), dtype=np.uint64)[0])
+        header = json.loads(file.read(header_size).decode('utf-8'))
+    return header, len(MAGIC) + 8 + header_size
+
+def load_array(path, header, data_begin, key, dtype = None):
+    '''
+    Returns a copy-on-write memory map of an array (the file is not modified)
+    '''
+    array_info = header['arrays'][key]
+    if dtype is None:
+        dtype = np.lib.format.descr_to_dtype(ast.literal_eval(array_info['descr']))
+    shape = tuple(array_info['shape'])
+    if np.prod(shape) == 0:
+        return np.empty(shape, dtype=dtype)
+    array = np.memmap(path, dtype=dtype, mode='c', offset=data_begin + array_info['offset'], shape=shape)
+    return array.view(np.ndarray)
+
+def restore(path, scene, solver, details, context):
+    '''
+    Set the simulation state from 'path'
+    The scene has to be rebuilt with the same objects as the saved scene
+    '''
+    header, data_begin = read_header(path)
+
+    # check the scene matches the checkpoint
+    if set(header['datablocks']) != set(details.db):
+        raise ValueError("the checkpoint datablocks don't match the details")
+    for name, datablock in details.db.items():
+        if header['arrays']['db/' + name]['descr'] != _dtype_descr(datablock.dtype_block):
+            raise ValueError("the checkpoint datatype doesn't match the datablock " + name)
+    for list_name, objects_state in header['objects'].items():
+        if len(objects_state) != len(getattr(scene, list_name)):
+            raise ValueError("the checkpoint " + list_name + " don't match the scene")
+
+    # datablocks (mapped without copy with the contiguous storage)
+    for name, datablock in details.db.items():
+        snapshot = load_array(path, header, data_begin, 'db/' + name, datablock.dtype_block)
+        datablock.restore(snapshot, copy = False)
+
+    # objects
+    for list_name, objects_state in header['objects'].items():
+        for obj_index, obj in enumerate(getattr(scene, list_name)):
+            if obj is None:
+                continue
+            for attr in HANDLE_ATTRIBUTES.get(list_name, []):
+                handles = load_array(path, header, data_begin, f'{list_name}/{obj_index}/{attr}')
+                # in place because the handles are shared (details, conditions)
+                block_utils.replace_block_handles(getattr(obj, attr), handles)
+            for attr in ARRAY_ATTRIBUTES.get(list_name, []):
+                key = f'{list_name}/{obj_index}/{attr}'
+                if key in header['arrays']:
+                    setattr(obj, attr, np.array(load_array(path, header, data_begin, key)))
+            for attr, value in objects_state[obj_index].items():
+                setattr(obj, attr, type(getattr(obj, attr))(value))
+
+    for condition in scene.conditions:
+        condition.update_block_colours(details.bundle)
+
+    # context and solver
+    context.__dict__.update(header['context'])
+    solver.time_integrator.initialize(scene, details)
+    if 'integrator/delta_v' in header['arrays']:
+        solver.time_integrator.delta_v = np.array(load_array(path, header, data_begin, 'integrator/delta_v'))
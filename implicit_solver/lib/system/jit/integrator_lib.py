@@ -15,7 +15,7 @@ def apply_external_forces_to_nodes(dynamics, forces):
     for force in forces:
         force.apply_forces(dynamics)
 
-@generate.vectorize
+@generate.vectorize(parallel=True)
 def reset_forces(node : Node):
     node.f[:] = 0.0
 
@@ -32,27 +32,37 @@ def update_system_indices(constraint : Constraint, detail_nodes):
         si = db.system_index(detail_nodes, constraint.node_IDs[i])
         constraint.systemIndices[i] = si
 
-@generate.vectorize
-def apply_constraint_forces_to_nodes(constraint : Constraint, detail_nodes):
-    # Cannot be threaded yet to prevent different threads to write on the same node
+def apply_constraint_forces_to_nodes(conditions, details):
+    # this function is not vectorized but dispatches the colours of each condition
+    for condition in conditions:
+        condition.call_per_colour(_apply_constraint_forces_to_nodes,
+                                  details, details.node)
+
+@generate.vectorize(parallel=True)
+def _apply_constraint_forces_to_nodes(constraint : Constraint, detail_nodes):
+    # Threaded over the blocks of a single colour (see Condition.block_colours)
     num_nodes = len(constraint.node_IDs)
     for i in range(num_nodes):
         db.add_f(detail_nodes,  constraint.node_IDs[i], constraint.f[i])
 
-@generate.vectorize
+@generate.vectorize(parallel=True)
 def advect(node : Node, delta_v, dt):
-    # Can be threaded
     node.v += delta_v[node.systemIndex]
     node.x += node.v * dt
 
-@generate.vectorize
+@generate.vectorize(parallel=True)
 def assemble_fo_h_to_b(node : Node, dt, b):
-    # Can be threaded
     b[node.systemIndex] += node.f * dt
 
-@generate.vectorize
-def assemble_dfdx_v0_h2_to_b(constraint : Constraint, detail_nodes, dt, b):
-    # Cannot be threaded yet
+def assemble_dfdx_v0_h2_to_b(conditions, details, dt, b):
+    # this function is not vectorized but dispatches the colours of each condition
+    for condition in conditions:
+        condition.call_per_colour(_assemble_dfdx_v0_h2_to_b,
+                                  details, details.node, dt, b)
+
+@generate.vectorize(parallel=True)
+def _assemble_dfdx_v0_h2_to_b(constraint : Constraint, detail_nodes, dt, b):
+    # Threaded over the blocks of a single colour (see Condition.block_colours)
     num_nodes = len(constraint.node_IDs)
     for fi in range(num_nodes):
         node_index = constraint.systemIndices[fi]
@@ -62,74 +72,178 @@ def assemble_dfdx_v0_h2_to_b(constraint : Constraint, detail_nodes, dt, b):
             b[node_index] += np.dot(v, Jx) * dt * dt
 
 @generate.vectorize
-def assemble_mass_matrix_to_A(node : Node, A):
-    # Can be threaded
-    system_index = node.systemIndex
-    mass_matrix = np.zeros((2,2))
-    np.fill_diagonal(mass_matrix, node.m)
-    sparse_lib.add(A, system_index, system_index, mass_matrix)
+def count_system_entries(constraint : Constraint, counter):
+    num_nodes = len(constraint.node_IDs)
+    counter[0] += num_nodes * num_nodes
+
+@generate.vectorize
+def collect_system_entries(constraint : Constraint, num_rows, entries, counter):
+    # entry is encoded as (row * num_rows + column)
+    num_nodes = len(constraint.node_IDs)
+    for fi in range(num_nodes):
+        for j in range(num_nodes):
+            row = np.int64(constraint.systemIndices[fi])
+            entries[counter[0]] = row * num_rows + constraint.systemIndices[j]
+            counter[0] += 1
 
 @generate.vectorize
-def assemble_constraint_forces_to_A(constraint : Constraint, dt, A):
+def update_system_slots(constraint : Constraint, column_indices, row_indptr, num_missing):
+    # slot of the (fi, j) submatrix in the data array of the sparse matrix
+    num_nodes = len(constraint.node_IDs)
+    for fi in range(num_nodes):
+        for j in range(num_nodes):
+            slot = sparse_lib.find_slot(column_indices, row_indptr,
+                                        constraint.systemIndices[fi],
+                                        constraint.systemIndices[j])
+            constraint.systemSlots[fi][j] = slot
+            if slot < 0:
+                num_missing[0] += 1
+
+def create_system_pattern(details, num_rows):
+    '''
+    Returns the sparsity pattern (column_indices, row_indptr) of A
+    and the slots of the diagonal submatrices
+    '''
+    # count the entries (mass matrix and constraints)
+    counter = np.zeros(1, dtype=np.int64)
+    count_system_entries(details.constraints, counter)
+    num_entries = num_rows + counter[0]
+
+    # collect the entries
+    entries = np.empty(num_entries, dtype=np.int64)
+    entries[:num_rows] = np.arange(num_rows, dtype=np.int64) * (num_rows + 1)
+    counter[0] = num_rows
+    collect_system_entries(details.constraints, num_rows, entries, counter)
+
+    column_indices, row_indptr = sparse_lib.create_sparsity_pattern(entries, num_rows)
+    diagonal_slots = sparse_lib.find_diagonal_slots(column_indices, row_indptr)
+
+    # set the slots of every constraint
+    num_missing = np.zeros(1, dtype=np.int64)
+    update_system_slots(details.constraints, column_indices, row_indptr, num_missing)
+
+    return column_indices, row_indptr, diagonal_slots
+
+def update_dynamic_system_slots(conditions, details, column_indices, row_indptr):
+    '''
+    Update the slots of the constraints recreated by the dynamic conditions
+    Returns False when the sparsity pattern doesn't contain all the constraints
+    '''
+    num_missing = np.zeros(1, dtype=np.int64)
+    for condition in conditions:
+        if condition.is_static() or condition.num_blocks() == 0:
+            continue
+
+        blocks = getattr(details, condition.typename)
+        update_system_slots.function(blocks, column_indices, row_indptr,
+                                     num_missing, condition.block_handles)
+
+    return num_missing[0] == 0
+
+@generate.vectorize(parallel=True)
+def assemble_mass_matrix_to_A(node : Node, diagonal_slots, data):
+    slot = diagonal_slots[node.systemIndex]
+    data[slot][0][0] += node.m
+    data[slot][1][1] += node.m
+
+def assemble_constraint_forces_to_A(conditions, details, dt, data):
+    # this function is not vectorized but dispatches the colours of each condition
+    for condition in conditions:
+        condition.call_per_colour(_assemble_constraint_forces_to_A,
+                                  details, dt, data)
+
+@generate.vectorize(parallel=True)
+def _assemble_constraint_forces_to_A(constraint : Constraint, dt, data):
     # Substract (h * df/dv + h^2 * df/dx)
-    # Cannot be threaded yet
+    # Threaded over the blocks of a single colour (see Condition.block_colours)
     num_nodes = len(constraint.node_IDs)
     for fi in range(num_nodes):
         for j in range(num_nodes):
             Jv = constraint.dfdv[fi][j]
             Jx = constraint.dfdx[fi][j]
-            global_fi_id = constraint.systemIndices[fi]
-            global_j_id = constraint.systemIndices[j]
-            sparse_lib.add(A, global_fi_id, global_j_id, ((Jv * dt) + (Jx * dt * dt)) * -1.0)
-
-@numba.njit
-def assemble_A(details,
-               num_rows,
-               dt,
-               mass_matrix_assembly_func,
-               constraint_matrix_assembly_func):
-
-    sub_size=2 # submatrix size
-
-    # create mass matrix
-    A = sparse_lib.create_empty_sparse_matrix(num_rows, sub_size)
-    mass_matrix_assembly_func(details.node, A)
-
-    # assemble constraint in matrix
-    constraint_matrix_assembly_func(details.area, dt, A)
-    constraint_matrix_assembly_func(details.bending, dt, A)
-    constraint_matrix_assembly_func(details.spring, dt, A)
-    constraint_matrix_assembly_func(details.anchorSpring, dt, A)
-
-    # allocate and set number of entries per row
-    row_indptr = np.empty(num_rows+1, dtype=np.int32)
-    row_indptr[0] = 0
-    total_entries = 0
-    for row_id in range(num_rows):
-        num_entries = len(A[row_id])
-        total_entries += num_entries
-        row_indptr[row_id+1] = total_entries
-
-    # allocate column indices and array of matrix
-    data = np.empty((total_entries, sub_size, sub_size))
-    column_indices = np.empty(total_entries, dtype=np.int32)
-
-    # set column indices and array of matrix
-    idx = 0
-    for row_id in range(num_rows):
-        # numba-0.0.47 use return an array of key when sorting a dictionnary
-        # it should be fix in later version
-        sortedA = sorted(A[row_id])
-        for column_id in sortedA:
-            matrix = A[row_id][column_id]
-            column_indices[idx] = column_id
-            data[idx] = matrix
-            idx += 1
-
-    return data, column_indices, row_indptr
+            slot = constraint.systemSlots[fi][j]
+            data[slot] -= (Jv * dt) + (Jx * dt * dt)
+
+@generate.vectorize(parallel=True)
+def multiply_mass_matrix(node : Node, x, out):
+    out[node.systemIndex] += x[node.systemIndex] * node.m
+
+def multiply_constraint_jacobians(conditions, details, dt, x, out):
+    # this function is not vectorized but dispatches the colours of each condition
+    for condition in conditions:
+        condition.call_per_colour(_multiply_constraint_jacobians,
+                                  details, dt, x, out)
+
+@generate.vectorize(parallel=True)
+def _multiply_constraint_jacobians(constraint : Constraint, dt, x, out):
+    # Matrix-free equivalent of _assemble_constraint_forces_to_A followed by A.x
+    # Threaded over the blocks of a single colour (see Condition.block_colours)
+    num_nodes = len(constraint.node_IDs)
+    for fi in range(num_nodes):
+        row = constraint.systemIndices[fi]
+        for j in range(num_nodes):
+            Jv = constraint.dfdv[fi][j]
+            Jx = constraint.dfdx[fi][j]
+            column = constraint.systemIndices[j]
+            out[row] -= np.dot((Jv * dt) + (Jx * dt * dt), x[column])
+
+@generate.vectorize(parallel=True)
+def assemble_mass_matrix_to_diagonal(node : Node, diagonal):
+    diagonal[node.systemIndex][0][0] += node.m
+    diagonal[node.systemIndex][1][1] += node.m
+
+def assemble_constraint_forces_to_diagonal(conditions, details, dt, diagonal):
+    # this function is not vectorized but dispatches the colours of each condition
+    for condition in conditions:
+        condition.call_per_colour(_assemble_constraint_forces_to_diagonal,
+                                  details, dt, diagonal)
+
+@generate.vectorize(parallel=True)
+def _assemble_constraint_forces_to_diagonal(constraint : Constraint, dt, diagonal):
+    # Threaded over the blocks of a single colour (see Condition.block_colours)
+    num_nodes = len(constraint.node_IDs)
+    for fi in range(num_nodes):
+        for j in range(num_nodes):
+            if constraint.systemIndices[fi] == constraint.systemIndices[j]:
+                Jv = constraint.dfdv[fi][j]
+                Jx = constraint.dfdx[fi][j]
+                diagonal[constraint.systemIndices[fi]] -= (Jv * dt) + (Jx * dt * dt)
+
+@generate.vectorize(parallel=True)
+def project_force_jacobians(constraint : Constraint):
+    # Clamp the negative eigenvalues of the constraint hessian (-df/dx)
+    # to guarantee a descent direction from the Newton iterations
+    num_nodes = len(constraint.node_IDs)
+    H = np.zeros((num_nodes * 2, num_nodes * 2))
+    for i in range(num_nodes):
+        for j in range(num_nodes):
+            H[i*2:i*2+2, j*2:j*2+2] = constraint.dfdx[i][j] * -1.0
+    H = (H + H.T) * 0.5
+    w, V = np.linalg.eigh(H)
+    w = np.maximum(w, 0.0)
+    H = (V * w) @ V.T
+    for i in range(num_nodes):
+        for j in range(num_nodes):
+            constraint.dfdx[i][j] = H[i*2:i*2+2, j*2:j*2+2] * -1.0
+
+@generate.vectorize(parallel=True)
+def get_node_state(node : Node, x, v, m, f):
+    x[node.systemIndex] = node.x
+    v[node.systemIndex] = node.v
+    m[node.systemIndex] = node.m
+    f[node.systemIndex] = node.f
+
+@generate.vectorize(parallel=True)
+def set_node_state(node : Node, x0, v, dt):
+    node.v = v[node.systemIndex]
+    node.x = x0[node.systemIndex] + v[node.systemIndex] * dt
 
 @generate.vectorize
+def accumulate_energy(constraint : Constraint, total_energy):
+    # total_energy = np.zeros(1)
+    total_energy[0] += constraint.energy
+
+@generate.vectorize(parallel=True)
 def euler_integration(node : Node, dt):
-    # Can be threaded
     node.v += node.f * node.im * dt
     node.x += node.v * dt
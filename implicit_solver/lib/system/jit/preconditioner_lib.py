@@ -0,0 +1,122 @@
+"""
+@author: Vincent Bonnet
+@description : Preconditioners for the conjugate gradient
+"""
+
+import math
+import numba
+import numpy as np
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def inverse_blocks(blocks):
+    '''
+    Returns the inverse of the 2x2 submatrices (block-Jacobi)
+    '''
+    num_blocks = len(blocks)
+    inv_blocks = np.zeros((num_blocks, 2, 2))
+    for i in range(num_blocks):
+        block = blocks[i]
+        det = block[0][0]*block[1][1] - block[0][1]*block[1][0]
+        if det == 0.0:
+            inv_blocks[i][0][0] = 1.0
+            inv_blocks[i][1][1] = 1.0
+            continue
+
+        inv_det = 1.0 / det
+        inv_blocks[i][0][0] = block[1][1] * inv_det
+        inv_blocks[i][0][1] = -block[0][1] * inv_det
+        inv_blocks[i][1][0] = -block[1][0] * inv_det
+        inv_blocks[i][1][1] = block[0][0] * inv_det
+
+    return inv_blocks
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def incomplete_cholesky(data, indices, indptr):
+    '''
+    Returns the lower triangular factor L (CSR) of the zero fill-in incomplete
+    Cholesky factorization of the symmetric CSR matrix (data, indices, indptr)
+    A non-positive pivot is replaced by the diagonal of the matrix
+    '''
+    num_rows = len(indptr) - 1
+
+    # lower triangular pattern (including diagonal)
+    l_indptr = np.zeros(num_rows+1, dtype=np.int64)
+    for i in range(num_rows):
+        count = 0
+        for idx in range(indptr[i], indptr[i+1]):
+            if indices[idx] <= i:
+                count += 1
+        l_indptr[i+1] = l_indptr[i] + count
+
+    l_indices = np.empty(l_indptr[num_rows], dtype=np.int64)
+    l_data = np.empty(l_indptr[num_rows])
+    for i in range(num_rows):
+        l_idx = l_indptr[i]
+        for idx in range(indptr[i], indptr[i+1]):
+            if indices[idx] <= i:
+                l_indices[l_idx] = indices[idx]
+                l_data[l_idx] = data[idx]
+                l_idx += 1
+
+    # factorization : the diagonal is the last entry of each row
+    for i in range(num_rows):
+        row_begin = l_indptr[i]
+        row_end = l_indptr[i+1]
+        for idx in range(row_begin, row_end):
+            k = l_indices[idx]
+            # sum of L[i,j]*L[k,j] for j<k (sorted merge of the rows i and k)
+            value = l_data[idx]
+            i_idx = row_begin
+            k_idx = l_indptr[k]
+            k_end = l_indptr[k+1] - 1 # exclude diagonal of row k
+            while i_idx < idx and k_idx < k_end:
+                if l_indices[i_idx] == l_indices[k_idx]:
+                    value -= l_data[i_idx] * l_data[k_idx]
+                    i_idx += 1
+                    k_idx += 1
+                elif l_indices[i_idx] < l_indices[k_idx]:
+                    i_idx += 1
+                else:
+                    k_idx += 1
+
+            if k < i:
+                l_data[idx] = value / l_data[l_indptr[k+1]-1]
+            else:
+                if value <= 0.0:
+                    value = math.fabs(data_diagonal(data, indices, indptr, i))
+                l_data[idx] = math.sqrt(value)
+
+    return l_data, l_indices, l_indptr
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def data_diagonal(data, indices, indptr, i):
+    for idx in range(indptr[i], indptr[i+1]):
+        if indices[idx] == i:
+            return data[idx]
+    return 1.0
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def incomplete_cholesky_solve(l_data, l_indices, l_indptr, b):
+    '''
+    Returns x from (L * L^T) x = b
+    '''
+    num_rows = len(l_indptr) - 1
+    # forward substitution L y = b
+    y = np.empty(num_rows)
+    for i in range(num_rows):
+        value = b[i]
+        diagonal_idx = l_indptr[i+1]-1
+        for idx in range(l_indptr[i], diagonal_idx):
+            value -= l_data[idx] * y[l_indices[idx]]
+        y[i] = value / l_data[diagonal_idx]
+
+    # backward substitution L^T x = y
+    x = y
+    for i in range(num_rows-1, -1, -1):
+        diagonal_idx = l_indptr[i+1]-1
+        x[i] /= l_data[diagonal_idx]
+        for idx in range(l_indptr[i], diagonal_idx):
+            x[l_indices[idx]] -= l_data[idx] * x[i]
+
+    return x
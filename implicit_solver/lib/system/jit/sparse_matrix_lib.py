@@ -1,21 +1,51 @@
 """
 @author: Vincent Bonnet
 @description : Helper functions for sparse matrix assembly
+The block sparse row (BSR) pattern is computed once and the submatrices
+are directly added into the data array from precomputed slots
 """
 
 import numba
 import numpy as np
+from core.code_gen.kernel_cache import KERNEL_CACHE_ENABLED
 
-@numba.njit
-def create_empty_sparse_matrix(num_rows, block_size):
-    A = []
-    for i in range(num_rows):
-        A.append({i:np.zeros((block_size,block_size))})
-    return A
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def create_sparsity_pattern(entries, num_rows):
+    '''
+    Returns the column indices and row pointers of a BSR matrix
+    from the entries encoded as (row * num_rows + column)
+    '''
+    unique_entries = np.unique(entries)
+    num_entries = len(unique_entries)
+    column_indices = np.empty(num_entries, dtype=np.int32)
+    row_indptr = np.zeros(num_rows+1, dtype=np.int32)
+    for idx in range(num_entries):
+        row_id = unique_entries[idx] // num_rows
+        column_indices[idx] = unique_entries[idx] % num_rows
+        row_indptr[row_id+1] += 1
+
+    for row_id in range(num_rows):
+        row_indptr[row_id+1] += row_indptr[row_id]
+
+    return column_indices, row_indptr
 
-@numba.njit
-def add(A, i, j, data):
-    if j in A[i]:
-        A[i][j] += data
-    else:
-        A[i][j] = data
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def find_slot(column_indices, row_indptr, i, j):
+    '''
+    Returns the index of the submatrix (i, j) in the data array
+    or -1 if the submatrix is not part of the pattern
+    '''
+    begin = row_indptr[i]
+    end = row_indptr[i+1]
+    idx = begin + np.searchsorted(column_indices[begin:end], j)
+    if idx < end and column_indices[idx] == j:
+        return idx
+    return -1
+
+@numba.njit(cache=KERNEL_CACHE_ENABLED)
+def find_diagonal_slots(column_indices, row_indptr):
+    num_rows = len(row_indptr) - 1
+    slots = np.empty(num_rows, dtype=np.int64)
+    for i in range(num_rows):
+        slots[i] = find_slot(column_indices, row_indptr, i, i)
+    return slots
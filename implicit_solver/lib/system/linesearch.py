@@ -0,0 +1,35 @@
+"""
+@author: Vincent Bonnet
+@description : line search algorithms (from optimizations/linesearch.py)
+
+Linesearch algorithms try to minimize h(a)=f(x+ap) where
+    - p search direction
+    - f object function providing value(x)
+    - a step size
+"""
+import numpy as np
+
+BACKTRACKING_MAX_STEP_SIZE = 1.0
+BACKTRACKING_CONTROL = 0.5
+BACKTRACKING_SHRINK_FACTOR = 0.5
+BACKTRACKING_MAX_ITERATION = 10
+
+def backtracking(function, guess, gradient, search_dir):
+    '''
+    Returns the largest step size satisfying the Armijo condition
+    The step size is shrunk until the condition is satisfied or
+    the maximum number of iterations is reached
+    '''
+    m = np.dot(gradient.ravel(), search_dir.ravel())
+    t = -BACKTRACKING_CONTROL * m
+
+    value = function.value(guess)
+    step_size = BACKTRACKING_MAX_STEP_SIZE
+    for _ in range(BACKTRACKING_MAX_ITERATION):
+        test = value - function.value(guess+search_dir*step_size)
+        if test >= step_size*t:
+            break
+
+        step_size *= BACKTRACKING_SHRINK_FACTOR
+
+    return step_size
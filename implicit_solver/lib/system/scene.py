@@ -4,6 +4,8 @@
 The scene stores data in SI unit which are used by the solver
 """
 
+import core.jit.item_utils as item_utils
+
 class Scene:
     def __init__(self):
         self.dynamics = [] # dynamic objects
@@ -49,6 +51,46 @@ class Scene:
             if condition.is_static() is False:
                 condition.update_constraints(details)
 
+    # Compaction Functions #
+    def fragmentation_stats(self, details):
+        '''
+        Returns the fragmentation statistics per datablock (see DataBlock.fragmentation_stats)
+        '''
+        return {name : datablock.fragmentation_stats() for name, datablock in details.db.items()}
+
+    def compact(self, details):
+        '''
+        Repack the datablocks (blocks grouped per object) and remap the IDs
+        referring to the nodes and points. The block colours are recomputed
+        '''
+        # geometries and nodes
+        node_id_map = details.db['node'].compact([dynamic.block_handles for dynamic in self.dynamics])
+        point_id_map = details.db['point'].compact([kinematic.point_handles for kinematic in self.kinematics])
+        details.db['edge'].compact([kinematic.edge_handles for kinematic in self.kinematics])
+        details.db['triangle'].compact([kinematic.triangle_handles for kinematic in self.kinematics])
+
+        # constraints
+        for name, datablock in details.db.items():
+            if name in ['node', 'point', 'edge', 'triangle']:
+                continue
+            datablock.compact([condition.block_handles for condition in self.conditions
+                               if condition.typename == name])
+
+        # remap the IDs stored in the datablocks and in the objects
+        id_maps = {'node_IDs' : node_id_map, 'point_IDs' : point_id_map,
+                   'kinematic_component_IDs' : point_id_map}
+        for datablock in details.db.values():
+            for field_name in datablock.get_field_names():
+                if field_name in id_maps:
+                    datablock.remap_IDs(field_name, id_maps[field_name])
+
+        for obj in self.dynamics + self.conditions:
+            if len(getattr(obj, 'node_ids', [])) > 0:
+                obj.node_ids = item_utils.remap_data_ids(obj.node_ids, node_id_map)
+
+        for condition in self.conditions:
+            condition.update_block_colours(details.bundle)
+
     # Force Functions #
     def add_force(self, force):
         self.forces.append(force)
@@ -11,7 +11,9 @@ class SolverContext:
     '''
     SolverContext to store time, time stepping, etc.
     '''
-    def __init__(self, time = 0.0, frame_dt = 1.0/24.0, num_substep = 4, num_frames = 1):
+    def __init__(self, time = 0.0, frame_dt = 1.0/24.0, num_substep = 4, num_frames = 1,
+                 cg_tolerance = 1e-05, cg_max_iterations = None, preconditioner = 'block_jacobi',
+                 newton_tolerance = 1e-06, newton_max_iterations = 20, compact_threshold = None):
         self.time = time # current time (in seconds)
         self.start_time = time # start time (in seconds)
         self.end_time = time + (num_frames * frame_dt) # end time (in seconds)
@@ -19,6 +21,12 @@ class SolverContext:
         self.num_substep = num_substep # number of substep per frame
         self.dt = frame_dt / num_substep # simulation substep (in seconds)
         self.num_frames = num_frames # number of simulated frame (doesn't include initial frame)
+        self.cg_tolerance = cg_tolerance # relative tolerance of the conjugate gradient
+        self.cg_max_iterations = cg_max_iterations # maximum number of iterations (None : scipy default)
+        self.preconditioner = preconditioner # 'none', 'block_jacobi' or 'incomplete_cholesky'
+        self.newton_tolerance = newton_tolerance # maximum position change to stop the Newton iterations
+        self.newton_max_iterations = newton_max_iterations # maximum number of Newton iterations
+        self.compact_threshold = compact_threshold # ratio of releasable blocks to compact a datablock (None : never)
 
 
 class Solver:
@@ -34,6 +42,7 @@ class Solver:
         '''
         scene.init_kinematics(details, context)
         scene.init_conditions(details)
+        self.time_integrator.initialize(scene, details)
 
     @core.timeit
     def solve_step(self, scene : Scene, details : Details, context : SolverContext):
@@ -42,7 +51,7 @@ class Solver:
         '''
         self._pre_step(scene, details, context)
         self._step(scene, details, context)
-        self._post_step(details, context)
+        self._post_step(scene, details, context)
 
     @core.timeit
     def _pre_step(self, scene : Scene, details : Details, context : SolverContext):
@@ -52,9 +61,26 @@ class Solver:
     @core.timeit
     def _step(self, scene : Scene, details : Details, context : SolverContext):
         self.time_integrator.prepare_system(scene, details, context.dt)
-        self.time_integrator.assemble_system(details, context.dt)
-        self.time_integrator.solve_system(details, context.dt)
+        self.time_integrator.assemble_system(scene, details, context.dt)
+        self.time_integrator.solve_system(scene, details, context)
 
     @core.timeit
-    def _post_step(self, details, context):
-        pass
+    def _post_step(self, scene : Scene, details : Details, context : SolverContext):
+        if context.compact_threshold is None:
+            return
+
+        # compact when a datablock has too many inactive blocks (dynamic conditions)
+        for stats in scene.fragmentation_stats(details).values():
+            if stats['num_releasable_blocks'] > 0:
+                if stats['num_releasable_blocks'] / stats['num_blocks'] >= context.compact_threshold:
+                    self.compact(scene, details)
+                    return
+
+    @core.timeit
+    def compact(self, scene : Scene, details : Details):
+        '''
+        Compact the datablocks of the scene
+        '''
+        scene.compact(details)
+        # the system pattern and the previous solution refer to the previous layout
+        self.time_integrator.initialize(scene, details)
@@ -1,4 +1,5 @@
 from lib.system.time_integrators.time_integrator import TimeIntegrator
 from lib.system.time_integrators.backward_euler import BackwardEulerIntegrator
+from lib.system.time_integrators.matrix_free_backward_euler import MatrixFreeBackwardEulerIntegrator
 from lib.system.time_integrators.symplectic_euler import SymplecticEulerIntegrator
 from lib.system.time_integrators.variational import VariationalIntegrator
@@ -10,6 +10,7 @@ import scipy.sparse.linalg
 import core
 import core.jit.block_utils as block_utils
 import lib.system.jit.integrator_lib as integrator_lib
+import lib.system.jit.preconditioner_lib as preconditioner_lib
 from lib.system.time_integrators import TimeIntegrator
 
 class BackwardEulerIntegrator(TimeIntegrator):
@@ -30,6 +31,21 @@ class BackwardEulerIntegrator(TimeIntegrator):
         self.A = None
         self.b = None
         self.num_nodes = 0
+        # previous solution to warm-start the conjugate gradient
+        self.delta_v = None
+        # sparsity pattern of A (see _update_system_pattern)
+        self.column_indices = None
+        self.row_indptr = None
+        self.diagonal_slots = None
+
+    def initialize(self, scene, details):
+        '''
+        Invalidate the sparsity pattern and the previous solution
+        '''
+        self.delta_v = None
+        self.column_indices = None
+        self.row_indptr = None
+        self.diagonal_slots = None
 
     @core.timeit
     def prepare_system(self, scene, details, dt):
@@ -49,7 +65,7 @@ class BackwardEulerIntegrator(TimeIntegrator):
 
         # Add forces to dynamics
         integrator_lib.apply_external_forces_to_nodes(details.dynamics, scene.forces)
-        integrator_lib.apply_constraint_forces_to_nodes(details.constraints, details.node)
+        integrator_lib.apply_constraint_forces_to_nodes(scene.conditions, details.bundle)
 
         # Set system index
         system_index_counter = np.zeros(1, dtype = np.int32) # use array to pass value as reference
@@ -60,18 +76,18 @@ class BackwardEulerIntegrator(TimeIntegrator):
         self.num_nodes = block_utils.compute_num_elements(details.node)
 
     @core.timeit
-    def assemble_system(self, details, dt):
+    def assemble_system(self, scene, details, dt):
         '''
         Assemble the system (Ax=b) where x is the unknow change of velocity
         '''
         if (self.num_nodes == 0):
             return
 
-        self._assemble_A(details, dt)
-        self._assemble_b(details, dt)
+        self._assemble_A(scene, details, dt)
+        self._assemble_b(scene, details, dt)
 
     @core.timeit
-    def solve_system(self, details, dt):
+    def solve_system(self, scene, details, context):
         '''
         Solve the assembled linear system (Ax=b)
         '''
@@ -81,27 +97,105 @@ class BackwardEulerIntegrator(TimeIntegrator):
         # Solve the system (Ax=b) and reshape the conjugate gradient result
         # In this case, the reshape operation is not causing any reallocation
         b = self.b.reshape(self.num_nodes * 2)
-        cg_result = scipy.sparse.linalg.cg(self.A, b)
-        delta_v = cg_result[0].reshape(self.num_nodes, 2)
+        delta_v = self._conjugate_gradient(b, context).reshape(self.num_nodes, 2)
         # Advect
-        self._advect(details, delta_v, dt)
+        self._advect(details, delta_v, context.dt)
+
+    @core.timeit
+    def _conjugate_gradient(self, b, context):
+        '''
+        Preconditioned conjugate gradient warm-started from the previous solution
+        '''
+        x0 = None
+        if self.delta_v is not None and len(self.delta_v) == len(b):
+            x0 = self.delta_v
+
+        num_iterations = [0]
+        def count_iterations(xk):
+            num_iterations[0] += 1
+
+        M = self._preconditioner(context.preconditioner)
+        x, info = scipy.sparse.linalg.cg(self.A, b, x0=x0,
+                                         rtol=context.cg_tolerance,
+                                         maxiter=context.cg_max_iterations,
+                                         M=M, callback=count_iterations)
+        self.delta_v = x
+
+        # report to the profiler (the residual costs an extra matrix-vector product)
+        profiler = core.Profiler()
+        if profiler.is_recording():
+            b_norm = np.linalg.norm(b)
+            residual = np.linalg.norm(b - self.A.dot(x))
+            if b_norm > 0.0:
+                residual /= b_norm
+            profiler.push_metric('cg_iterations', num_iterations[0])
+            profiler.push_metric('cg_residual', residual)
+            if info > 0:
+                profiler.push_metric('cg_not_converged', info)
+
+        return x
+
+    def _preconditioner(self, preconditioner):
+        '''
+        Returns the preconditioner of A as a sparse matrix or a LinearOperator
+        '''
+        if preconditioner == 'none':
+            return None
+
+        if preconditioner == 'block_jacobi':
+            inv_blocks = preconditioner_lib.inverse_blocks(self._diagonal_blocks())
+            num_rows = self.num_nodes
+            row_ids = np.arange(num_rows + 1, dtype=np.int32)
+            return scipy.sparse.bsr_matrix((inv_blocks, row_ids[:-1], row_ids),
+                                           shape=(num_rows * 2, num_rows * 2))
+
+        if preconditioner == 'incomplete_cholesky':
+            A = self.A.tocsr()
+            A.sort_indices()
+            L = preconditioner_lib.incomplete_cholesky(A.data, A.indices, A.indptr)
+            solve = lambda x : preconditioner_lib.incomplete_cholesky_solve(*L, x)
+            return scipy.sparse.linalg.LinearOperator(A.shape, matvec=solve)
+
+        raise ValueError("The preconditioner " + preconditioner + " is not recognized")
+
+    def _diagonal_blocks(self):
+        '''
+        Returns the 2x2 diagonal submatrices of A
+        '''
+        return self.A.data[self.diagonal_slots]
 
     @core.timeit
-    def _assemble_A(self, details, dt):
+    def _assemble_A(self, scene, details, dt):
         '''
         Assemble A = (M - (h * df/dv + h^2 * df/dx))
         '''
-        # create empty sparse matrix A
+        self._update_system_pattern(scene, details)
+
+        # add the mass matrix and the constraint jacobians into the pattern
         num_rows = self.num_nodes
-        data, column_indices, row_indptr = integrator_lib.assemble_A(details.bundle,
-                                                    num_rows, dt,
-                                                    integrator_lib.assemble_mass_matrix_to_A.function,
-                                                    integrator_lib.assemble_constraint_forces_to_A.function)
+        data = np.zeros((len(self.column_indices), 2, 2))
+        integrator_lib.assemble_mass_matrix_to_A(details.dynamics, self.diagonal_slots, data)
+        integrator_lib.assemble_constraint_forces_to_A(scene.conditions, details.bundle, dt, data)
+
+        self.A = scipy.sparse.bsr_matrix((data, self.column_indices, self.row_indptr),
+                                         shape=(num_rows * 2, num_rows * 2))
+
+    @core.timeit
+    def _update_system_pattern(self, scene, details):
+        '''
+        The sparsity pattern of A is computed once and only recomputed when
+        the constraints from dynamic conditions are not part of the pattern
+        '''
+        if self.row_indptr is not None and len(self.row_indptr) == self.num_nodes + 1:
+            if integrator_lib.update_dynamic_system_slots(scene.conditions, details.bundle,
+                                                          self.column_indices, self.row_indptr):
+                return
 
-        self.A = scipy.sparse.bsr_matrix((data, column_indices, row_indptr))
+        pattern = integrator_lib.create_system_pattern(details, self.num_nodes)
+        self.column_indices, self.row_indptr, self.diagonal_slots = pattern
 
     @core.timeit
-    def _assemble_b(self, details, dt):
+    def _assemble_b(self, scene, details, dt):
         '''
         Assemble b = h *( f0 + h * df/dx * v0)
                  b = (f0 * h) + (h^2 * df/dx * v0)
@@ -113,7 +207,7 @@ class BackwardEulerIntegrator(TimeIntegrator):
         integrator_lib.assemble_fo_h_to_b(details.dynamics, dt, self.b)
 
         # add (df/dx * v0 * h * h)
-        integrator_lib.assemble_dfdx_v0_h2_to_b(details.constraints, details.node, dt, self.b)
+        integrator_lib.assemble_dfdx_v0_h2_to_b(scene.conditions, details.bundle, dt, self.b)
 
     @core.timeit
     def _advect(self, details, delta_v, dt):
@@ -0,0 +1,55 @@
+"""
+@author: Vincent Bonnet
+@description : Matrix-free Backward Euler time integrator
+"""
+import numpy as np
+import scipy
+import scipy.sparse.linalg
+
+import core
+import lib.system.jit.integrator_lib as integrator_lib
+from lib.system.time_integrators import BackwardEulerIntegrator
+
+class MatrixFreeBackwardEulerIntegrator(BackwardEulerIntegrator):
+    '''
+     Implicit Step without assembling the matrix A
+     The conjugate gradient uses a LinearOperator computing
+         A * x = (M - h * df/dv - h^2 * df/dx) * x
+     from the jacobians stored in the constraint datablocks
+    '''
+    def __init__(self):
+        BackwardEulerIntegrator.__init__(self)
+        # 2x2 diagonal submatrices of A for the block-Jacobi preconditioner
+        self.diagonal = None
+
+    @core.timeit
+    def _assemble_A(self, scene, details, dt):
+        '''
+        Create the LinearOperator A = (M - (h * df/dv + h^2 * df/dx))
+        '''
+        num_rows = self.num_nodes
+
+        def matvec(x):
+            x = x.reshape(num_rows, 2)
+            out = np.zeros((num_rows, 2))
+            integrator_lib.multiply_mass_matrix(details.dynamics, x, out)
+            integrator_lib.multiply_constraint_jacobians(scene.conditions, details.bundle, dt, x, out)
+            return out.reshape(num_rows * 2)
+
+        self.A = scipy.sparse.linalg.LinearOperator((num_rows * 2, num_rows * 2),
+                                                    matvec=matvec, dtype=np.float64)
+
+        # diagonal submatrices
+        self.diagonal = np.zeros((num_rows, 2, 2))
+        integrator_lib.assemble_mass_matrix_to_diagonal(details.dynamics, self.diagonal)
+        integrator_lib.assemble_constraint_forces_to_diagonal(scene.conditions, details.bundle,
+                                                              dt, self.diagonal)
+
+    def _diagonal_blocks(self):
+        return self.diagonal
+
+    def _preconditioner(self, preconditioner):
+        if preconditioner == 'incomplete_cholesky':
+            raise ValueError("The preconditioner " + preconditioner + " requires an assembled matrix")
+
+        return BackwardEulerIntegrator._preconditioner(self, preconditioner)
@@ -23,13 +23,13 @@ class SymplecticEulerIntegrator(TimeIntegrator):
 
         # Add forces to dynamics
         integrator_lib.apply_external_forces_to_nodes(details.dynamics, scene.forces)
-        integrator_lib.apply_constraint_forces_to_nodes(details.constraints, details.node)
+        integrator_lib.apply_constraint_forces_to_nodes(scene.conditions, details.bundle)
 
     @core.timeit
-    def assemble_system(self, details, dt):
+    def assemble_system(self, scene, details, dt):
         # no system to assemble
         pass
 
     @core.timeit
-    def solve_system(self, details, dt):
-        integrator_lib.euler_integration(details.dynamics, dt)
+    def solve_system(self, scene, details, context):
+        integrator_lib.euler_integration(details.dynamics, context.dt)
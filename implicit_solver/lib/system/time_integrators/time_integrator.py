@@ -7,11 +7,14 @@ class TimeIntegrator:
     '''
     Base class for time integrator
     '''
+    def initialize(self, scene, details):
+        pass
+
     def prepare_system(self, scene, details, dt):
         raise NotImplementedError(type(self).__name__ + " needs to implement the method 'prepare_system'")
 
-    def assemble_system(self, details, dt):
+    def assemble_system(self, scene, details, dt):
         raise NotImplementedError(type(self).__name__ + " needs to implement the method 'assemble_system'")
 
-    def solve_system(self, details, dt):
+    def solve_system(self, scene, details, context):
         raise NotImplementedError(type(self).__name__ + " needs to implement the method 'solve_system'")
@@ -1,27 +1,163 @@
 """
 @author: Vincent Bonnet
-@description : Variational time integrator (placeholder)
+@description : Variational time integrator
 """
 
+import numpy as np
+
 import core
-from lib.system.time_integrators import TimeIntegrator
+import core.jit.block_utils as block_utils
+import lib.system.jit.integrator_lib as integrator_lib
+import lib.system.linesearch as linesearch
+from lib.system.time_integrators import BackwardEulerIntegrator
+
+class IncrementalPotential:
+    '''
+    Incremental potential of implicit Euler divided by h^2
+    E(v) = 1/2 * (v - v0)^T * M * (v - v0) - h * fext^T * (v - v0) + U(x0 + h * v)
+    where U is the sum of the elastic energies of the constraints
+    gradient() matches value() only without damping (the damping forces have no potential)
+    '''
+    def __init__(self, integrator, scene, details, dt):
+        self.integrator = integrator
+        self.scene = scene
+        self.details = details
+        self.dt = dt
+
+    def value(self, v):
+        integrator = self.integrator
+        integrator_lib.set_node_state(self.details.dynamics, integrator.x0, v, self.dt)
+
+        total_energy = np.zeros(1)
+        for condition in self.scene.conditions:
+            condition.compute_energy(self.details.bundle)
+            blocks = getattr(self.details, condition.typename)
+            if condition.num_blocks() > 0:
+                integrator_lib.accumulate_energy.function(blocks, total_energy,
+                                                          condition.block_handles)
+
+        delta_v = v - integrator.v0
+        inertia = 0.5 * np.sum(integrator.m * np.sum(delta_v * delta_v, axis=1))
+        inertia -= self.dt * np.sum(integrator.f_ext * delta_v)
+        return inertia + total_energy[0]
+
+    def gradient(self, v):
+        '''
+        Returns M * (v - v0) - h * f(x0 + h * v, v)
+        The damping forces are part of the gradient but not of the energy
+        '''
+        integrator = self.integrator
+        integrator._compute_forces(self.scene, self.details, v, self.dt)
+        f = np.zeros((integrator.num_nodes, 2))
+        integrator_lib.assemble_fo_h_to_b(self.details.dynamics, 1.0, f)
+        return integrator.m[:, np.newaxis] * (v - integrator.v0) - f * self.dt
 
-class VariationalIntegrator(TimeIntegrator):
+
+class VariationalIntegrator(BackwardEulerIntegrator):
+    '''
+     Optimization-based implicit Euler
+     Minimize the incremental potential E(v) with Newton iterations
+     Each iteration solves :
+         (M - h * df/dv - h^2 * df/dx) * deltaV = -gradient(E)
+         v = v + alpha * deltaV (alpha from the backtracking line search)
+     until the position change h * |deltaV| is below the newton tolerance
+     Backward Euler is a single Newton iteration without line search
+     The damped scenes take full Newton steps (no line search, see IncrementalPotential)
+    '''
     def __init__(self):
-        TimeIntegrator.__init__(self)
+        BackwardEulerIntegrator.__init__(self)
+        # state at the beginning of the step
+        self.x0 = None
+        self.v0 = None
+        self.m = None
+        self.f_ext = None
 
     @core.timeit
     def prepare_system(self, scene, details, dt):
-        # TODO
-        pass
+        '''
+        Store the state at the beginning of the step and the external forces
+        '''
+        for condition in scene.conditions:
+            condition.pre_compute(details.bundle)
+
+        # Set system index
+        system_index_counter = np.zeros(1, dtype = np.int32) # use array to pass value as reference
+        integrator_lib.set_system_index(details.dynamics, system_index_counter)
+        integrator_lib.update_system_indices(details.constraints, details.node)
+
+        # Store number of nodes
+        self.num_nodes = block_utils.compute_num_elements(details.node)
+
+        # Store the state and the external forces
+        integrator_lib.reset_forces(details.dynamics)
+        integrator_lib.apply_external_forces_to_nodes(details.dynamics, scene.forces)
+        self.x0 = np.zeros((self.num_nodes, 2))
+        self.v0 = np.zeros((self.num_nodes, 2))
+        self.m = np.zeros(self.num_nodes)
+        self.f_ext = np.zeros((self.num_nodes, 2))
+        integrator_lib.get_node_state(details.dynamics, self.x0, self.v0, self.m, self.f_ext)
 
     @core.timeit
-    def assemble_system(self, details, dt):
-        # TODO
+    def assemble_system(self, scene, details, dt):
+        # the system is assembled at every Newton iteration (see solve_system)
         pass
 
     @core.timeit
-    def solve_system(self, details, dt):
-        # TODO
-        pass
+    def solve_system(self, scene, details, context):
+        '''
+        Minimize the incremental potential with Newton iterations
+        '''
+        if (self.num_nodes == 0):
+            return
+
+        dt = context.dt
+        potential = IncrementalPotential(self, scene, details, dt)
+        v = np.copy(self.v0)
+        # the line search needs the gradient of the potential
+        use_line_search = all(condition.damping == 0.0 for condition in scene.conditions)
+
+        num_iterations = 0
+        while num_iterations < context.newton_max_iterations:
+            num_iterations += 1
+
+            # Newton direction from the hessian at v
+            gradient = potential.gradient(v)
+            self._assemble_A(scene, details, dt)
+            self.b = gradient * -1.0
+            self.delta_v = None # the Newton increments shrink, start from zero
+            b = self.b.reshape(self.num_nodes * 2)
+            delta_v = self._conjugate_gradient(b, context).reshape(self.num_nodes, 2)
+
+            # fall back to the steepest descent (scaled by the inverse mass)
+            # when the hessian is indefinite
+            if np.dot(gradient.ravel(), delta_v.ravel()) >= 0.0:
+                delta_v = gradient / -self.m[:, np.newaxis]
+
+            if use_line_search:
+                delta_v *= linesearch.backtracking(potential, v, gradient, delta_v)
+            v += delta_v
+
+            if np.max(np.abs(delta_v)) * dt < context.newton_tolerance:
+                break
+
+        # Advect
+        integrator_lib.set_node_state(details.dynamics, self.x0, v, dt)
+
+        profiler = core.Profiler()
+        profiler.push_metric('newton_iterations', num_iterations)
+
+    @core.timeit
+    def _compute_forces(self, scene, details, v, dt):
+        '''
+        Compute the forces and jacobians at x = x0 + h * v
+        '''
+        integrator_lib.set_node_state(details.dynamics, self.x0, v, dt)
+        integrator_lib.reset_forces(details.dynamics)
+
+        for condition in scene.conditions:
+            condition.compute_forces(details.bundle)
+            condition.compute_force_jacobians(details.bundle)
+        integrator_lib.project_force_jacobians(details.constraints)
 
+        integrator_lib.apply_external_forces_to_nodes(details.dynamics, scene.forces)
+        integrator_lib.apply_constraint_forces_to_nodes(scene.conditions, details.bundle)
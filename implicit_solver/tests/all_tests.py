@@ -6,12 +6,24 @@
 import unittest
 
 import code_gen_tests as gen_tests
+import colouring_tests as colour_tests
+import constraint_tests as constraint_tests
 import datablock_tests as db_tests
+import frame_cache_tests as frame_cache_tests
 import geometry_tests as geo_tests
 import numba_tests as numba_tests
+import profiler_tests as profiler_tests
+import rpc_tests as rpc_tests
+import solver_tests as solver_tests
 
 if __name__ == '__main__':
     unittest.main(gen_tests.Tests())
+    unittest.main(colour_tests.Tests())
+    unittest.main(constraint_tests.Tests())
     unittest.main(db_tests.Tests())
+    unittest.main(frame_cache_tests.Tests())
     unittest.main(geo_tests.Tests())
     unittest.main(numba_tests.Tests())
+    unittest.main(profiler_tests.Tests())
+    unittest.main(rpc_tests.Tests())
+    unittest.main(solver_tests.Tests())
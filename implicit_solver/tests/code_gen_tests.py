@@ -3,6 +3,9 @@
 @description : Evaluation of Abstract Syntax Trees
 """
 
+import os
+import tempfile
+from unittest import mock
 import numba # required by core.code_gen
 import core.code_gen as generate
 import core
@@ -34,10 +37,23 @@ def add_values(v0 : Vertex, v1 : Vertex, other_value):
     v0.x += v1.x + other_value
     v0.y += v1.y + other_value
 
+@generate.vectorize(cache=True)
+def add_values_cached(v0 : Vertex, v1 : Vertex, other_value):
+    v0.x += v1.x + other_value
+
 @generate.vectorize(njit=False)
 def add_values_to_list(v0 : Vertex, v1 : Vertex, out_list):
     out_list.append(v0.x + v1.x)
 
+@generate.vectorize(parallel=True)
+def scale_values(v0 : Vertex, scale):
+    v0.x *= scale
+    v0.y *= scale
+
+@generate.vectorize(parallel=True, instrument=True)
+def scale_values_instrumented(v0 : Vertex, scale):
+    v0.x *= scale
+
 @generate.vectorize_block
 def get_num_elements(vertex, ref_counter):
     ref_counter += vertex.blockInfo_size
@@ -89,6 +105,51 @@ class Tests(unittest.TestCase):
         get_num_elements(datablock, counter)
         self.assertEqual(counter[0], 157)
 
+    def test_parallel_function(self):
+        datablock = core.DataBlock(Vertex, block_size = 10)
+        datablock.initialize(95)
+        scale_values(datablock, 2.0)
+        self.assertTrue('numba.prange' in scale_values.source)
+        self.assertTrue((datablock.flatten('x') == 4.2).all())
+        self.assertTrue((datablock.flatten('y') == 3.0).all())
+
+    def test_parallel_function_with_block_handles(self):
+        datablock = core.DataBlock(Vertex, block_size = 10)
+        block_handles = datablock.initialize(95)
+        block_handles.pop(0)
+        scale_values.function(datablock.blocks, 2.0, block_handles)
+        self.assertTrue((datablock.block(0)['y'] == 1.5).all())
+        self.assertTrue((datablock.block(1)['y'] == 3.0).all())
+
+    def test_kernel_cache(self):
+        # the cache is opt-in (IMPLICIT_SOLVER_KERNEL_CACHE=1)
+        self.assertEqual('cache=True' in add_values.source, generate.KERNEL_CACHE_ENABLED)
+        with tempfile.TemporaryDirectory() as cache_folder:
+            with mock.patch.dict(os.environ, {'IMPLICIT_SOLVER_KERNEL_CACHE_DIR' : cache_folder}):
+                self.assertTrue('cache=True' in add_values_cached.source)
+                source_file_path = add_values_cached.function.py_func.__code__.co_filename
+                self.assertEqual(os.path.dirname(source_file_path), cache_folder)
+                with open(source_file_path, 'r') as f:
+                    self.assertEqual(f.read(), add_values_cached.source)
+                datablock0 = create_datablock()
+                datablock1 = create_datablock()
+                add_values_cached(datablock0, datablock1, 1.0)
+                self.assertEqual(datablock0.block(0)['x'][0][0][0], 5.2)
+
+    def test_instrumented_function(self):
+        datablock = core.DataBlock(Vertex, block_size = 10)
+        block_handles = datablock.initialize(95)
+        block_handles.pop(0)
+        generate.reset_kernel_stats()
+        scale_values_instrumented(datablock, 2.0)
+        scale_values_instrumented.function(datablock.blocks, 2.0, block_handles)
+        stats = generate.get_kernel_stats('code_gen_tests.scale_values_instrumented')
+        self.assertEqual(stats.num_calls, 2)
+        self.assertEqual(stats.num_blocks, 10 + 9)
+        self.assertEqual(stats.num_elements, 95 + 85)
+        self.assertTrue((datablock.block(0)['x'] == 4.2).all())
+        self.assertTrue((datablock.block(1)['x'] == 8.4).all())
+
     def setUp(self):
         print(" CodeGeneration Test:", self._testMethodName)
 
@@ -0,0 +1,69 @@
+"""
+@author: Vincent Bonnet
+@description : Unit tests for the colouring of constraint blocks
+"""
+
+import unittest
+import numpy as np
+import core
+import core.jit.block_utils as block_utils
+import core.jit.item_utils as item_utils
+import lib.objects.jit.algorithms.colouring_lib as colouring_lib
+
+'''
+Datablock Functions
+'''
+class ConstraintTest:
+    def __init__(self):
+        self.node_IDs = item_utils.empty_data_ids(2)
+
+def create_wire_datablock(num_segments, block_size):
+    # chain of segments (i, i+1) : consecutive blocks share a node
+    datablock = core.DataBlock(ConstraintTest, block_size)
+    datablock.initialize(num_segments)
+    node_IDs = np.zeros((num_segments, 2, 2), dtype=np.int32)
+    node_IDs[:, 0, 1] = np.arange(num_segments)
+    node_IDs[:, 1, 1] = np.arange(num_segments) + 1
+    datablock.copyto('node_IDs', node_IDs)
+    return datablock
+
+def all_block_handles(datablock):
+    block_handles = block_utils.empty_block_handles()
+    for block_handle in range(datablock.num_blocks()):
+        block_handles.append(block_handle)
+    return block_handles
+
+'''
+Tests for colouring
+'''
+class Tests(unittest.TestCase):
+
+    def test_chain_colouring(self):
+        datablock = create_wire_datablock(num_segments=10, block_size=3)
+        block_handles = all_block_handles(datablock)
+        colours = colouring_lib.compute_block_colours(datablock.blocks, block_handles)
+        self.assertEqual(len(colours), 4)
+        self.assertTrue((colours == [0, 1, 0, 1]).all())
+
+    def test_independent_colours(self):
+        datablock = create_wire_datablock(num_segments=100, block_size=7)
+        block_handles = all_block_handles(datablock)
+        colours = colouring_lib.compute_block_colours(datablock.blocks, block_handles)
+        groups = colouring_lib.group_block_handles(block_handles, colours)
+        num_handles = 0
+        for group in groups:
+            num_handles += len(group)
+            used_nodes = set()
+            for block_handle in group:
+                block_handles = block_utils.empty_block_handles()
+                block_handles.append(block_handle)
+                block_nodes = set(datablock.flatten('node_IDs', block_handles)[:, :, 1].flatten())
+                self.assertEqual(len(used_nodes & block_nodes), 0)
+                used_nodes |= block_nodes
+        self.assertEqual(num_handles, datablock.num_blocks())
+
+    def setUp(self):
+        print(" Colouring Test:", self._testMethodName)
+
+if __name__ == '__main__':
+    unittest.main(Tests())
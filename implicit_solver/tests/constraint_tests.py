@@ -0,0 +1,71 @@
+"""
+@author: Vincent Bonnet
+@description : Unit tests for the constraint functions
+"""
+
+import unittest
+import numpy as np
+import lib
+import lib.objects.jit.algorithms.bending_lib as bending_lib
+from core import BeamShape, WireShape
+
+'''
+Tests for the constraint functions
+'''
+def bending_configurations():
+    # (x0, x1, x2, rest_angle)
+    yield (np.array([0.0, 0.0]), np.array([1.0, 0.1]), np.array([1.6, 1.3]), 0.4)
+    yield (np.array([-1.0, 0.5]), np.array([0.0, 0.0]), np.array([1.0, 0.5]), 0.0)
+    yield (np.array([0.3, -0.2]), np.array([0.5, 0.7]), np.array([-0.4, 1.1]), -0.8)
+
+def create_deformed_scene():
+    # area and bending constraints away from their rest state
+    dispatcher = lib.CommandSolverDispatcher()
+    dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = 1, num_frames = 1)
+    beam = dispatcher.add_dynamic(shape = BeamShape((-1.0, 0.0), 2.0, 0.5, 2, 1), node_mass = 0.001)
+    wire = dispatcher.add_dynamic(shape = WireShape((-1.0, 1.0), (1.0, 1.0), 4), node_mass = 0.001)
+    dispatcher.add_face_constraint(dynamic = beam, stiffness = 20.0, damping = 0.0)
+    dispatcher.add_wire_bending_constraint(dynamic = wire, stiffness = 0.1, damping = 0.0)
+    dispatcher.initialize()
+
+    nodes = dispatcher._details.db['node']
+    x = nodes.flatten('x')
+    x += np.random.default_rng(0).uniform(-0.1, 0.1, x.shape)
+    nodes.copyto('x', x)
+    return dispatcher
+
+class Tests(unittest.TestCase):
+    def test_bending_jacobians(self):
+        stiffness = 10.0
+        for x0, x1, x2, rest_angle in bending_configurations():
+            jacobians = bending_lib.elastic_bending_jacobians(x0, x1, x2, rest_angle, stiffness)
+            numerical_jacobians = bending_lib.elastic_bending_numerical_jacobians(x0, x1, x2,
+                                                                                  rest_angle, stiffness)
+            self.assertTrue(np.allclose(jacobians, numerical_jacobians, rtol=1e-3, atol=1e-2))
+
+    def test_stored_jacobians_symmetry(self):
+        # dfdx[j][i] is stored as the transpose of dfdx[i][j] (symmetric system matrix)
+        dispatcher = create_deformed_scene()
+        details = dispatcher._details
+        for condition in dispatcher._scene.conditions:
+            condition.compute_force_jacobians(details.bundle)
+
+        for typename in ['area', 'bending']:
+            dfdx = details.db[typename].flatten('dfdx')
+            self.assertGreater(len(dfdx), 0)
+            for i, j in [(0, 1), (0, 2), (1, 2)]:
+                self.assertFalse(np.allclose(dfdx[:, i, j], dfdx[:, j, i]))
+                self.assertTrue(np.allclose(dfdx[:, j, i], np.swapaxes(dfdx[:, i, j], 1, 2)))
+
+    def test_bending_hessian_invariance(self):
+        # the forces don't change under a translation of the three nodes
+        x0, x1, x2, rest_angle = next(bending_configurations())
+        H = bending_lib.elastic_bending_hessian(x0, x1, x2, rest_angle, 10.0)
+        self.assertTrue(np.allclose(H[:, 0::2].sum(axis=1), 0.0))
+        self.assertTrue(np.allclose(H[:, 1::2].sum(axis=1), 0.0))
+
+    def setUp(self):
+        print(" Constraint Test:", self._testMethodName)
+
+if __name__ == '__main__':
+    unittest.main(Tests())
@@ -3,10 +3,14 @@
 @description : Unit tests for datablock
 """
 
+import os
+import tempfile
 import unittest
 import numpy as np
 import core
+import core.details
 import core.jit.block_utils as block_utils
+from lib.objects.jit.data import Point, Edge
 
 '''
 Datablock Functions
@@ -83,7 +87,7 @@ class Tests(unittest.TestCase):
         block_handles = block_utils.empty_block_handles()
         block_handles.append(1)
         block_handles.append(3)
-        block_utils.set_active(datablock, False, block_handles)
+        datablock.set_active(block_handles, False)
         num_elements = block_utils.compute_num_elements(datablock.blocks)
         self.assertEqual(datablock.block(0)['blockInfo_active'], True)
         self.assertEqual(datablock.block(1)['blockInfo_active'], False)
@@ -100,7 +104,7 @@ class Tests(unittest.TestCase):
         block_handles = block_utils.empty_block_handles()
         block_handles.append(1)
         block_handles.append(2)
-        block_utils.set_active(datablock, False, block_handles)
+        datablock.set_active(block_handles, False)
         datablock.append(num_elements = 6, reuse_inactive_block=True)
         self.assertEqual(len(datablock.blocks), 4)
 
@@ -110,6 +114,125 @@ class Tests(unittest.TestCase):
         self.assertEqual(datablock.block(2)['blockInfo_active'], True)
         self.assertEqual(datablock.block(3)['blockInfo_active'], True)
 
+    def test_reuse_reactivated_block(self):
+        datablock = create_datablock(10, block_size=3)
+        block_handles = block_utils.empty_block_handles()
+        block_handles.append(1)
+        block_handles.append(2)
+        datablock.set_active(block_handles, False)
+
+        # the block [1] is enabled again and not reused
+        block_handles.pop()
+        datablock.set_active(block_handles, True)
+        new_block_handles = datablock.append(num_elements = 3, reuse_inactive_block=True)
+        self.assertEqual(list(new_block_handles), [2])
+        new_block_handles = datablock.append(num_elements = 3, reuse_inactive_block=True)
+        self.assertEqual(list(new_block_handles), [4])
+
+    def test_release_reactivated_block(self):
+        datablock = create_datablock(10, block_size=3)
+        block_handles = block_utils.empty_block_handles()
+        block_handles.append(1)
+
+        # a block is pushed once into the free list
+        for _ in range(100):
+            datablock.set_active(block_handles, False)
+            datablock.set_active(block_handles, True)
+        datablock.set_active(block_handles, False)
+        self.assertEqual(list(datablock.free_block_handles), [1])
+        new_block_handles = datablock.append(num_elements = 6, reuse_inactive_block=True)
+        self.assertEqual(list(new_block_handles), [1, 4])
+        self.assertEqual(len(datablock.free_block_handles), 0)
+
+    def test_compact(self):
+        datablock = core.DataBlock(ComponentTest, block_size=3)
+        group_0 = datablock.append(4) # blocks [1, 2]
+        group_1 = datablock.append(2) # blocks [3]
+        group_2 = datablock.append(2) # blocks [4]
+        datablock.copyto('field_0', range(8))
+        datablock.release(group_1)
+        stats = datablock.fragmentation_stats()
+        self.assertEqual(stats['num_blocks'], 5)
+        self.assertEqual(stats['num_releasable_blocks'], 2)
+        self.assertEqual(stats['num_elements'], 6)
+
+        # the elements of group_0 and group_2 are packed separately
+        id_map = datablock.compact([group_0, group_2])
+        self.assertEqual(len(datablock.blocks), 3)
+        self.assertEqual(list(group_0), [0, 1])
+        self.assertEqual(list(group_2), [2])
+        self.assertTrue((datablock.flatten('field_0') == [0., 1., 2., 3., 6., 7.]).all())
+        self.assertEqual(list(id_map[2][0]), [1, 0])
+        self.assertEqual(list(id_map[4][1]), [2, 1])
+        self.assertEqual(list(id_map[3][0]), [-1, -1])
+        self.assertEqual(datablock.fragmentation_stats()['num_releasable_blocks'], 0)
+
+    def test_contiguous_storage(self):
+        datablock = core.DataBlock(ComponentTest, block_size=3, contiguous=True)
+        datablock.initialize(4)
+        datablock.append(6) # grow the arena
+        datablock.copyto('field_0', range(10))
+        self.assertEqual(len(datablock.blocks), 4)
+        self.assertGreaterEqual(len(datablock.arena), 4)
+        for block_index, block in enumerate(datablock.blocks):
+            self.assertTrue(np.shares_memory(block, datablock.arena[block_index]))
+        self.assertTrue((datablock.flatten('field_0') == np.arange(10)).all())
+
+        # snapshot and restore
+        snapshot = datablock.snapshot()
+        datablock.fill('field_0', 0.0)
+        datablock.restore(snapshot)
+        self.assertTrue((datablock.flatten('field_0') == np.arange(10)).all())
+
+    def test_field_views(self):
+        datablock = core.DataBlock(ComponentTest, block_size=3, contiguous=True)
+        handles = datablock.append(5)
+        small_handles = datablock.append(2)
+        datablock.copyto('field_0', range(7))
+
+        # single block : view without copy
+        view = datablock.field_view('field_0', small_handles)
+        self.assertTrue(np.shares_memory(view, datablock.arena))
+        self.assertEqual(list(view), [5., 6.])
+        # several blocks : gather
+        self.assertEqual(list(datablock.field_view('field_0', handles)), [0., 1., 2., 3., 4.])
+        # consecutive and packed blocks : strided view into the arena
+        block_view = datablock.block_view('field_0', handles)
+        self.assertEqual(block_view.shape, (2, 3))
+        self.assertTrue(np.shares_memory(block_view, datablock.arena))
+        self.assertEqual(list(block_view[1][:2]), [3., 4.])
+        # the second block is partially filled : gather
+        gathered_block_view = datablock.block_view('field_0')
+        self.assertFalse(np.shares_memory(gathered_block_view, datablock.arena))
+
+        # the views and the gathers are read-only (with and without the contiguous storage)
+        default_datablock = create_datablock(10, block_size=3)
+        for result in [view, datablock.field_view('field_0', handles), block_view, gathered_block_view,
+                       default_datablock.field_view('field_0'), default_datablock.block_view('field_0')]:
+            self.assertFalse(result.flags.writeable)
+            with self.assertRaises(ValueError):
+                result[0] = 100.0
+        self.assertTrue(datablock.arena.flags.writeable)
+
+        # gather into a caller buffer
+        buffer = np.zeros(10)
+        result = datablock.gather_into('field_0', buffer)
+        self.assertTrue(np.shares_memory(result, buffer))
+        self.assertEqual(list(result), list(range(7)))
+        with self.assertRaises(ValueError):
+            datablock.gather_into('field_0', np.zeros(3))
+
+    def test_block_sizes(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'block_sizes.json')
+            self.assertEqual(core.details.load_block_sizes(path), {})
+            core.details.save_block_sizes({'point' : 32}, path)
+            self.assertEqual(core.details.load_block_sizes(path), {'point' : 32})
+
+        details = core.Details([Point, Edge], {}, block_sizes = {'point' : 16})
+        self.assertEqual(details.db['point'].block_size, 16)
+        self.assertEqual(list(details.db['point'].append(20)), [1, 2])
+
     def setUp(self):
         print(" DataBlock Test:", self._testMethodName)
 
@@ -0,0 +1,92 @@
+"""
+@author: Vincent Bonnet
+@description : Unit tests for the frame cache
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import core
+import lib
+from core import BeamShape
+
+'''
+Tests for frame cache
+'''
+class Tests(unittest.TestCase):
+    def test_write_read(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'frames.cache')
+            with core.FrameCacheWriter(path) as writer:
+                for frame_id in range(3):
+                    x = np.full((5, 2), frame_id, dtype=np.float64)
+                    ids = np.arange(frame_id, dtype=np.int32)
+                    writer.write_frame(frame_id, {'x' : x, 'ids' : ids}, time = frame_id * 0.1)
+
+            # append to an existing cache
+            with core.FrameCacheWriter(path, append = True) as writer:
+                writer.write_frame(3, {'x' : np.full((5, 2), 3.0)}, time = 0.3)
+
+            with core.FrameCacheReader(path) as reader:
+                self.assertEqual(reader.num_frames(), 4)
+                frame_id, time, arrays = reader.read_frame(2)
+                self.assertEqual(frame_id, 2)
+                self.assertAlmostEqual(time, 0.2)
+                self.assertTrue((arrays['x'] == 2.0).all())
+                self.assertEqual(arrays['x'].shape, (5, 2))
+                self.assertEqual(list(arrays['ids']), [0, 1])
+                self.assertEqual(reader.read_frame(-1)[0], 3)
+                with self.assertRaises(IndexError):
+                    reader.read_frame(4)
+
+    def test_quantized(self):
+        # moving shape with keyframes and deltas
+        shape = BeamShape((-1.0, 0.0), 2.0, 0.5, 20, 5)
+        frames = [shape.vertex + (0.1 * frame_id, -0.05 * frame_id ** 2) for frame_id in range(7)]
+        tolerance = 1e-4
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'frames.cache')
+            with core.FrameCacheWriter(path, quantized = True, keyframe_interval = 3,
+                                       tolerance = tolerance) as writer:
+                for frame_id, x in enumerate(frames):
+                    writer.write_frame(frame_id, {'x' : x, 'ids' : np.arange(3)})
+            raw_size = sum(x.nbytes for x in frames)
+            self.assertLess(os.path.getsize(path), raw_size / 4)
+
+            with core.FrameCacheReader(path) as reader:
+                max_error = np.ptp(frames[0], axis=0).max() * tolerance * 0.5 + 1e-12
+                for index in [5, 0, 4, 6, 1]: # random access (keyframes 0, 3, 6)
+                    _, _, arrays = reader.read_frame(index)
+                    self.assertEqual(arrays['x'].dtype, np.float64)
+                    self.assertLessEqual(np.abs(arrays['x'] - frames[index]).max(), max_error)
+                    self.assertEqual(list(arrays['ids']), [0, 1, 2])
+
+    def test_dispatcher_frame_cache(self):
+        dispatcher = lib.CommandSolverDispatcher()
+        dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = 2, num_frames = 2)
+        beam_shape = BeamShape((-1.0, 0.0), 2.0, 0.5, 4, 2)
+        dispatcher.add_dynamic(shape = beam_shape, node_mass = 0.001, name = 'beam')
+        dispatcher.add_edge_constraint(dynamic = 'beam', stiffness = 20.0, damping = 0.1)
+        dispatcher.add_gravity(gravity = (0.0, -9.81))
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'frames.cache')
+            dispatcher.open_frame_cache(path = path, velocities = True)
+            dispatcher.initialize()
+            dispatcher.solve_to_next_frame()
+            dispatcher.solve_to_next_frame()
+            dispatcher.close_frame_cache()
+
+            with core.FrameCacheReader(path) as reader:
+                self.assertEqual(reader.num_frames(), 3)
+                frame_id, _, arrays = reader.read_frame(2)
+                self.assertEqual(frame_id, 2)
+                x = dispatcher.get_nodes_from_dynamic(dynamic = 'beam')
+                self.assertTrue((arrays['beam/x'] == x).all())
+                self.assertEqual(arrays['beam/v'].shape, x.shape)
+
+    def setUp(self):
+        print(" Frame Cache Test:", self._testMethodName)
+
+if __name__ == '__main__':
+    unittest.main(Tests())
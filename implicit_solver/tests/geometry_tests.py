@@ -4,7 +4,13 @@
 """
 
 import unittest
+import numpy as np
 import core
+import core.jit.block_utils as block_utils
+from lib.objects import Kinematic
+from lib.objects.jit.data import Point, Edge, Triangle
+import lib.objects.jit.algorithms.simplex_lib as simplex_lib
+import lib.objects.jit.algorithms.spatial_hash_lib as spatial_hash_lib
 
 '''
 Tests for geometry functions
@@ -16,6 +22,13 @@ def createTriangulatedSquareShape():
     shape.face[:] = ((0, 1, 2),(0, 2, 3))
     return shape
 
+def createKinematicDetails():
+    system_types = [Point, Edge, Triangle]
+    details = core.Details(system_types, {'geometries' : system_types})
+    shape = core.RectangleShape(min_x=-2.0, min_y=-1.0, max_x=2.0, max_y=1.0)
+    Kinematic(details, shape)
+    return details
+
 class Tests(unittest.TestCase):
     def test_edges_on_surface(self):
         shape = createTriangulatedSquareShape()
@@ -23,6 +36,46 @@ class Tests(unittest.TestCase):
         self.assertEqual(len(edges_ids), 4)
         self.assertEqual(len(edge_normals), 4)
 
+    def test_spatial_hash_queries(self):
+        # compare the spatial hash queries with the linear search
+        details = createKinematicDetails()
+        cell_size = spatial_hash_lib.mean_edge_length(details.edge, details.point)
+        triangle_handles = block_utils.get_active_block_handles(details.triangle)
+        edge_handles = block_utils.get_active_block_handles(details.edge)
+        triangle_hash = spatial_hash_lib.build(details.triangle, details.point, triangle_handles, cell_size)
+        edge_hash = spatial_hash_lib.build(details.edge, details.point, edge_handles, cell_size)
+        positions = np.random.default_rng(0).uniform(-3.0, 3.0, (200, 2))
+        for position in positions:
+            result = simplex_lib.IsInsideResult()
+            simplex_lib.is_inside(details.triangle, details.point, position, result)
+            is_inside = spatial_hash_lib.is_inside(triangle_hash, details.triangle,
+                                                   details.point, position)
+            self.assertEqual(is_inside, result.isInside)
+
+            closest_param = simplex_lib.ClosestResult()
+            simplex_lib.get_closest_param(details.edge, details.point, position, closest_param)
+            edge_ID, t, squared_distance = spatial_hash_lib.closest_edge(edge_hash, details.edge,
+                                                                         details.point, position)
+            point_IDs = details.edge[edge_ID[0]][0]['point_IDs'][edge_ID[1]]
+            self.assertTrue(np.array_equal(point_IDs, closest_param.points))
+            self.assertAlmostEqual(squared_distance, closest_param.squared_distance)
+
+    def test_spatial_hash_radius_query(self):
+        # compare the radius query with the brute force search
+        rng = np.random.default_rng(0)
+        positions = rng.uniform(-3.0, 3.0, (300, 2))
+        hashed_positions = rng.uniform(-3.0, 3.0, (200, 2))
+        radius = 0.4
+        point_hash = spatial_hash_lib.build_points(hashed_positions, radius)
+        pairs = spatial_hash_lib.find_pairs_within(point_hash, hashed_positions, positions, radius)
+        expected_pairs = []
+        for i in range(len(positions)):
+            for j in range(len(hashed_positions)):
+                direction = positions[i] - hashed_positions[j]
+                if np.inner(direction, direction) < radius * radius:
+                    expected_pairs.append((i, j))
+        self.assertTrue(np.array_equal(pairs, np.asarray(expected_pairs)))
+
     def setUp(self):
         print(" Geometry Test:", self._testMethodName)
 
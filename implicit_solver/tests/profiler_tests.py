@@ -0,0 +1,89 @@
+"""
+@author: Vincent Bonnet
+@description : Unit tests for the profiler
+"""
+
+import csv
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+import core
+import core.profiler
+
+'''
+Profiled Functions
+'''
+@core.timeit
+def inner_function():
+    core.Profiler().push_metric('iterations', 3)
+
+@core.timeit
+def outer_function():
+    inner_function()
+    inner_function()
+
+'''
+Tests for profiler
+'''
+class Tests(unittest.TestCase):
+    def test_aggregated_stats(self):
+        profiler = core.Profiler()
+        for _ in range(3):
+            outer_function()
+        self.assertEqual(profiler.stats['outer_function'].count, 3)
+        stats = profiler.stats['outer_function/inner_function']
+        self.assertEqual(stats.count, 6)
+        self.assertLessEqual(stats.min, stats.mean())
+        self.assertLessEqual(stats.mean(), stats.max)
+        self.assertEqual(profiler.metric_stats['outer_function/inner_function/iterations'].total, 18)
+
+    def test_bounded_logs(self):
+        profiler = core.Profiler()
+        profiler.set_max_logs(10)
+        for _ in range(10):
+            outer_function()
+        self.assertEqual(len(profiler.logs), 10)
+        self.assertEqual(profiler.call_depth_counter, 0)
+
+    def test_disabled(self):
+        profiler = core.Profiler()
+        profiler.disable()
+        outer_function()
+        profiler.enable()
+        self.assertEqual(len(profiler.stats), 0)
+        self.assertEqual(len(profiler.logs), 0)
+
+        # IMPLICIT_SOLVER_PROFILER=0
+        with mock.patch.object(core.profiler, 'PROFILER_ENABLED', False):
+            profiler.push_metric('iterations', 3)
+        self.assertEqual(len(profiler.logs), 0)
+
+    def test_exports(self):
+        profiler = core.Profiler()
+        outer_function()
+        with tempfile.TemporaryDirectory() as folder:
+            trace_path = os.path.join(folder, 'trace.json')
+            csv_path = os.path.join(folder, 'stats.csv')
+            profiler.export_chrome_trace(trace_path)
+            profiler.export_csv(csv_path)
+            with open(trace_path) as json_file:
+                events = json.load(json_file)['traceEvents']
+            with open(csv_path) as csv_file:
+                rows = list(csv.DictReader(csv_file))
+
+        self.assertEqual(len([e for e in events if e['ph'] == 'X']), 3)
+        self.assertEqual(len([e for e in events if e['ph'] == 'C']), 2)
+        call_paths = [row['call_path'] for row in rows]
+        self.assertIn('outer_function/inner_function', call_paths)
+
+    def setUp(self):
+        print(" Profiler Test:", self._testMethodName)
+        profiler = core.Profiler()
+        profiler.set_max_logs(core.profiler.DEFAULT_MAX_LOGS)
+        profiler.clear_logs()
+        profiler.clear_stats()
+
+if __name__ == '__main__':
+    unittest.main(Tests())
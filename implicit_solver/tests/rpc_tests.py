@@ -0,0 +1,105 @@
+"""
+@author: Vincent Bonnet
+@description : Unit tests for the rpc transport
+"""
+
+import asyncio
+import socket
+import threading
+import unittest
+import numpy as np
+from core import BeamShape
+import host_app.rpc.server as server
+from host_app.rpc import AsyncClient
+from host_app.rpc.transport import Transport
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+async def run_async_client(port):
+    client = AsyncClient('test')
+    while not await client.connect_to_server(port = port):
+        await asyncio.sleep(0.1)
+    dispatcher = await client.get_dispatcher()
+
+    # batch
+    results = await dispatcher.run_batch([('set_context', {'time' : 0.0, 'frame_dt' : 0.1,
+                                                           'num_substep' : 1, 'num_frames' : 1}),
+                                          ('add_dynamic', {'shape' : BeamShape((0.0, 0.0), 1.0, 1.0, 100, 10),
+                                                           'node_mass' : 0.001})])
+    # pipelined commands (the responses are matched by request id)
+    futures = [dispatcher.get_nodes_from_dynamic(dynamic = results[1]) for _ in range(3)]
+    futures.append(dispatcher.get_context())
+    results = await asyncio.gather(*futures)
+    # the server error is raised by the future
+    error = None
+    try:
+        await dispatcher.get_nodes_from_dynamic(dynamic = 'unknown')
+    except RuntimeError as e:
+        error = e
+    await client.disconnect_from_server()
+    return results, error
+
+'''
+Tests for rpc transport
+'''
+class Tests(unittest.TestCase):
+    def test_transport(self):
+        client = Transport(min_size = 1024)
+        server = Transport(min_size = 1024)
+
+        # small arguments are pickled in-band
+        message = client.encode({'dynamic' : 1})
+        self.assertIsNone(message[2])
+        self.assertEqual(server.decode(message), {'dynamic' : 1})
+
+        # large arrays are sent through a segment
+        positions = np.random.rand(1000, 2)
+        message = server.encode((positions, np.arange(10)))
+        self.assertIsNotNone(message[2])
+        self.assertEqual(len(message[3]), 1)
+        self.assertLess(len(message[1]), 1024)
+        result = client.decode(message)
+        self.assertTrue(np.array_equal(result[0], positions))
+        self.assertTrue(np.array_equal(result[1], np.arange(10)))
+        result[0][0] = 0.0 # writable copy
+
+        # the segment is reused once the peer replied
+        server.decode(client.encode(None))
+        self.assertEqual(len(server.sent_segments), 0)
+        self.assertEqual(len(server.free_segments), 1)
+        message = server.encode(positions * 2.0)
+        self.assertEqual(len(server.free_segments), 0)
+        self.assertTrue(np.array_equal(client.decode(message), positions * 2.0))
+
+        # pipelined messages are released up to the acknowledged id
+        server.release()
+        messages = [server.encode(positions, message_id) for message_id in range(3)]
+        server.release(1)
+        self.assertEqual([message_id for message_id, _ in server.sent_segments], [2])
+        self.assertTrue(np.array_equal(client.decode(messages[2], release = False), positions))
+        server.close()
+        client.close()
+
+    def test_async_client(self):
+        port = get_free_port()
+        managers = []
+        server_thread = threading.Thread(target = lambda: managers.append(server.execute_server(print_log = False,
+                                                                                                 port = port)))
+        server_thread.start()
+        results, error = asyncio.run(run_async_client(port))
+        server_thread.join()
+        managers[0].shutdown()
+
+        self.assertEqual(results[0].shape, (1111, 2))
+        self.assertTrue(np.array_equal(results[0], results[2]))
+        self.assertEqual(results[3].frame_dt, 0.1)
+        self.assertIsNotNone(error)
+
+    def setUp(self):
+        print(" RPC Test:", self._testMethodName)
+
+if __name__ == '__main__':
+    unittest.main(Tests())
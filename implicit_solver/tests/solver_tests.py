@@ -0,0 +1,207 @@
+"""
+@author: Vincent Bonnet
+@description : Unit tests for the linear solver helpers
+"""
+
+import os
+import tempfile
+import unittest
+import numpy as np
+import scipy.sparse
+import lib
+import lib.system as system
+import lib.system.time_integrators as integrator
+import lib.system.jit.integrator_lib as integrator_lib
+import lib.system.jit.preconditioner_lib as preconditioner_lib
+from core import BeamShape, RectangleShape
+
+'''
+Matrix Functions
+'''
+def create_laplacian_matrix(num_rows):
+    # symmetric positive definite matrix (1D laplacian + identity)
+    diagonals = [np.ones(num_rows-1) * -1.0, np.ones(num_rows) * 3.0, np.ones(num_rows-1) * -1.0]
+    return scipy.sparse.diags(diagonals, [-1, 0, 1], format='csr')
+
+def simulate_beam(time_integrator, num_frames = 2, num_substep = 2, damping = 0.1):
+    dispatcher = lib.CommandSolverDispatcher()
+    dispatcher._solver = system.Solver(time_integrator)
+    dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = num_substep,
+                           num_frames = num_frames, cg_tolerance = 1e-10)
+    beam_shape = BeamShape((-1.0, 0.0), 2.0, 0.5, 4, 2)
+    dispatcher.add_dynamic(shape = beam_shape, node_mass = 0.001, name = 'beam')
+    dispatcher.add_edge_constraint(dynamic = 'beam', stiffness = 20.0, damping = damping)
+    dispatcher.add_face_constraint(dynamic = 'beam', stiffness = 20.0, damping = 0.0)
+    dispatcher.add_gravity(gravity = (0.0, -9.81))
+    dispatcher.initialize()
+    for _ in range(num_frames):
+        dispatcher.solve_to_next_frame()
+    return dispatcher.get_nodes_from_dynamic(dynamic = 'beam')
+
+def create_warmup_scene():
+    # scene with all the conditions (see CommandSolverDispatcher._build_warmup_scene)
+    dispatcher = lib.CommandSolverDispatcher()
+    dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = 2, num_frames = 4)
+    dispatcher._build_warmup_scene()
+    dispatcher.initialize()
+    return dispatcher
+
+def create_fragmented_scene():
+    # warm-up scene with small blocks : the kinematic collision releases condition blocks
+    dispatcher = lib.CommandSolverDispatcher()
+    dispatcher.reset(block_sizes = {'node' : 4, 'point' : 4, 'edge' : 4, 'triangle' : 4,
+                                    'spring' : 2, 'area' : 2, 'bending' : 2, 'anchorSpring' : 2})
+    dispatcher.set_context(time = 0.0, frame_dt = 1.0/24.0, num_substep = 4, num_frames = 4,
+                           cg_tolerance = 1e-12)
+    dispatcher._build_warmup_scene()
+    dispatcher.initialize()
+    return dispatcher
+
+def create_collision_scene(num_frames):
+    # beam falling onto a kinematic obstacle : the contacts change every few substeps
+    dispatcher = lib.CommandSolverDispatcher()
+    dispatcher.set_context(time = 0.0, frame_dt = 1.0/48.0, num_substep = 1,
+                           num_frames = num_frames, cg_tolerance = 1e-10)
+    beam = dispatcher.add_dynamic(shape = BeamShape((-1.0, 0.05), 2.0, 0.5, 4, 2), node_mass = 0.001)
+    dispatcher.add_edge_constraint(dynamic = beam, stiffness = 20.0, damping = 0.1)
+    dispatcher.add_face_constraint(dynamic = beam, stiffness = 20.0, damping = 0.0)
+    dispatcher.add_kinematic(shape = RectangleShape(-2.0, -1.0, 0.5, 0.0))
+    dispatcher.add_kinematic_collision(stiffness = 100.0, damping = 0.0)
+    dispatcher.add_gravity(gravity = (0.0, -9.81))
+    dispatcher.initialize()
+    return dispatcher
+
+def assemble_A_from_new_pattern(integrator, scene, details, dt):
+    '''
+    Returns A assembled from a new sparsity pattern and restores the pattern of the integrator
+    '''
+    pattern = (integrator.column_indices, integrator.row_indptr, integrator.diagonal_slots)
+    integrator.row_indptr = None
+    integrator._assemble_A(scene, details, dt)
+    A = integrator.A
+    integrator.column_indices, integrator.row_indptr, integrator.diagonal_slots = pattern
+    num_missing = np.zeros(1, dtype=np.int64)
+    integrator_lib.update_system_slots(details.constraints, pattern[0], pattern[1], num_missing)
+    return A
+
+def get_nodes(dispatcher):
+    return [dispatcher.get_nodes_from_dynamic(dynamic = name) for name in dispatcher.get_dynamics()]
+
+'''
+Tests for the linear solver
+'''
+class Tests(unittest.TestCase):
+
+    def test_incomplete_cholesky(self):
+        # no fill-in on a tridiagonal matrix : the factorization is exact
+        A = create_laplacian_matrix(num_rows = 20)
+        A.sort_indices()
+        L = preconditioner_lib.incomplete_cholesky(A.data, A.indices, A.indptr)
+        b = np.arange(20, dtype=np.float64)
+        x = preconditioner_lib.incomplete_cholesky_solve(*L, b)
+        self.assertTrue(np.allclose(A.dot(x), b))
+
+    def test_inverse_blocks(self):
+        blocks = np.zeros((2, 2, 2))
+        blocks[0] = [[2.0, 1.0], [1.0, 2.0]]
+        blocks[1] = [[4.0, 0.0], [0.0, 0.5]]
+        inv_blocks = preconditioner_lib.inverse_blocks(blocks)
+        self.assertTrue(np.allclose(np.dot(inv_blocks[0], blocks[0]), np.identity(2)))
+        self.assertTrue(np.allclose(np.dot(inv_blocks[1], blocks[1]), np.identity(2)))
+
+    def test_matrix_free_backward_euler(self):
+        x0 = simulate_beam(integrator.BackwardEulerIntegrator())
+        x1 = simulate_beam(integrator.MatrixFreeBackwardEulerIntegrator())
+        self.assertTrue(np.allclose(x0, x1, rtol=0.0, atol=1e-8))
+
+    def test_variational_free_fall(self):
+        # the internal forces don't move the center of mass
+        # with damping (full Newton steps) and without damping (line search)
+        dt = 1.0/24.0
+        expected_y = 0.25 - 9.81 * dt * dt * 3.0
+        for damping in (0.1, 0.0):
+            x = simulate_beam(integrator.VariationalIntegrator(), num_frames = 2, num_substep = 1,
+                              damping = damping)
+            self.assertAlmostEqual(np.mean(x[:, 0]), 0.0, places=5)
+            self.assertAlmostEqual(np.mean(x[:, 1]), expected_y, places=5)
+
+    def test_warmup(self):
+        # the warm-up doesn't modify the scene of the dispatcher
+        dispatcher = lib.CommandSolverDispatcher()
+        beam_shape = BeamShape((-1.0, 0.0), 2.0, 0.5, 4, 2)
+        dispatcher.add_dynamic(shape = beam_shape, node_mass = 0.001, name = 'beam')
+        compile_times = dispatcher.warmup(print_log = False)
+        self.assertIsInstance(compile_times, dict)
+        self.assertEqual(len(dispatcher.get_dynamics()), 1)
+        self.assertEqual(len(dispatcher.get_conditions()), 0)
+        x = dispatcher.get_nodes_from_dynamic(dynamic = 'beam')
+        self.assertTrue(np.allclose(x, beam_shape.vertex))
+
+    def test_checkpoint(self):
+        # the restored simulation continues as the original simulation
+        dispatcher = create_warmup_scene()
+        dispatcher.solve_to_next_frame()
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'simulation.ckpt')
+            dispatcher.checkpoint(path = path)
+            dispatcher.solve_to_next_frame()
+            restored_dispatcher = create_warmup_scene()
+            restored_dispatcher.restore(path = path)
+            restored_dispatcher.solve_to_next_frame()
+
+        self.assertEqual(restored_dispatcher.get_context().time, dispatcher.get_context().time)
+        for x, restored_x in zip(get_nodes(dispatcher), get_nodes(restored_dispatcher)):
+            self.assertTrue((x == restored_x).all())
+
+    def test_compact(self):
+        # the compacted simulation continues as the uncompacted simulation
+        dispatcher = create_fragmented_scene()
+        reference_dispatcher = create_fragmented_scene()
+        dispatcher.solve_to_next_frame()
+        reference_dispatcher.solve_to_next_frame()
+
+        stats = dispatcher.get_fragmentation_stats()
+        self.assertGreater(stats['node']['num_releasable_blocks'], 0)
+        self.assertGreater(stats['anchorSpring']['num_releasable_blocks'], 0)
+        details = dispatcher._details
+        node_IDs = {name : details.db[name].flatten('node_IDs') for name in ['spring', 'anchorSpring']}
+
+        dispatcher.compact()
+        for name, datablock_stats in dispatcher.get_fragmentation_stats().items():
+            self.assertEqual(datablock_stats['num_releasable_blocks'], 0, name)
+        # the node IDs of the constraints refer to the repacked nodes
+        for name, IDs in node_IDs.items():
+            self.assertEqual(details.db[name].flatten('node_IDs').shape, IDs.shape)
+            self.assertFalse((details.db[name].flatten('node_IDs') == IDs).all())
+
+        # the repacked system is solved in a different order (round-off differences only)
+        for _ in range(2):
+            dispatcher.solve_to_next_frame()
+            reference_dispatcher.solve_to_next_frame()
+        for x, reference_x in zip(get_nodes(dispatcher), get_nodes(reference_dispatcher)):
+            self.assertTrue(np.allclose(x, reference_x, rtol=0.0, atol=1e-7))
+
+    def test_system_pattern(self):
+        # A from the cached pattern matches A from a new pattern while the contacts change
+        num_substeps = 30
+        dispatcher = create_collision_scene(num_frames = num_substeps)
+        scene, details = dispatcher._scene, dispatcher._details
+        integrator = dispatcher._solver.time_integrator
+        collision = [condition for condition in scene.conditions if not condition.is_static()][0]
+        dt = dispatcher.get_context().dt
+
+        num_contacts = set()
+        for _ in range(num_substeps):
+            dispatcher.solve_to_next_frame()
+            num_contacts.add(collision.total_constraints)
+            A = integrator.A.toarray()
+            new_A = assemble_A_from_new_pattern(integrator, scene, details, dt)
+            self.assertEqual(A.shape, new_A.shape)
+            self.assertTrue((A == new_A.toarray()).all())
+        self.assertGreater(len(num_contacts), 2)
+
+    def setUp(self):
+        print(" Solver Test:", self._testMethodName)
+
+if __name__ == '__main__':
+    unittest.main(Tests())